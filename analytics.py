@@ -0,0 +1,161 @@
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from backup import Snapshot
+from database import Database
+
+# Загрузка исполнителя: задачи по статусам, просроченные, доля просроченных среди
+# незавершённых и доля исполнителя во всех незавершённых задачах
+Workload = namedtuple('Workload', ['user_id', 'full_name', 'total', 'pending', 'in_progress',
+                                   'completed', 'overdue', 'overdue_ratio', 'load_share'])
+
+# Показатели проекта: выполнение, просрочка и бюджет на задачу
+ProjectStats = namedtuple('ProjectStats', ['project_id', 'name', 'status', 'budget', 'total',
+                                           'completed', 'open', 'overdue', 'overdue_ratio',
+                                           'progress', 'budget_per_task'])
+
+# Точка графика сгорания задач проекта по неделям сроков
+BurndownPoint = namedtuple('BurndownPoint', ['week', 'due', 'completed', 'remaining',
+                                             'planned_remaining'])
+
+# Результат расчёта: дата, на которую считалась просрочка, строки и итоги
+Report = namedtuple('Report', ['today', 'workload', 'projects', 'totals', 'elapsed_ms'])
+
+def _ratio(part, whole):
+    return part / whole if whole else 0.0
+
+def workload(db, today):
+    """Загрузка исполнителей, по убыванию числа незавершённых задач.
+    
+    Статусы берутся из счётчиков, просрочка - из частичного индекса
+    незавершённых задач, поэтому объём работы не зависит от истории.
+    """
+    counts = {}
+    for user_id, status, count in db.get_user_task_counts():
+        counts.setdefault(user_id, {})[status] = count
+    overdue = dict(db.get_overdue_counts(today, by='assignee'))
+    names = {user.id: user.full_name for user in db.get_all_users()}
+    
+    all_open = sum(count for by_status in counts.values()
+                   for status, count in by_status.items() if status != 'completed')
+    rows = []
+    for user_id, by_status in counts.items():
+        total = sum(by_status.values())
+        completed = by_status.get('completed', 0)
+        late = overdue.get(user_id, 0)
+        rows.append(Workload(
+            user_id, names.get(user_id, "Без исполнителя" if not user_id else f"#{user_id}"),
+            total, by_status.get('pending', 0), by_status.get('in_progress', 0), completed, late,
+            _ratio(late, total - completed), _ratio(total - completed, all_open)))
+    rows.sort(key=lambda row: (-(row.total - row.completed), row.user_id))
+    return rows
+
+def project_stats(db, today):
+    """Показатели проектов, по убыванию числа просроченных задач"""
+    counts = {}
+    for project_id, _, status, count in db.get_project_task_counts():
+        counts.setdefault(project_id, {})[status] = count
+    overdue = dict(db.get_overdue_counts(today, by='project'))
+    
+    rows = []
+    for project in db.get_projects():
+        by_status = counts.get(project.id, {})
+        total = sum(by_status.values())
+        completed = by_status.get('completed', 0)
+        late = overdue.get(project.id, 0)
+        budget_per_task = project.budget / total if project.budget is not None and total else None
+        rows.append(ProjectStats(
+            project.id, project.name, project.status, project.budget, total, completed,
+            total - completed, late, _ratio(late, total - completed), _ratio(completed, total),
+            budget_per_task))
+    rows.sort(key=lambda row: (-row.overdue, -row.open, row.project_id))
+    return rows
+
+def burndown(db, project_id):
+    """График сгорания задач проекта по неделям сроков (понедельник недели).
+    
+    Даты выполнения задач не хранятся, поэтому выполненная задача относится
+    к неделе своего срока: remaining - сколько задач останется после недели,
+    planned_remaining - сколько должно остаться по срокам. Задачи без срока
+    входят в оба остатка до конца графика.
+    """
+    weeks = {}
+    total = 0
+    for deadline, completed, count in db.get_project_burndown(project_id):
+        total += count
+        if not deadline:
+            continue
+        try:
+            day = date.fromisoformat(deadline)
+        except ValueError:
+            continue
+        week = (day - timedelta(days=day.weekday())).isoformat()
+        due, done = weeks.get(week, (0, 0))
+        weeks[week] = (due + count, done + (count if completed else 0))
+    
+    points = []
+    remaining = planned = total
+    for week in sorted(weeks):
+        due, done = weeks[week]
+        remaining -= done
+        planned -= due
+        points.append(BurndownPoint(week, due, done, remaining, planned))
+    return points
+
+def analyze(db, today=None):
+    """Загрузка исполнителей и показатели проектов с итогами на дату today"""
+    started = time.perf_counter()
+    today = (today or date.today()).isoformat()
+    people = workload(db, today)
+    projects = project_stats(db, today)
+    
+    tasks = sum(row.total for row in people)
+    completed = sum(row.completed for row in people)
+    overdue = sum(row.overdue for row in people)
+    budget = sum(row.budget for row in projects if row.budget is not None)
+    project_tasks = sum(row.total for row in projects if row.budget is not None)
+    totals = {
+        'tasks': tasks,
+        'open': tasks - completed,
+        'completed': completed,
+        'overdue': overdue,
+        'overdue_ratio': _ratio(overdue, tasks - completed),
+        'budget': budget,
+        'budget_per_task': _ratio(budget, project_tasks),
+    }
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    return Report(today, people, projects, totals, elapsed_ms)
+
+def main(argv=None):
+    """Командная строка: расчёт аналитики и вывод итогов в JSON"""
+    parser = argparse.ArgumentParser(description="Аналитика загрузки и бюджетов")
+    parser.add_argument('--db', default='uchet.db', help="Путь к файлу базы данных")
+    parser.add_argument('--today', type=date.fromisoformat,
+                        help="Дата расчёта просрочки (по умолчанию сегодня)")
+    parser.add_argument('--top', type=int, default=10, help="Сколько строк таблиц выводить")
+    parser.add_argument('--snapshot', help="Считать по снимку базы, загруженному в память, "
+                                           "не обращаясь к рабочему файлу")
+    args = parser.parse_args(argv)
+    
+    snapshot = Snapshot(args.snapshot) if args.snapshot else None
+    db = snapshot.open() if snapshot else Database(args.db)
+    try:
+        report = analyze(db, args.today)
+    finally:
+        db.close()
+        if snapshot:
+            snapshot.close()
+    print(json.dumps({
+        'today': report.today,
+        'elapsed_ms': report.elapsed_ms,
+        'totals': report.totals,
+        'workload': [row._asdict() for row in report.workload[:args.top]],
+        'projects': [row._asdict() for row in report.projects[:args.top]],
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
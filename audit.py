@@ -0,0 +1,128 @@
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+
+AUDIT_FLUSH_SIZE = 200  # событий, при накоплении которых запись начинается сразу
+AUDIT_FLUSH_INTERVAL = 2.0  # секунд, дольше которых событие не ждёт записи
+AUDIT_RETRY_INTERVAL = 5.0  # секунд до повторной попытки после ошибки записи
+
+# Действия, которые попадают в журнал аудита
+AUDIT_ACTIONS = ('login', 'login_failed', 'create_project', 'update_task_status')
+
+def audit_time():
+    """Момент события в UTC в формате CURRENT_TIMESTAMP SQLite с миллисекундами"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+class AuditQueue:
+    """Очередь событий аудита с отложенной групповой записью.
+    
+    record() только добавляет событие в память: действие пользователя не
+    ждёт отдельного коммита своей строки аудита. Фоновый поток отдаёт
+    накопленные события в write(events) одним пакетом (одна транзакция на
+    пакет), когда их набралось flush_size или самое старое ждёт
+    flush_interval секунд. flush() записывает очередь сразу в потоке
+    вызывающего - при закрытии базы и выходе из приложения; при завершении
+    процесса очередь сбрасывается через atexit.
+    
+    write(events) вызывается в любом потоке, но пакеты пишутся по одному,
+    и должна фиксировать пакет своей транзакцией. Если запись не удалась,
+    события возвращаются в начало очереди и записываются следующей попыткой.
+    """
+    
+    def __init__(self, write, flush_size=AUDIT_FLUSH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL,
+                 name='audit-writer'):
+        self.write = write
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self.written = 0  # записано событий
+        self.flushes = 0  # записано пакетов
+        self._events = []
+        self._oldest = None  # момент (monotonic) самого старого события в очереди
+        self._retry_at = None  # до этого момента фоновый поток не пишет после ошибки
+        self._cond = threading.Condition()
+        self._write_lock = threading.RLock()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+    
+    def __len__(self):
+        with self._cond:
+            return len(self._events)
+    
+    def record(self, event):
+        """Постановка события в очередь; поток записи запускается при первом событии"""
+        with self._cond:
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.append(event)
+            if self._closed:
+                return  # после close() события пишет только flush()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            elif len(self._events) == 1 or len(self._events) >= self.flush_size:
+                # Поток ждёт без таймера, пока очередь пуста, или таймера самого старого
+                self._cond.notify()
+    
+    def _due(self):
+        """Секунд до записи очереди фоновым потоком (0 - пора, None - очередь пуста)"""
+        if not self._events:
+            return None
+        now = time.monotonic()
+        if self._retry_at is not None and now < self._retry_at:
+            return self._retry_at - now
+        if len(self._events) >= self.flush_size:
+            return 0
+        return max(self._oldest + self.flush_interval - now, 0)
+    
+    def _run(self):
+        """Цикл фонового потока записи"""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    delay = self._due()
+                    if delay == 0:
+                        break
+                    self._cond.wait(delay)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                with self._cond:
+                    self._retry_at = time.monotonic() + AUDIT_RETRY_INTERVAL
+    
+    def flush(self):
+        """Запись всех накопленных событий одним пакетом; возвращает их число"""
+        # Пакеты пишутся по одному, чтобы события попадали в таблицу по порядку
+        with self._write_lock:
+            with self._cond:
+                events, self._events = self._events, []
+                self._oldest = None
+            if not events:
+                return 0
+            try:
+                self.write(events)
+            except BaseException:
+                with self._cond:
+                    if not self._events:
+                        self._oldest = time.monotonic()
+                    self._events[:0] = events
+                raise
+            with self._cond:
+                self._retry_at = None
+                self.written += len(events)
+                self.flushes += 1
+            return len(events)
+    
+    def close(self):
+        """Остановка фонового потока и запись оставшихся событий"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
@@ -0,0 +1,275 @@
+import argparse
+import itertools
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from database import ConnectionManager, Database
+
+BACKUP_STEP_PAGES = 1024  # страниц за шаг копирования (4 МБ при странице 4 КБ)
+BACKUP_STEP_PAUSE = 0.005  # секунд паузы между шагами
+BACKUP_INTERVAL = 24 * 3600  # секунд между плановыми снимками
+BACKUP_KEEP = 7  # сколько последних снимков хранить
+SNAPSHOT_TIME_FORMAT = '%Y%m%d-%H%M%S'
+
+class BackupError(Exception):
+    """Снимок повреждён, не подходит к программе или копирование не удалось"""
+
+def _connect(path, read_only=False):
+    if read_only:
+        # Снимок открывается без права записи, чтобы проверка его не изменила
+        uri = 'file:' + os.path.abspath(path).replace('?', '%3f').replace('#', '%23') + '?mode=ro'
+        return sqlite3.connect(uri, uri=True, isolation_level=None)
+    return sqlite3.connect(path, isolation_level=None, timeout=5)
+
+def copy_database(source, target, pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE,
+                  progress=None):
+    """Копирование базы онлайн-резервированием SQLite порциями по pages страниц.
+    
+    source и target - открытые соединения. В режиме WAL копия читается из
+    одной транзакции чтения: писатели не блокируются, а снимок согласован на
+    момент её начала и не перезапускается от их изменений (файл WAL растёт до
+    конца копирования). В режиме журнала отката блокировка чтения снимается
+    между шагами, и паузы дают клиентам записать свои изменения.
+    progress(осталось, всего) вызывается после каждого шага.
+    """
+    def step(status, remaining, total):
+        if progress is not None:
+            progress(remaining, total)
+        if pause and remaining:
+            time.sleep(pause)
+    
+    snapshot = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+    if snapshot:
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+    try:
+        source.backup(target, pages=pages, progress=step)
+    finally:
+        if snapshot:
+            source.execute('COMMIT')
+
+def verify(path):
+    """Проверка целостности файла базы; возвращает версию его схемы.
+    
+    BackupError - файл повреждён или его схема новее, чем знает программа.
+    """
+    if not os.path.isfile(path):
+        raise BackupError(f"Файл {path} не найден")
+    try:
+        conn = _connect(path, read_only=True)
+        try:
+            problems = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"{path}: {e}") from e
+    if problems != ['ok']:
+        raise BackupError(f"{path} повреждён: " + "; ".join(problems[:5]))
+    if version > Database.SCHEMA_VERSION:
+        raise BackupError(f"{path}: версия схемы {version} новее поддерживаемой "
+                          f"({Database.SCHEMA_VERSION})")
+    return version
+
+def backup(db_name, target, pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE, progress=None):
+    """Резервная копия работающей базы в файл target с проверкой.
+    
+    Копия пишется во временный файл рядом с target и заменяет его только
+    после проверки целостности, так что target никогда не бывает неполным.
+    Копия переводится в журнал отката и хранится одним файлом без -wal/-shm.
+    """
+    partial = target + '.part'
+    if os.path.exists(partial):
+        os.remove(partial)
+    source = _connect(db_name)
+    try:
+        copy = _connect(partial)
+        try:
+            copy_database(source, copy, pages, pause, progress)
+            copy.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            copy.close()
+        verify(partial)
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        source.close()
+    os.replace(partial, target)
+    return target
+
+def _snapshot_prefix(db_name):
+    return os.path.splitext(os.path.basename(db_name))[0] + '-'
+
+def list_snapshots(directory, db_name='uchet.db'):
+    """Снимки базы в каталоге: [(время, путь)] от старых к новым"""
+    prefix = _snapshot_prefix(db_name)
+    snapshots = []
+    if not os.path.isdir(directory):
+        return snapshots
+    for name in os.listdir(directory):
+        if not (name.startswith(prefix) and name.endswith('.db')):
+            continue
+        try:
+            taken = datetime.strptime(name[len(prefix):-3], SNAPSHOT_TIME_FORMAT)
+        except ValueError:
+            continue
+        snapshots.append((taken, os.path.join(directory, name)))
+    snapshots.sort()
+    return snapshots
+
+def snapshot(db_name, directory, keep=BACKUP_KEEP, pages=BACKUP_STEP_PAGES,
+             pause=BACKUP_STEP_PAUSE):
+    """Плановый снимок в каталог directory; старые сверх keep последних удаляются.
+    
+    Возвращает путь нового снимка.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = _snapshot_prefix(db_name) + datetime.now().strftime(SNAPSHOT_TIME_FORMAT) + '.db'
+    path = backup(db_name, os.path.join(directory, name), pages, pause)
+    snapshots = list_snapshots(directory, db_name)
+    for _, old in snapshots[:max(len(snapshots) - keep, 0)]:
+        os.remove(old)
+    return path
+
+def seconds_until_due(directory, db_name='uchet.db', interval=BACKUP_INTERVAL):
+    """Через сколько секунд нужен следующий плановый снимок (0 - уже пора)"""
+    snapshots = list_snapshots(directory, db_name)
+    if not snapshots:
+        return 0
+    elapsed = (datetime.now() - snapshots[-1][0]).total_seconds()
+    return max(interval - elapsed, 0)
+
+def restore(path, db_name='uchet.db', keep_current=True):
+    """Восстановление базы db_name из снимка path с проверкой до и после.
+    
+    Снимок копируется онлайн-резервированием в сам файл базы (под его
+    блокировкой записи), поэтому восстанавливать можно и при открытых
+    соединениях. Текущая база предварительно сохраняется в
+    <db_name>.before-restore, если keep_current. Клиентам после
+    восстановления следует перезапуститься: журнал изменений тоже
+    возвращается к состоянию снимка.
+    """
+    version = verify(path)
+    if keep_current and os.path.exists(db_name):
+        backup(db_name, db_name + '.before-restore', pause=0)
+    
+    source = _connect(path, read_only=True)
+    try:
+        target = _connect(db_name)
+        try:
+            source.backup(target)
+            problems = [row[0] for row in target.execute('PRAGMA quick_check')]
+        finally:
+            target.close()
+    finally:
+        source.close()
+    if problems != ['ok']:
+        raise BackupError(f"{db_name} после восстановления не прошёл проверку: "
+                          + "; ".join(problems[:5]))
+    return version
+
+class Snapshot:
+    """Снимок базы, загруженный в память только для чтения.
+    
+    Тяжёлые отчёты работают с копией и не читают рабочий файл. Снимок -
+    именованная база в памяти с общим кэшем, так что open() можно вызывать
+    из разных потоков (QueryExecutor с factory=db.clone). Если схема снимка
+    старше программы, миграции применяются к копии в памяти при загрузке.
+    Память освобождается, когда закрыты снимок и все открытые над ним Database.
+    """
+    
+    _numbers = itertools.count(1)
+    
+    def __init__(self, path, pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE):
+        self.path = path
+        self.db_name = f'file:snapshot-{os.getpid()}-{next(self._numbers)}?mode=memory&cache=shared'
+        # Соединение держит базу в памяти, пока снимок не закрыт
+        self._keeper = sqlite3.connect(self.db_name, uri=True, isolation_level=None,
+                                       check_same_thread=False)
+        source = _connect(path, read_only=True)
+        try:
+            copy_database(source, self._keeper, pages, pause)
+        finally:
+            source.close()
+        upgrade = Database(self.db_name, ConnectionManager(journal_mode=None))
+        upgrade.close()
+        self.manager = ConnectionManager(journal_mode=None, query_only=True)
+    
+    def open(self):
+        """Объект Database над снимком (только чтение)"""
+        return Database(self.db_name, self.manager)
+    
+    def close(self):
+        """Освобождение памяти снимка"""
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def main(argv=None):
+    """Командная строка: снимки, проверка и восстановление базы"""
+    parser = argparse.ArgumentParser(description="Резервное копирование базы системы учета")
+    parser.add_argument('--db', default='uchet.db', help="Путь к файлу базы данных")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    create = commands.add_parser('create', help="Снимок в каталог с удалением старых")
+    create.add_argument('--dir', default='backups', help="Каталог снимков")
+    create.add_argument('--keep', type=int, default=BACKUP_KEEP, help="Сколько снимков хранить")
+    
+    schedule = commands.add_parser('schedule', help="Плановые снимки до прерывания")
+    schedule.add_argument('--dir', default='backups', help="Каталог снимков")
+    schedule.add_argument('--keep', type=int, default=BACKUP_KEEP, help="Сколько снимков хранить")
+    schedule.add_argument('--interval', type=float, default=BACKUP_INTERVAL,
+                          help="Секунд между снимками")
+    
+    listing = commands.add_parser('list', help="Снимки в каталоге")
+    listing.add_argument('--dir', default='backups', help="Каталог снимков")
+    
+    check = commands.add_parser('verify', help="Проверка целостности снимка")
+    check.add_argument('snapshot')
+    
+    back = commands.add_parser('restore', help="Восстановление базы из снимка")
+    back.add_argument('snapshot')
+    back.add_argument('--no-keep-current', action='store_true',
+                      help="Не сохранять текущую базу в <db>.before-restore")
+    args = parser.parse_args(argv)
+    
+    try:
+        if args.command == 'create':
+            started = time.perf_counter()
+            path = snapshot(args.db, args.dir, args.keep)
+            print(f"Снимок {path} за {time.perf_counter() - started:.1f} с")
+        elif args.command == 'schedule':
+            while True:
+                time.sleep(seconds_until_due(args.dir, args.db, args.interval))
+                try:
+                    print(f"Снимок {snapshot(args.db, args.dir, args.keep)}", flush=True)
+                except (BackupError, sqlite3.Error, OSError) as e:
+                    print(f"Ошибка снимка: {e}", file=sys.stderr, flush=True)
+                    time.sleep(min(args.interval, 600))
+        elif args.command == 'list':
+            for taken, path in list_snapshots(args.dir, args.db):
+                print(f"{taken:%Y-%m-%d %H:%M:%S}  {os.path.getsize(path):>12}  {path}")
+        elif args.command == 'verify':
+            print(f"{args.snapshot}: целостность в порядке, версия схемы {verify(args.snapshot)}")
+        else:
+            version = restore(args.snapshot, args.db, keep_current=not args.no_keep_current)
+            print(f"База {args.db} восстановлена из {args.snapshot} (версия схемы {version})")
+    except KeyboardInterrupt:
+        pass
+    except (BackupError, sqlite3.Error, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+import analytics
+import backup
+from audit import audit_time
+from database import Database
+from datagen import generate
+from profiler import query_profiler
+import main as app
+
+# Замеры, которые изменяют данные: выполняются после всех замеров чтения
+WRITE_PREFIXES = ('create_', 'update_', 'archive_', 'write_')
+
+def _percentile(values, fraction):
+    """Перцентиль отсортированного списка"""
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+def measure(func, repeat, warmup=2):
+    """Время вызова func в миллисекундах: min, медиана, p95, среднее"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'calls': repeat,
+        'min_ms': round(timings[0], 4),
+        'median_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(_percentile(timings, 0.95), 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+    }
+
+def benchmarks(db):
+    """Набор замеров: имя -> функция без аргументов.
+    
+    Чтения выполняются для самого загруженного работника (худший случай).
+    Методы с кэшем замеряются дважды: с тёплым кэшем и со сбросом кэша
+    перед каждым вызовом (суффикс [cold]).
+    """
+    worker_id = db.conn.execute('''
+    SELECT assigned_to FROM tasks WHERE assigned_to IS NOT NULL
+    GROUP BY assigned_to ORDER BY COUNT(*) DESC LIMIT 1
+    ''').fetchone()[0]
+    manager_id = db.conn.execute("SELECT id FROM users WHERE role = 'manager' LIMIT 1").fetchone()
+    manager_id = manager_id[0] if manager_id else worker_id
+    project_id = db.conn.execute('SELECT MIN(id) FROM projects').fetchone()[0]
+    # Отдел с самым большим поддеревом и руководитель корневого отдела
+    department_id = db.conn.execute('''
+    SELECT ancestor_id FROM department_tree GROUP BY ancestor_id ORDER BY COUNT(*) DESC LIMIT 1
+    ''').fetchone()
+    department_id = department_id[0] if department_id else None
+    director_id = db.conn.execute('''
+    SELECT director_id FROM departments WHERE parent_id IS NULL AND director_id IS NOT NULL LIMIT 1
+    ''').fetchone()
+    director_id = director_id[0] if director_id else manager_id
+    task_ids = [row[0] for row in db.conn.execute('SELECT id FROM tasks ORDER BY id LIMIT 1000')]
+    counter = iter(range(10 ** 9))
+    deadline_until = (date.today() + timedelta(days=3)).isoformat()
+    audit_event = (audit_time(), worker_id, 'update_task_status', 'task', task_ids[0],
+                   '{"status": "in_progress"}')
+    
+    def cold(func):
+        def run():
+            db.cache.invalidate()
+            return func()
+        return run
+    
+    def startup(user_id, role):
+        # Путь данных от входа до первой вкладки: открытие базы, вход, дашборд
+        session = Database(db.db_name, db.manager)
+        try:
+            session.authenticate_user('admin', 'admin123')
+            return app.fetch_dashboard_stats(session, user_id, role)
+        finally:
+            session.close()
+    
+    def update_task_status():
+        task_id = task_ids[next(counter) % len(task_ids)]
+        db.update_task_status(task_id, 'in_progress')
+    
+    def update_tasks_status():
+        # Пакет из 100 задач с чередованием статуса, чтобы каждый вызов менял строки
+        status = ('pending', 'in_progress')[next(counter) % 2]
+        db.update_tasks_status(task_ids[:100], status)
+    
+    return {
+        'authenticate_user': lambda: db.authenticate_user('admin', 'admin123'),
+        'get_user_by_id': lambda: db.get_user_by_id(worker_id),
+        'get_user_by_id[cold]': cold(lambda: db.get_user_by_id(worker_id)),
+        'get_all_users': db.get_all_users,
+        'get_all_users[cold]': cold(db.get_all_users),
+        'get_projects': db.get_projects,
+        'get_projects[cold]': cold(db.get_projects),
+        'get_tasks_by_user': lambda: db.get_tasks_by_user(worker_id),
+        'get_projects_page': lambda: db.get_projects_page(),
+        'get_tasks_by_user_page': lambda: db.get_tasks_by_user_page(worker_id),
+        'get_tasks_by_user_page[archive]': lambda: db.get_tasks_by_user_page(worker_id,
+                                                                             include_archived=True),
+        'create_user': lambda: db.create_user(f'bench{next(counter)}', 'pass', 'worker', 'Бенчмарк'),
+        'create_project': lambda: db.create_project('Бенчмарк', 'Проект для замеров', '2024-01-01',
+                                                    '2024-12-31', 1000, None),
+        'create_task': lambda: db.create_task('Бенчмарк', 'Задача для замеров', project_id,
+                                              worker_id, 'medium', '2024-12-31'),
+        'update_task_status': update_task_status,
+        'update_tasks_status[100]': update_tasks_status,
+        # Синхронная запись строки аудита на каждое действие против пакета очереди
+        'write_audit_events[1]': lambda: db.write_audit_events([audit_event]),
+        'write_audit_events[200]': lambda: db.write_audit_events([audit_event] * 200),
+        'search': lambda: db.search('отчёт сервер', limit=50),
+        'get_deadlines': lambda: db.get_deadlines(worker_id, deadline_until),
+        'get_child_departments': lambda: db.get_child_departments(),
+        'get_department_members[subtree]': lambda: db.get_department_members(
+            department_id, subtree=True),
+        'get_users_under_director': lambda: db.get_users_under_director(director_id),
+        # После первого вызова переносить нечего: замеряется поиск кандидатов при запуске
+        'archive_old_records': db.archive_old_records,
+        # Данные, которые запрашивают вкладки главного окна (без отрисовки Tk)
+        'view.load_dashboard[worker]': lambda: app.fetch_dashboard_stats(db, worker_id, 'worker'),
+        'view.load_dashboard[manager]': lambda: app.fetch_dashboard_stats(db, manager_id, 'manager'),
+        'view.startup[worker]': lambda: startup(worker_id, 'worker'),
+        'view.startup[manager]': lambda: startup(manager_id, 'manager'),
+        'view.load_projects': lambda: db.get_projects_page(),
+        'view.load_tasks': lambda: db.get_tasks_by_user_page(worker_id),
+        'view.load_board': db.get_board_projects,
+        'view.board_assignees': lambda: db.get_board_assignees(project_id),
+        'view.board_tasks': lambda: db.get_board_tasks_page(project_id, worker_id),
+        'view.load_analytics': lambda: analytics.analyze(db),
+        'view.load_analytics[cold]': cold(lambda: analytics.analyze(db)),
+        'view.burndown': lambda: analytics.burndown(db, project_id),
+    }
+
+def run(db, repeat=20, only=None):
+    """Выполнение всех замеров; only - список имён для выборочного запуска"""
+    cases = benchmarks(db)
+    # Чтения замеряются на исходных данных, записи - последними
+    names = sorted(cases, key=lambda name: name.startswith(WRITE_PREFIXES))
+    results = {}
+    for name in names:
+        if only and name not in only:
+            continue
+        results[name] = measure(cases[name], repeat)
+    return results
+
+def working_copy(path):
+    """Проверенная копия файла базы во временном каталоге: замеры записи не меняют path"""
+    fd, copy_path = tempfile.mkstemp(prefix='benchmark-', suffix='.db')
+    os.close(fd)
+    return backup.backup(path, copy_path, pause=0)
+
+def remove_copy(copy_path):
+    """Удаление временной копии вместе с файлами журнала"""
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(copy_path + suffix):
+            os.remove(copy_path + suffix)
+
+def dataset_size(db):
+    """Размер данных, на которых выполнялись замеры"""
+    return {table: db.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in ('users', 'departments', 'projects', 'tasks')}
+
+def compare(results, baseline):
+    """Текстовое сравнение медиан с результатами предыдущего выпуска"""
+    lines = [f"{'замер':<32}{'было, мс':>12}{'стало, мс':>12}{'отношение':>12}"]
+    for name, stats in results.items():
+        old = baseline.get('results', {}).get(name)
+        if old is None:
+            lines.append(f"{name:<32}{'-':>12}{stats['median_ms']:>12.3f}{'-':>12}")
+            continue
+        ratio = stats['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        lines.append(f"{name:<32}{old['median_ms']:>12.3f}{stats['median_ms']:>12.3f}{ratio:>12.2f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    """Командная строка бенчмарка"""
+    parser = argparse.ArgumentParser(description="Замеры производительности слоя Database")
+    parser.add_argument('--db', default=':memory:',
+                        help="База для замеров (по умолчанию в памяти); существующий "
+                             "файл не изменяется, замеры идут на его копии")
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--projects', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--only', nargs='*', help="Имена замеров для выборочного запуска")
+    parser.add_argument('--output', help="Файл для результатов в формате JSON")
+    parser.add_argument('--compare', help="JSON с результатами предыдущего выпуска")
+    parser.add_argument('--profile', action='store_true',
+                        help="Замеры с включённым профилированием запросов (оценка его издержек)")
+    args = parser.parse_args(argv)
+    
+    copy_path = None
+    if args.db != ':memory:' and os.path.exists(args.db):
+        copy_path = working_copy(args.db)
+    db = Database(copy_path or args.db)
+    try:
+        # Синтетические данные создаются, только если в базе ещё нет задач
+        if db.conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0] == 0:
+            generate(db, users=args.users, projects=args.projects, tasks=args.tasks, seed=args.seed)
+        if args.profile:
+            query_profiler.enable()
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'db': args.db,
+                'seed': args.seed,
+                'dataset': dataset_size(db),
+                'repeat': args.repeat,
+                'profile': args.profile,
+            },
+            'results': run(db, args.repeat, args.only),
+        }
+        if args.profile:
+            report['profile'] = query_profiler.snapshot()
+    finally:
+        db.close()
+        if copy_path is not None:
+            remove_copy(copy_path)
+    
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(report['results'], json.load(f)), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import argparse
+import functools
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+from server import API_METHODS, from_json
+
+class RemoteError(Exception):
+    """Ошибка, которую вернул сервер API, или недоступность сервера"""
+
+class RemoteDatabase:
+    """Клиент сервера API с интерфейсом объекта Database.
+    
+    Главное окно работает с ним так же, как с локальной базой: методы из
+    server.API_METHODS выполняются на сервере и возвращают те же записи
+    (Project, Task и т.д.). Объект держит одно HTTP-соединение с keep-alive
+    и не потокобезопасен: рабочим потокам нужны собственные копии (clone()).
+    """
+    
+    conn = None  # собственного соединения с SQLite у клиента нет
+    
+    def __init__(self, url, token=None, timeout=30):
+        parts = urlsplit(url)
+        self.url = url
+        self.db_name = url
+        self.manager = None
+        self.token = token
+        self.timeout = timeout
+        self._host = parts.hostname or '127.0.0.1'
+        self._port = parts.port or 80
+        self._http = None
+    
+    def _request(self, path, payload):
+        """POST запроса JSON; возвращает (HTTP-статус, данные ответа)"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        
+        for attempt in range(2):
+            reused = self._http is not None
+            if self._http is None:
+                self._http = http.client.HTTPConnection(self._host, self._port, timeout=self.timeout)
+            try:
+                self._http.request('POST', path, body, headers)
+                response = self._http.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                self._http.close()
+                self._http = None
+                # Сервер мог закрыть простаивавшее соединение - повтор по новому
+                if not reused or attempt:
+                    raise RemoteError(f"Сервер {self.url} недоступен: {e}") from e
+        
+        try:
+            data = json.loads(data) if data else {}
+        except ValueError:
+            raise RemoteError(f"Некорректный ответ сервера (HTTP {response.status})")
+        return response.status, data
+    
+    def call(self, name, *args, **kwargs):
+        """Вызов метода Database на сервере"""
+        status, data = self._request(f'/api/{name}', {'args': list(args), 'kwargs': kwargs})
+        if status != 200:
+            raise RemoteError(data.get('error') or f"HTTP {status}")
+        return from_json(data['result'])
+    
+    def __getattr__(self, name):
+        if name in API_METHODS:
+            return functools.partial(self.call, name)
+        raise AttributeError(f"Метод {name} недоступен при работе через сервер")
+    
+    def authenticate_user(self, username, password):
+        """Вход на сервере; при успехе токен сохраняется для следующих запросов"""
+        status, data = self._request('/api/login', {'username': username, 'password': password})
+        if status == 401:
+            return None
+        if status != 200:
+            raise RemoteError(data.get('error') or f"HTTP {status}")
+        self.token = data['token']
+        return from_json(data['user'])
+    
+    def clone(self):
+        """Копия клиента с тем же токеном (для другого потока)"""
+        return RemoteDatabase(self.url, self.token, self.timeout)
+    
+    def close(self):
+        """Закрытие HTTP-соединения"""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+def load_test(url, username, password, clients=8, seconds=10.0, write_share=0.1):
+    """Нагрузочная проверка сервера: clients потоков в течение seconds секунд.
+    
+    Каждый клиент входит в систему и в цикле читает страницы проектов и своих
+    задач, счётчики дашборда и журнал изменений; доля write_share запросов -
+    смена статуса задачи. Возвращает {операция: статистика задержек, мс}.
+    """
+    timings = {}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    
+    def client():
+        db = RemoteDatabase(url)
+        user = db.authenticate_user(username, password)
+        if user is None:
+            errors.append("вход не выполнен")
+            return
+        tasks = [task.id for task in db.get_tasks_by_user_page(user.id)[0]]
+        rng = random.Random()
+        operations = {
+            'get_projects_page': lambda: db.get_projects_page(),
+            'get_tasks_by_user_page': lambda: db.get_tasks_by_user_page(user.id),
+            'get_task_status_counts': lambda: db.get_task_status_counts(user_id=user.id),
+            'get_changes_since': lambda: db.get_changes_since(0, limit=100),
+        }
+        local = {}
+        try:
+            while time.monotonic() < deadline:
+                if tasks and rng.random() < write_share:
+                    name = 'update_task_status'
+                    func = lambda: db.update_task_status(rng.choice(tasks),
+                                                         rng.choice(['pending', 'in_progress']))
+                else:
+                    name, func = rng.choice(list(operations.items()))
+                started = time.perf_counter()
+                try:
+                    func()
+                except RemoteError as e:
+                    errors.append(str(e))
+                    continue
+                local.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+            with lock:
+                for name, values in local.items():
+                    timings.setdefault(name, []).extend(values)
+    
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    report = {}
+    for name, values in sorted(timings.items()):
+        values.sort()
+        report[name] = {
+            'calls': len(values),
+            'per_second': round(len(values) / seconds, 1),
+            'median_ms': round(statistics.median(values), 3),
+            'p95_ms': round(values[int(0.95 * (len(values) - 1))], 3),
+        }
+    report['_total'] = {'calls': sum(len(values) for values in timings.values()),
+                        'errors': len(errors)}
+    return report
+
+def main(argv=None):
+    """Командная строка: нагрузочная проверка сервера API"""
+    parser = argparse.ArgumentParser(description="Нагрузочная проверка сервера API системы учета")
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--write-share', type=float, default=0.1)
+    args = parser.parse_args(argv)
+    
+    report = load_test(args.url, args.username, args.password, args.clients, args.seconds,
+                       args.write_share)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 1 if report['_total']['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,456 @@
 import sqlite3
 from datetime import datetime
 import hashlib
+import os
+import sys
+import threading
+import time
+import argparse
+import csv
+import heapq
+import json
+import re
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from audit import AuditQueue, audit_time
+from profiler import query_profiler
+from xlsx import XlsxWriter
+
+# Допустимые статусы задач
+TASK_STATUSES = ('pending', 'in_progress', 'completed')
+
+# Числовой ранг приоритета: чем меньше число, тем важнее задача
+PRIORITY_RANKS = {'critical': 1, 'high': 2, 'medium': 3, 'low': 4}
+DEFAULT_PRIORITY_RANK = 5
+
+def priority_rank(priority):
+    """Числовой ранг для текстового приоритета"""
+    return PRIORITY_RANKS.get(priority, DEFAULT_PRIORITY_RANK)
+
+def priority_rank_sql(column):
+    """SQL-выражение CASE, вычисляющее ранг по колонке приоритета"""
+    cases = ' '.join(f"WHEN '{name}' THEN {rank}" for name, rank in PRIORITY_RANKS.items())
+    return f'CASE {column} {cases} ELSE {DEFAULT_PRIORITY_RANK} END'
+
+def fts_query(text):
+    """Запрос FTS5 из введённого пользователем текста.
+    
+    Каждое слово ищется как префикс ("слово"*), все слова должны встретиться.
+    Служебный синтаксис FTS5 (кавычки, операторы) из ввода не передаётся.
+    """
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+# Изменения строк списка: текущие строки (добавленные или изменённые) и id
+# строк, которых в списке больше нет (удалены или перестали подходить)
+RowChanges = namedtuple('RowChanges', ['rows', 'deleted'])
+
+# Записи, которые возвращают запросы. Каждый запрос выбирает только нужные
+# вызывающему коду колонки (первые поля записи); невыбранные поля равны None.
+# Первое поле - id записи.
+User = namedtuple('User', ['id', 'username', 'role', 'full_name', 'email', 'phone',
+                           'created_at', 'is_active'], defaults=(None,) * 4)
+Project = namedtuple('Project', ['id', 'name', 'organizer_name', 'start_date', 'end_date',
+                                 'budget', 'status', 'description', 'organizer_id'],
+                     defaults=(None,) * 2)
+Task = namedtuple('Task', ['id', 'title', 'project_name', 'priority', 'deadline', 'status',
+                           'description', 'project_id', 'assigned_to', 'created_at'],
+                  defaults=(None,) * 4)
+Department = namedtuple('Department', ['id', 'name', 'director_id', 'director_name',
+                                       'parent_id', 'child_count', 'member_count'],
+                        defaults=(None,) * 3)
+
+# Строка результатов поиска: ключ вида 'task:12' уникален в выдаче
+SearchHit = namedtuple('SearchHit', ['key', 'kind', 'id', 'title', 'snippet', 'score'])
+
+# Группа доски задач команды (проект или исполнитель в проекте) с числом задач
+# по статусам; id 0 - задачи без проекта или без исполнителя
+BoardGroup = namedtuple('BoardGroup', ['id', 'name', 'total', 'pending', 'in_progress',
+                                       'completed'])
+
+# Событие журнала аудита: время в UTC, кто (user_name - текущее имя пользователя),
+# действие, над какой записью и подробности в JSON
+AuditEvent = namedtuple('AuditEvent', ['id', 'occurred_at', 'user_id', 'user_name', 'action',
+                                       'entity', 'entity_id', 'details'])
+
+def record_factory(record):
+    """row_factory курсора, собирающий строки в записи record"""
+    def factory(cursor, row):
+        return record(*row)
+    return factory
+
+def project_sort_key(row):
+    """Ключ сортировки строки проекта (как в get_projects): статус, дата окончания, id"""
+    return (row.status, row.end_date, row.id)
+
+def task_sort_key(row):
+    """Ключ сортировки строки задачи (как в get_tasks_by_user): ранг, дедлайн, id"""
+    return (priority_rank(row.priority), row.deadline, row.id)
+
+# Результат массовой вставки: число добавленных строк и список
+# отклонённых записей в виде (номер записи, запись, причина)
+BulkResult = namedtuple('BulkResult', ['inserted', 'errors'])
+
+# Сколько записей отправляется в одном executemany
+BULK_CHUNK_SIZE = 500
+
+# Размер страницы для постраничной (keyset) выборки
+PAGE_SIZE = 200
+
+# Сколько строк читается одним fetchmany при выгрузке
+EXPORT_CHUNK_SIZE = 1000
+
+# Колонки выгружаемых данных (заголовки файлов выгрузки)
+EXPORT_COLUMNS = {
+    'users': ('id', 'username', 'role', 'full_name', 'email', 'phone', 'created_at', 'is_active'),
+    'projects': ('id', 'name', 'description', 'organizer', 'start_date', 'end_date',
+                 'budget', 'status'),
+    'tasks': ('id', 'title', 'description', 'project', 'assignee', 'priority', 'status',
+              'deadline', 'created_at'),
+}
+
+# Архив: выполненные задачи и закрытые проекты старше ARCHIVE_AFTER_DAYS дней
+# переносятся из рабочих таблиц в tasks_archive и projects_archive
+ARCHIVE_AFTER_DAYS = 365
+CLOSED_PROJECT_STATUSES = ('closed', 'completed')
+ARCHIVE_CHUNK_SIZE = 2000  # строк в одной транзакции переноса
+ARCHIVE_COLUMNS = {
+    'tasks': ('id', 'title', 'description', 'project_id', 'assigned_to', 'priority', 'status',
+              'deadline', 'created_at', 'priority_rank'),
+    'projects': ('id', 'name', 'description', 'start_date', 'end_date', 'budget', 'status',
+                 'organizer_id'),
+}
+
+# Выборки для списков проектов и задач. Таблица проектов подставляется
+# (projects или projects_archive); проект архивной задачи может быть ещё
+# в рабочей таблице или уже в архиве.
+PROJECT_SELECT = '''
+SELECT p.id, p.name, u.full_name AS organizer_name, p.start_date, p.end_date,
+       p.budget, p.status
+FROM {table} p
+LEFT JOIN users u ON p.organizer_id = u.id
+'''
+TASK_SELECT = '''
+SELECT t.id, t.title, p.name AS project_name, t.priority, t.deadline, t.status
+FROM tasks t
+LEFT JOIN projects p ON t.project_id = p.id
+'''
+ARCHIVED_TASK_SELECT = '''
+SELECT t.id, t.title, IFNULL(p.name, pa.name) AS project_name, t.priority, t.deadline, t.status
+FROM tasks_archive t
+LEFT JOIN projects p ON t.project_id = p.id
+LEFT JOIN projects_archive pa ON t.project_id = pa.id
+'''
+
+AUDIT_SELECT = '''
+SELECT a.id, a.occurred_at, a.user_id, u.full_name, a.action, a.entity, a.entity_id, a.details
+FROM audit_log a LEFT JOIN users u ON a.user_id = u.id
+'''
+
+AUDIT_INSERT = '''
+INSERT INTO audit_log (occurred_at, user_id, action, entity, entity_id, details)
+VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+def _keyset_conditions(columns, key):
+    """Условия выборки строк, идущих после ключа key при сортировке по columns.
+    
+    Возвращает список пар (условие, параметры) в порядке сортировки. Если в ключе
+    нет NULL, это одно сравнение кортежей, которое SQLite выполняет поиском по
+    индексу. NULL в ключе (NULL сортируется первым) разбивает выборку на несколько
+    диапазонов, каждый из которых тоже читается по индексу.
+    """
+    if key is None:
+        return [('1', [])]
+    key = list(key)
+    if None not in key:
+        return [(f"({', '.join(columns)}) > ({', '.join('?' * len(key))})", key)]
+    
+    j = key.index(None)
+    prefix = [f'{column} = ?' for column in columns[:j]]
+    prefix_params = key[:j]
+    
+    conditions = []
+    # Тот же префикс, NULL в колонке j, дальше по оставшимся колонкам
+    for condition, params in _keyset_conditions(columns[j + 1:], key[j + 1:]):
+        parts = prefix + [f'{columns[j]} IS NULL', condition]
+        conditions.append((' AND '.join(parts), prefix_params + params))
+    # Тот же префикс, любое непустое значение в колонке j
+    conditions.append((' AND '.join(prefix + [f'{columns[j]} IS NOT NULL']), prefix_params))
+    # Префикс больше ключевого
+    if j:
+        conditions.extend(_keyset_conditions(columns[:j], key[:j]))
+    return conditions
+
+def _merge_sorted(first, second, sort_key, limit=None):
+    """Слияние двух списков записей, уже отсортированных по sort_key (NULL первым)"""
+    def comparable(row):
+        return tuple((value is not None, value) for value in sort_key(row))
+    return list(islice(heapq.merge(first, second, key=comparable), limit))
+
+def _optional(record, key):
+    """Значение необязательного поля записи; пустая строка из CSV считается NULL"""
+    value = record.get(key)
+    return None if value == '' else value
+
+def _optional_number(record, key, kind):
+    """Необязательное числовое поле записи"""
+    value = _optional(record, key)
+    return None if value is None else kind(value)
+
+class QueryCache:
+    """Кэш результатов чтения редко меняющихся справочных данных.
+    
+    Записи вытесняются по времени жизни (ttl, секунды) и по размеру (самые
+    давно использованные). Каждая запись помечена таблицами, из которых
+    прочитана, чтобы запись в таблицу сбрасывала только зависящие от неё
+    результаты. data_version - последнее значение PRAGMA data_version, по
+    которому замечаются изменения, сделанные другими соединениями.
+    """
+    
+    def __init__(self, max_size=128, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data_version = None
+        self._entries = OrderedDict()  # ключ -> (момент устаревания, таблицы, значение)
+    
+    def get(self, key):
+        """Поиск в кэше: (найдено, значение)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, _, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+    
+    def put(self, key, tables, value):
+        """Сохранение результата, прочитанного из таблиц tables"""
+        self._entries[key] = (time.monotonic() + self.ttl, frozenset(tables), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, *tables):
+        """Сброс результатов, зависящих от таблиц (без аргументов - всего кэша)"""
+        if not tables:
+            self._entries.clear()
+            return
+        for key, (_, entry_tables, _) in list(self._entries.items()):
+            if entry_tables.intersection(tables):
+                del self._entries[key]
+
+class ConnectionManager:
+    """Общие соединения с SQLite.
+    
+    Для каждого файла базы и каждого потока держится одно соединение, которое
+    переиспользуют все объекты Database (окно входа, главное окно и т.д.).
+    Соединение закрывается, когда его освободил последний владелец.
+    
+    Новые соединения настраиваются на журнал WAL (читатели не блокируют
+    писателя) и ожидание занятой базы вместо немедленной ошибки "database is
+    locked". WAL требует общей памяти между процессами одной машины; если
+    uchet.db лежит в сетевой папке, к которой обращаются разные компьютеры,
+    следует передать journal_mode='delete'. С query_only=True соединения
+    открываются только для чтения (например, для снимка базы в памяти).
+    
+    Там же живёт общая для всех потоков очередь событий аудита каждого файла
+    базы (audit_queue): события разных окон и потоков записываются вместе
+    через отдельное соединение-писатель, которое фиксирует каждый пакет
+    своей транзакцией.
+    """
+    
+    def __init__(self, busy_timeout=5000, journal_mode='wal', query_only=False):
+        self.busy_timeout = busy_timeout
+        self.journal_mode = journal_mode
+        self.query_only = query_only
+        self._lock = threading.Lock()
+        self._connections = {}  # (путь, поток) -> [соединение, число владельцев, кэш]
+        self._audit_queues = {}  # путь -> AuditQueue
+        self._audit_connections = {}  # путь -> соединение, которым пишет очередь аудита
+    
+    def _key(self, db_name):
+        if db_name == ':memory:' or db_name.startswith('file:'):
+            path = db_name
+        else:
+            path = os.path.abspath(db_name)
+        return path, threading.get_ident()
+    
+    def _open(self, db_name, check_same_thread=True):
+        """Открытие и настройка нового соединения"""
+        conn = sqlite3.connect(db_name, timeout=self.busy_timeout / 1000,
+                               uri=db_name.startswith('file:'),
+                               check_same_thread=check_same_thread)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout)}')
+        if self.journal_mode:
+            conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+            if self.journal_mode.lower() == 'wal':
+                # В режиме WAL NORMAL сохраняет целостность и убирает fsync на каждый коммит
+                conn.execute('PRAGMA synchronous = NORMAL')
+        if self.query_only:
+            conn.execute('PRAGMA query_only = ON')
+        return conn
+    
+    def acquire(self, db_name):
+        """Получение соединения для текущего потока"""
+        key = self._key(db_name)
+        with self._lock:
+            entry = self._connections.get(key)
+            if entry is None:
+                entry = self._connections[key] = [self._open(db_name), 0, QueryCache()]
+            entry[1] += 1
+            return entry[0]
+    
+    def cache_for(self, conn):
+        """Кэш запросов, общий для всех владельцев соединения"""
+        with self._lock:
+            for entry in self._connections.values():
+                if entry[0] is conn:
+                    return entry[2]
+        return QueryCache()
+    
+    def release(self, conn):
+        """Освобождение соединения; последний владелец закрывает его"""
+        with self._lock:
+            for key, entry in self._connections.items():
+                if entry[0] is conn:
+                    entry[1] -= 1
+                    if entry[1] <= 0:
+                        del self._connections[key]
+                        conn.close()
+                    return
+        conn.close()
+    
+    def audit_queue(self, db_name):
+        """Очередь событий аудита файла базы (создаётся при первом событии)"""
+        path = self._key(db_name)[0]
+        with self._lock:
+            audit = self._audit_queues.get(path)
+            if audit is None:
+                audit = self._audit_queues[path] = AuditQueue(
+                    lambda events: self._write_audit(db_name, events))
+            return audit
+    
+    def _write_audit(self, db_name, events):
+        """Запись пакета событий аудита отдельным соединением одной транзакцией.
+        
+        Соединение открывается при первом пакете и служит только очереди,
+        поэтому запись не присоединяется к транзакции вызывающего потока.
+        Очередь пишет пакеты по одному, так что соединение не используется
+        из разных потоков одновременно.
+        """
+        path = self._key(db_name)[0]
+        conn = self._audit_connections.get(path)
+        if conn is None:
+            conn = self._audit_connections[path] = self._open(db_name, check_same_thread=False)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(AUDIT_INSERT, events)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    
+    def flush_audit(self, db_name=None):
+        """Запись накопленных событий аудита файла db_name (без него - всех файлов).
+        
+        Внутри batch() или transaction() того же потока вызывать не следует:
+        писатель очереди будет ждать освобождения блокировки записи.
+        """
+        with self._lock:
+            if db_name is None:
+                queues = list(self._audit_queues.values())
+            else:
+                queues = [self._audit_queues.get(self._key(db_name)[0])]
+        for audit in queues:
+            if audit is not None:
+                audit.flush()
+    
+    def close_all(self):
+        """Закрытие всех соединений (при выходе из приложения)"""
+        with self._lock:
+            queues = list(self._audit_queues.values())
+        for audit in queues:
+            audit.close()
+        with self._lock:
+            writers, self._audit_connections = self._audit_connections, {}
+        for conn in writers.values():
+            conn.close()
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for conn, _, _ in connections.values():
+            conn.close()
+
+# Менеджер соединений по умолчанию, общий для всего приложения
+connection_manager = ConnectionManager()
 
 class Database:
-    def __init__(self, db_name='uchet.db'):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
-        self.create_tables()
+    # Упорядоченный список миграций схемы. Номер версии (PRAGMA user_version)
+    # равен числу применённых миграций; новые миграции добавляются только в конец.
+    MIGRATIONS = (
+        '_migration_base_schema',
+        '_migration_priority_rank',
+        '_migration_seed_data',
+        '_migration_dashboard_counters',
+        '_migration_change_log',
+        '_migration_full_text_search',
+        '_migration_archive',
+        '_migration_deadline_index',
+        '_migration_project_deadline_index',
+        '_migration_department_hierarchy',
+        '_migration_team_board_index',
+        '_migration_audit_log',
+    )
+    SCHEMA_VERSION = len(MIGRATIONS)
     
-    def create_tables(self):
-        """Создание всех необходимых таблиц"""
+    def __init__(self, db_name='uchet.db', manager=None):
+        self.db_name = db_name
+        self.manager = manager or connection_manager
+        self.actor_id = None  # пользователь, от имени которого пишутся события аудита
+        self.conn = self.manager.acquire(db_name)
+        self.cache = self.manager.cache_for(self.conn)
+        self._batch_depth = 0
+        self.migrate()
+        query_profiler.register(self)
+    
+    def schema_version(self):
+        """Текущая версия схемы базы данных"""
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+    
+    def migrate(self):
+        """Применение недостающих миграций схемы.
+        
+        Для уже инициализированной базы это одно чтение PRAGMA user_version.
+        Каждая миграция выполняется в отдельной транзакции вместе с повышением
+        версии, поэтому прерванный запуск не оставляет базу в промежуточном виде.
+        """
+        current = self.schema_version()
+        if current >= self.SCHEMA_VERSION:
+            return
+        
+        for version, name in enumerate(self.MIGRATIONS[current:], start=current + 1):
+            cursor = self.conn.cursor()
+            # Блокировка на запись: другой клиент мог успеть применить миграцию
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                if cursor.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    self.conn.rollback()
+                    continue
+                getattr(self, name)(cursor)
+                cursor.execute(f'PRAGMA user_version = {version}')
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+    
+    def _migration_base_schema(self, cursor):
+        """Миграция 1: создание основных таблиц"""
         
         # Таблица пользователей
-        self.cursor.execute('''
+        cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
@@ -27,7 +465,7 @@ class Database:
         ''')
         
         # Таблица отделов
-        self.cursor.execute('''
+        cursor.execute('''
         CREATE TABLE IF NOT EXISTS departments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -37,7 +475,7 @@ class Database:
         ''')
         
         # Таблица проектов
-        self.cursor.execute('''
+        cursor.execute('''
         CREATE TABLE IF NOT EXISTS projects (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -52,7 +490,7 @@ class Database:
         ''')
         
         # Таблица задач
-        self.cursor.execute('''
+        cursor.execute('''
         CREATE TABLE IF NOT EXISTS tasks (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
@@ -63,12 +501,635 @@ class Database:
             status TEXT DEFAULT 'pending',
             deadline DATE,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            priority_rank INTEGER NOT NULL DEFAULT 5,
             FOREIGN KEY (project_id) REFERENCES projects (id),
             FOREIGN KEY (assigned_to) REFERENCES users (id)
         )
         ''')
+    
+    def _migration_priority_rank(self, cursor):
+        """Миграция 2: ранг приоритета задач и индексы для списков"""
+        
+        # Ранг приоритета для баз, созданных до его появления
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(tasks)')]
+        if 'priority_rank' not in columns:
+            cursor.execute(
+                'ALTER TABLE tasks ADD COLUMN priority_rank INTEGER NOT NULL DEFAULT 5')
+            cursor.execute(
+                f'UPDATE tasks SET priority_rank = {priority_rank_sql("priority")}')
+        
+        # Ранг пересчитывается при любом изменении приоритета
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_priority_rank
+        AFTER UPDATE OF priority ON tasks
+        BEGIN
+            UPDATE tasks SET priority_rank = {priority_rank_sql("NEW.priority")}
+            WHERE id = NEW.id;
+        END
+        ''')
+        # и при вставке, если вставка передала неверный ранг (импорт, SQL вручную);
+        # вставки с рангом из priority_rank() лишнего UPDATE не делают
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_priority_rank_insert
+        AFTER INSERT ON tasks
+        WHEN NEW.priority_rank IS NOT {priority_rank_sql("NEW.priority")}
+        BEGIN
+            UPDATE tasks SET priority_rank = {priority_rank_sql("NEW.priority")}
+            WHERE id = NEW.id;
+        END
+        ''')
+        
+        # Индексы: "мои задачи" и вкладка проектов читаются по индексу в нужном порядке
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_assignee_priority
+        ON tasks (assigned_to, priority_rank, deadline)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks (project_id)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_projects_status_end
+        ON projects (status, end_date)
+        ''')
+    
+    def _migration_seed_data(self, cursor):
+        """Миграция 3: начальные данные (применяется один раз)"""
+        
+        # Тестовые пользователи
+        users = [
+            ('admin', 'admin123', 'admin', 'Администратор Системы', 'admin@company.com'),
+            ('director', 'dir123', 'director', 'Иванов Иван Иванович', 'director@company.com'),
+            ('manager1', 'mgr123', 'manager', 'Петров Петр Петрович', 'manager1@company.com'),
+            ('worker1', 'wrk123', 'worker', 'Сидоров Алексей', 'worker1@company.com'),
+            ('organizer1', 'org123', 'organizer', 'Козлова Мария', 'organizer1@company.com'),
+        ]
+        cursor.executemany('''
+        INSERT OR IGNORE INTO users (username, password_hash, role, full_name, email)
+        VALUES (?, ?, ?, ?, ?)
+        ''', [(username, self.hash_password(password), role, full_name, email)
+              for username, password, role, full_name, email in users])
+        
+        def user_id(username):
+            row = cursor.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+            return row[0] if row else None
+        
+        # Отделы и проект добавляются только в пустую базу: в базах, созданных
+        # до появления миграций, они уже есть (часто в нескольких копиях)
+        if cursor.execute('SELECT COUNT(*) FROM departments').fetchone()[0] == 0:
+            cursor.executemany('''
+            INSERT INTO departments (name, director_id) VALUES (?, ?)
+            ''', [('Отдел разработки', user_id('director')),
+                  ('Отдел маркетинга', user_id('manager1'))])
+        
+        if cursor.execute('SELECT COUNT(*) FROM projects').fetchone()[0] == 0:
+            cursor.execute('''
+            INSERT INTO projects (name, description, start_date, end_date, budget, organizer_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', ('Разработка новой системы', 'Создание системы управления проектами',
+                  '2024-01-01', '2024-06-30', 500000, user_id('organizer1')))
+    
+    @contextmanager
+    def transaction(self):
+        """Транзакция на запись: все изменения внутри фиксируются одним коммитом.
+        
+        Если транзакция уже открыта, изменения просто присоединяются к ней.
+        """
+        if self.conn.in_transaction:
+            yield self.conn
+            return
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+    
+    @contextmanager
+    def batch(self):
+        """Пакет записей в одной транзакции.
+        
+        Методы записи внутри пакета не фиксируют изменения по отдельности:
+        всё фиксируется одним коммитом в конце, что дешевле для потока
+        мелких записей от многих клиентов.
+        """
+        self._batch_depth += 1
+        try:
+            with self.transaction():
+                yield self.conn
+        finally:
+            self._batch_depth -= 1
+    
+    def _commit(self):
+        """Фиксация изменений метода записи (внутри batch() - в конце пакета)"""
+        if not self._batch_depth:
+            self.conn.commit()
+    
+    def clone(self):
+        """Новый объект Database для той же базы (например, для другого потока)"""
+        db = Database(self.db_name, self.manager)
+        db.actor_id = self.actor_id
+        return db
+    
+    def _cached(self, key, tables, load):
+        """Чтение через кэш: load() выполняется только при промахе.
+        
+        Перед чтением сверяется PRAGMA data_version: если другое соединение
+        (другой клиент или поток) зафиксировало изменения, кэш сбрасывается.
+        Собственные изменения сбрасывают кэш явно в методах записи.
+        """
+        data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self.cache.data_version:
+            self.cache.invalidate()
+            self.cache.data_version = data_version
+        
+        found, value = self.cache.get(key)
+        if not found:
+            value = load()
+            self.cache.put(key, tables, value)
+        return value
+    
+    def _records(self, record, sql, params=()):
+        """Курсор запроса, строки которого собираются в записи record"""
+        cursor = self.conn.execute(sql, params)
+        cursor.row_factory = record_factory(record)
+        return cursor
+    
+    def _bulk_insert(self, sql, records, to_params, chunk_size=BULK_CHUNK_SIZE):
+        """Массовая вставка записей в одной транзакции.
+        
+        Записи читаются из итератора пачками по chunk_size и вставляются через
+        executemany. Если пачка нарушает ограничение (например, повтор логина),
+        она откатывается до точки сохранения и вставляется построчно, чтобы
+        отклонить только конфликтующие записи, а не всю загрузку.
+        """
+        inserted = 0
+        errors = []
+        records = enumerate(records)
+        with self.transaction():
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                
+                rows = []
+                for index, record in chunk:
+                    try:
+                        rows.append((index, record, to_params(record)))
+                    except (KeyError, TypeError, ValueError, AttributeError) as e:
+                        errors.append((index, record, f"Неверная запись: {e!r}"))
+                if not rows:
+                    continue
+                
+                self.conn.execute('SAVEPOINT bulk_chunk')
+                try:
+                    inserted += self.conn.executemany(sql, [params for _, _, params in rows]).rowcount
+                except sqlite3.IntegrityError:
+                    self.conn.execute('ROLLBACK TO bulk_chunk')
+                    for index, record, params in rows:
+                        try:
+                            self.conn.execute(sql, params)
+                            inserted += 1
+                        except sqlite3.IntegrityError as e:
+                            errors.append((index, record, str(e)))
+                self.conn.execute('RELEASE bulk_chunk')
+        errors.sort(key=lambda error: error[0])
+        return BulkResult(inserted, errors)
+    
+    def create_users_bulk(self, records):
+        """Массовое создание пользователей.
+        
+        records - итерируемый набор словарей с ключами username, password
+        (или готовый password_hash), role, full_name и необязательными email, phone.
+        """
+        def to_params(record):
+            password_hash = _optional(record, 'password_hash')
+            if password_hash is None:
+                password_hash = self.hash_password(record['password'])
+            return (record['username'], password_hash, record['role'], record['full_name'],
+                    _optional(record, 'email'), _optional(record, 'phone'))
+        
+        result = self._bulk_insert('''
+        INSERT INTO users (username, password_hash, role, full_name, email, phone)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', records, to_params)
+        self.cache.invalidate('users')
+        return result
+    
+    def create_projects_bulk(self, records):
+        """Массовое создание проектов.
+        
+        records - итерируемый набор словарей с ключом name и необязательными
+        description, start_date, end_date, budget, organizer_id, status
+        (по умолчанию 'active').
+        """
+        def to_params(record):
+            return (record['name'], _optional(record, 'description'),
+                    _optional(record, 'start_date'), _optional(record, 'end_date'),
+                    _optional_number(record, 'budget', float),
+                    _optional_number(record, 'organizer_id', int),
+                    _optional(record, 'status'))
+        
+        result = self._bulk_insert('''
+        INSERT INTO projects (name, description, start_date, end_date, budget, organizer_id,
+                              status)
+        VALUES (?, ?, ?, ?, ?, ?, IFNULL(?, 'active'))
+        ''', records, to_params)
+        self.cache.invalidate('projects')
+        return result
+    
+    def create_tasks_bulk(self, records):
+        """Массовое создание задач.
+        
+        records - итерируемый набор словарей с ключом title и необязательными
+        description, project_id, assigned_to, priority, deadline, status
+        (по умолчанию 'pending').
+        """
+        def to_params(record):
+            priority = _optional(record, 'priority')
+            return (record['title'], _optional(record, 'description'),
+                    _optional_number(record, 'project_id', int),
+                    _optional_number(record, 'assigned_to', int),
+                    priority, _optional(record, 'deadline'), priority_rank(priority),
+                    _optional(record, 'status'))
+        
+        result = self._bulk_insert('''
+        INSERT INTO tasks (title, description, project_id, assigned_to, priority, deadline,
+                           priority_rank, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, IFNULL(?, 'pending'))
+        ''', records, to_params)
+        self.cache.invalidate('tasks')
+        return result
+    
+    def _migration_dashboard_counters(self, cursor):
+        """Миграция 4: счётчики задач и пользователей для дашборда.
+        
+        Счётчики поддерживаются триггерами при вставке, изменении и удалении
+        строк, поэтому статистика читается за время, не зависящее от объёма
+        истории. NULL в ключах хранится как 0 (id) и '' (статус).
+        """
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_counts_by_user (
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, status)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_counts_by_project (
+            project_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (project_id, status)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_counts_by_role (
+            role TEXT NOT NULL,
+            is_active INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (role, is_active)
+        ) WITHOUT ROWID
+        ''')
+        
+        # Заполнение счётчиков по уже существующим данным
+        cursor.execute('''
+        INSERT INTO task_counts_by_user (user_id, status, count)
+        SELECT IFNULL(assigned_to, 0), IFNULL(status, ''), COUNT(*) FROM tasks
+        GROUP BY 1, 2
+        ''')
+        cursor.execute('''
+        INSERT INTO task_counts_by_project (project_id, status, count)
+        SELECT IFNULL(project_id, 0), IFNULL(status, ''), COUNT(*) FROM tasks
+        GROUP BY 1, 2
+        ''')
+        cursor.execute('''
+        INSERT INTO user_counts_by_role (role, is_active, count)
+        SELECT role, IFNULL(is_active, 0), COUNT(*) FROM users
+        GROUP BY 1, 2
+        ''')
+        
+        def bump(table, columns, values, delta):
+            """Изменение счётчика на delta (upsert по ключу)"""
+            return f'''
+            INSERT INTO {table} ({', '.join(columns)}, count) VALUES ({', '.join(values)}, {delta})
+            ON CONFLICT ({', '.join(columns)}) DO UPDATE SET count = count + ({delta});'''
+        
+        def task_bumps(row, delta):
+            return (bump('task_counts_by_user', ['user_id', 'status'],
+                         [f'IFNULL({row}.assigned_to, 0)', f"IFNULL({row}.status, '')"], delta)
+                    + bump('task_counts_by_project', ['project_id', 'status'],
+                           [f'IFNULL({row}.project_id, 0)', f"IFNULL({row}.status, '')"], delta))
+        
+        def user_bumps(row, delta):
+            return bump('user_counts_by_role', ['role', 'is_active'],
+                        [f'{row}.role', f'IFNULL({row}.is_active, 0)'], delta)
+        
+        triggers = {
+            'trg_tasks_counts_insert': ('AFTER INSERT ON tasks', task_bumps('NEW', 1)),
+            'trg_tasks_counts_delete': ('AFTER DELETE ON tasks', task_bumps('OLD', -1)),
+            'trg_tasks_counts_update': (
+                'AFTER UPDATE OF status, assigned_to, project_id ON tasks',
+                task_bumps('OLD', -1) + task_bumps('NEW', 1)),
+            'trg_users_counts_insert': ('AFTER INSERT ON users', user_bumps('NEW', 1)),
+            'trg_users_counts_delete': ('AFTER DELETE ON users', user_bumps('OLD', -1)),
+            'trg_users_counts_update': (
+                'AFTER UPDATE OF role, is_active ON users',
+                user_bumps('OLD', -1) + user_bumps('NEW', 1)),
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name} {event}
+            BEGIN{body}
+            END
+            ''')
+    
+    def _migration_change_log(self, cursor):
+        """Миграция 5: журнал изменений для обмена правками между клиентами.
+        
+        Триггеры записывают каждую вставку, изменение и удаление строк users,
+        projects и tasks. seq (AUTOINCREMENT) монотонно растёт и не
+        переиспользуется даже после очистки старых записей.
+        """
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL CHECK(op IN ('insert', 'update', 'delete')),
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log (changed_at)
+        ''')
+        
+        for table in ('users', 'projects', 'tasks'):
+            for op, event, row in (('insert', 'INSERT', 'NEW'),
+                                   ('update', 'UPDATE', 'NEW'),
+                                   ('delete', 'DELETE', 'OLD')):
+                cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{op}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op)
+                    VALUES ('{table}', {row}.id, '{op}');
+                END
+                ''')
+    
+    def _migration_full_text_search(self, cursor):
+        """Миграция 6: полнотекстовый поиск FTS5 по задачам и проектам.
+        
+        Индексы FTS5 хранят только словарь (content= ссылается на исходные
+        таблицы) и синхронизируются триггерами. Если SQLite собран без FTS5,
+        миграция ничего не создаёт, а search() использует LIKE.
+        """
+        
+        indexed = {'tasks': ('title', 'description'), 'projects': ('name', 'description')}
+        for table, columns in indexed.items():
+            column_list = ', '.join(columns)
+            new_values = ', '.join(f'NEW.{column}' for column in columns)
+            old_values = ', '.join(f'OLD.{column}' for column in columns)
+            try:
+                cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+                    {column_list}, content='{table}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+                ''')
+            except sqlite3.OperationalError as e:
+                if 'fts5' not in str(e):
+                    raise
+                return
+            
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {table}_fts (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, {column_list})
+                VALUES ('delete', OLD.id, {old_values});
+            END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update
+            AFTER UPDATE OF {column_list} ON {table}
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, {column_list})
+                VALUES ('delete', OLD.id, {old_values});
+                INSERT INTO {table}_fts (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+            ''')
+            # Индексация уже существующих строк
+            cursor.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+    
+    def _migration_archive(self, cursor):
+        """Миграция 7: архивные таблицы выполненных задач и закрытых проектов.
+        
+        Архивные таблицы повторяют рабочие, но без триггеров: перенос в архив
+        для счётчиков, журнала изменений и поиска выглядит как удаление.
+        Частичный индекс находит кандидатов в архив, не просматривая задачи
+        в работе.
+        """
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks_archive (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            project_id INTEGER,
+            assigned_to INTEGER,
+            priority TEXT,
+            status TEXT,
+            deadline DATE,
+            created_at TIMESTAMP,
+            priority_rank INTEGER NOT NULL DEFAULT 5,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS projects_archive (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            start_date DATE,
+            end_date DATE,
+            budget REAL,
+            status TEXT,
+            organizer_id INTEGER,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        
+        # Те же индексы списков, что и у рабочих таблиц
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_archive_assignee_priority
+        ON tasks_archive (assigned_to, priority_rank, deadline)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_archive_project ON tasks_archive (project_id)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_projects_archive_status_end
+        ON projects_archive (status, end_date)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_completed_deadline
+        ON tasks (deadline, created_at) WHERE status = 'completed'
+        ''')
+    
+    def _migration_deadline_index(self, cursor):
+        """Миграция 8: индекс сроков незавершённых задач исполнителя.
+        
+        Частичный индекс содержит только незавершённые задачи, поэтому
+        выборка ближайших сроков - поиск диапазона без чтения выполненных.
+        """
+        
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_open_deadline
+        ON tasks (assigned_to, deadline) WHERE status != 'completed'
+        ''')
+    
+    def _migration_project_deadline_index(self, cursor):
+        """Миграция 9: индекс сроков незавершённых задач проекта (для аналитики)"""
         
-        self.conn.commit()
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_open_project_deadline
+        ON tasks (project_id, deadline) WHERE status != 'completed'
+        ''')
+    
+    def _migration_department_hierarchy(self, cursor):
+        """Миграция 10: вложенные отделы и состав отделов.
+        
+        department_tree - таблица замыкания: для каждого отдела строки со всеми
+        его предками (и с ним самим, depth = 0). Она поддерживается триггерами
+        при добавлении, переносе и удалении отделов, поэтому поддерево и путь
+        к корню читаются одним поиском по индексу, без рекурсии.
+        """
+        
+        cursor.execute('ALTER TABLE departments ADD COLUMN parent_id INTEGER REFERENCES departments (id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_departments_parent ON departments (parent_id, name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_departments_director ON departments (director_id)')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS department_tree (
+            ancestor_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_department_tree_descendant
+        ON department_tree (descendant_id, depth)
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS department_members (
+            department_id INTEGER NOT NULL REFERENCES departments (id),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            PRIMARY KEY (department_id, user_id)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_department_members_user
+        ON department_members (user_id)
+        ''')
+        
+        # Существующие отделы становятся корневыми
+        cursor.execute('''
+        INSERT INTO department_tree (ancestor_id, descendant_id, depth)
+        SELECT id, id, 0 FROM departments
+        ''')
+        
+        triggers = {
+            # Новый отдел: он сам и все предки родителя
+            'trg_departments_tree_insert': ('AFTER INSERT ON departments', '''
+            INSERT INTO department_tree (ancestor_id, descendant_id, depth)
+            VALUES (NEW.id, NEW.id, 0);
+            INSERT INTO department_tree (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, NEW.id, depth + 1 FROM department_tree
+            WHERE descendant_id = NEW.parent_id;'''),
+            # Отдел нельзя перенести в самого себя или в свой подотдел
+            'trg_departments_tree_cycle': (
+                'BEFORE UPDATE OF parent_id ON departments WHEN NEW.parent_id IS NOT NULL', '''
+            SELECT RAISE(ABORT, 'department cycle') FROM department_tree
+            WHERE ancestor_id = NEW.id AND descendant_id = NEW.parent_id;'''),
+            # Перенос поддерева: связи с прежними предками заменяются связями с новыми
+            'trg_departments_tree_move': (
+                'AFTER UPDATE OF parent_id ON departments '
+                'WHEN NEW.parent_id IS NOT OLD.parent_id', '''
+            DELETE FROM department_tree
+            WHERE descendant_id IN (SELECT descendant_id FROM department_tree
+                                    WHERE ancestor_id = NEW.id)
+              AND ancestor_id IN (SELECT ancestor_id FROM department_tree
+                                  WHERE descendant_id = NEW.id AND ancestor_id != NEW.id);
+            INSERT INTO department_tree (ancestor_id, descendant_id, depth)
+            SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+            FROM department_tree a, department_tree d
+            WHERE a.descendant_id = NEW.parent_id AND d.ancestor_id = NEW.id;'''),
+            # Удаление: подотделы переходят к родителю удалённого отдела
+            'trg_departments_tree_delete': ('AFTER DELETE ON departments', '''
+            UPDATE departments SET parent_id = OLD.parent_id WHERE parent_id = OLD.id;
+            DELETE FROM department_tree WHERE ancestor_id = OLD.id OR descendant_id = OLD.id;
+            DELETE FROM department_members WHERE department_id = OLD.id;'''),
+            'trg_users_department_members_delete': ('AFTER DELETE ON users', '''
+            DELETE FROM department_members WHERE user_id = OLD.id;'''),
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name} {event}
+            BEGIN{body}
+            END
+            ''')
+    
+    def _migration_team_board_index(self, cursor):
+        """Миграция 11: индекс задач проекта по исполнителям для доски команды.
+        
+        Покрывает группировку задач проекта по исполнителям и статусам, отдаёт
+        задачи исполнителя в проекте сразу в порядке страниц (id указан явно,
+        чтобы status не нарушал этот порядок) и заменяет индекс
+        idx_tasks_project, который является его префиксом.
+        """
+        
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_project_assignee
+        ON tasks (project_id, assigned_to, priority_rank, deadline, id, status)
+        ''')
+        cursor.execute('DROP INDEX IF EXISTS idx_tasks_project')
+    
+    def _migration_audit_log(self, cursor):
+        """Миграция 12: журнал аудита (входы, создание проектов, смена статусов).
+        
+        Строки только добавляются и не ссылаются на users внешним ключом, чтобы
+        история переживала удаление пользователей. Индексы обслуживают выборку
+        по диапазону времени, в том числе по пользователю и по действию.
+        """
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY,
+            occurred_at TEXT NOT NULL,
+            user_id INTEGER,
+            action TEXT NOT NULL,
+            entity TEXT,
+            entity_id INTEGER,
+            details TEXT
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_time ON audit_log (occurred_at)')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_log (user_id, occurred_at)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_audit_action ON audit_log (action, occurred_at)
+        ''')
     
     def hash_password(self, password):
         """Хеширование пароля"""
@@ -78,125 +1139,940 @@ class Database:
         """Создание нового пользователя"""
         password_hash = self.hash_password(password)
         try:
-            self.cursor.execute('''
+            cursor = self.conn.execute('''
             INSERT INTO users (username, password_hash, role, full_name, email, phone)
             VALUES (?, ?, ?, ?, ?, ?)
             ''', (username, password_hash, role, full_name, email, phone))
-            self.conn.commit()
-            return self.cursor.lastrowid
+            self._commit()
+            self.cache.invalidate('users')
+            return cursor.lastrowid
         except sqlite3.IntegrityError:
             return None
     
     def authenticate_user(self, username, password):
         """Аутентификация пользователя"""
         password_hash = self.hash_password(password)
-        self.cursor.execute('''
+        cursor = self._records(User, '''
         SELECT id, username, role, full_name FROM users 
         WHERE username = ? AND password_hash = ? AND is_active = 1
         ''', (username, password_hash))
-        return self.cursor.fetchone()
+        user = cursor.fetchone()
+        if user:
+            self._audit('login', 'user', user.id, user_id=user.id)
+        else:
+            self._audit('login_failed', details={'username': username})
+        return user
     
     def get_user_by_id(self, user_id):
         """Получение информации о пользователе по ID"""
-        self.cursor.execute('''
+        return self._cached(('get_user_by_id', user_id), ['users'], lambda: self._records(User, '''
         SELECT id, username, role, full_name, email, phone, created_at 
         FROM users WHERE id = ?
-        ''', (user_id,))
-        return self.cursor.fetchone()
+        ''', (user_id,)).fetchone())
     
     def get_all_users(self):
         """Получение всех пользователей"""
-        self.cursor.execute('''
+        return self._cached(('get_all_users',), ['users'], lambda: self._records(User, '''
         SELECT id, username, role, full_name, email, phone, created_at, is_active 
         FROM users ORDER BY role, full_name
-        ''')
-        return self.cursor.fetchall()
+        ''').fetchall())
+    
+    def create_department(self, name, director_id=None, parent_id=None):
+        """Создание отдела (parent_id - вышестоящий отдел)"""
+        cursor = self.conn.execute('''
+        INSERT INTO departments (name, director_id, parent_id) VALUES (?, ?, ?)
+        ''', (name, director_id, parent_id))
+        self._commit()
+        self.cache.invalidate('departments')
+        return cursor.lastrowid
+    
+    def move_department(self, department_id, parent_id):
+        """Перенос отдела вместе с подотделами под parent_id (None - в корень).
+        
+        ValueError - перенос в самого себя или в собственный подотдел.
+        """
+        try:
+            # Своя транзакция откатывается при ошибке и не держит блокировку записи
+            # (внутри batch() откат остаётся пакету)
+            with self.transaction():
+                self.conn.execute('UPDATE departments SET parent_id = ? WHERE id = ?',
+                                  (parent_id, department_id))
+        except sqlite3.IntegrityError:
+            raise ValueError("Отдел нельзя перенести в самого себя или в свой подотдел")
+        self.cache.invalidate('departments')
+    
+    def add_department_member(self, department_id, user_id):
+        """Включение пользователя в отдел; False - он уже в нём состоит"""
+        cursor = self.conn.execute('''
+        INSERT OR IGNORE INTO department_members (department_id, user_id) VALUES (?, ?)
+        ''', (department_id, user_id))
+        self._commit()
+        self.cache.invalidate('department_members')
+        return cursor.rowcount > 0
     
-    def create_department(self, name, director_id=None):
-        """Создание отдела"""
-        self.cursor.execute('''
-        INSERT INTO departments (name, director_id) VALUES (?, ?)
-        ''', (name, director_id))
-        self.conn.commit()
-        return self.cursor.lastrowid
+    def remove_department_member(self, department_id, user_id):
+        """Исключение пользователя из отдела"""
+        cursor = self.conn.execute('''
+        DELETE FROM department_members WHERE department_id = ? AND user_id = ?
+        ''', (department_id, user_id))
+        self._commit()
+        self.cache.invalidate('department_members')
+        return cursor.rowcount > 0
+    
+    def get_departments(self):
+        """Все отделы с именами руководителей"""
+        return self._cached(('get_departments',), ['departments', 'users'], lambda: self._records(Department, '''
+        SELECT d.id, d.name, d.director_id, u.full_name, d.parent_id
+        FROM departments d
+        LEFT JOIN users u ON d.director_id = u.id
+        ORDER BY d.name, d.id
+        ''').fetchall())
+    
+    def get_child_departments(self, parent_id=None):
+        """Подотделы parent_id (None - корневые отделы) для дерева отделов.
+        
+        Для каждого отдела возвращаются число его подотделов и число его
+        сотрудников (без подотделов), чтобы дерево знало, какие узлы
+        раскрываются, не загружая их.
+        """
+        return self._records(Department, '''
+        SELECT d.id, d.name, d.director_id, u.full_name, d.parent_id,
+               (SELECT COUNT(*) FROM departments c WHERE c.parent_id = d.id),
+               (SELECT COUNT(*) FROM department_members m WHERE m.department_id = d.id)
+        FROM departments d
+        LEFT JOIN users u ON d.director_id = u.id
+        WHERE d.parent_id IS ?
+        ORDER BY d.name, d.id
+        ''', (parent_id,)).fetchall()
+    
+    def get_department_ancestors(self, department_id):
+        """Путь от корня к отделу (включая его самого)"""
+        return self._records(Department, '''
+        SELECT d.id, d.name, d.director_id, u.full_name, d.parent_id
+        FROM department_tree t
+        JOIN departments d ON d.id = t.ancestor_id
+        LEFT JOIN users u ON d.director_id = u.id
+        WHERE t.descendant_id = ?
+        ORDER BY t.depth DESC
+        ''', (department_id,)).fetchall()
+    
+    def get_department_members(self, department_id, subtree=False, role=None):
+        """Сотрудники отдела; subtree=True - вместе со всеми подотделами.
+        
+        Поддерево берётся из таблицы замыкания одним поиском по индексу.
+        role ограничивает выборку одной ролью (например, 'worker').
+        """
+        if subtree:
+            departments = 'SELECT descendant_id FROM department_tree WHERE ancestor_id = ?'
+        else:
+            departments = 'SELECT ?'
+        return self._records(User, f'''
+        SELECT id, username, role, full_name, email, phone FROM users
+        WHERE id IN (SELECT user_id FROM department_members
+                     WHERE department_id IN ({departments}))
+          AND (role = ? OR ? IS NULL)
+        ORDER BY full_name, id
+        ''', (department_id, role, role)).fetchall()
+    
+    def count_department_members(self, department_id):
+        """Число сотрудников отдела вместе со всеми подотделами"""
+        return self.conn.execute('''
+        SELECT COUNT(DISTINCT m.user_id) FROM department_tree t
+        JOIN department_members m ON m.department_id = t.descendant_id
+        WHERE t.ancestor_id = ?
+        ''', (department_id,)).fetchone()[0]
+    
+    def get_users_under_director(self, director_id, role='worker'):
+        """Сотрудники всех отделов (с подотделами), которыми руководит director_id"""
+        return self._records(User, '''
+        SELECT id, username, role, full_name, email, phone FROM users
+        WHERE id IN (SELECT m.user_id FROM departments d
+                     JOIN department_tree t ON t.ancestor_id = d.id
+                     JOIN department_members m ON m.department_id = t.descendant_id
+                     WHERE d.director_id = ?)
+          AND (role = ? OR ? IS NULL)
+        ORDER BY full_name, id
+        ''', (director_id, role, role)).fetchall()
     
     def create_project(self, name, description, start_date, end_date, budget, organizer_id):
         """Создание проекта"""
-        self.cursor.execute('''
+        cursor = self.conn.execute('''
         INSERT INTO projects (name, description, start_date, end_date, budget, organizer_id)
         VALUES (?, ?, ?, ?, ?, ?)
         ''', (name, description, start_date, end_date, budget, organizer_id))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        self._commit()
+        self.cache.invalidate('projects')
+        self._audit('create_project', 'project', cursor.lastrowid, {'name': name})
+        return cursor.lastrowid
     
     def create_task(self, title, description, project_id, assigned_to, priority, deadline):
         """Создание задачи"""
-        self.cursor.execute('''
-        INSERT INTO tasks (title, description, project_id, assigned_to, priority, deadline)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', (title, description, project_id, assigned_to, priority, deadline))
-        self.conn.commit()
-        return self.cursor.lastrowid
-    
-    def get_projects(self):
-        """Получение всех проектов"""
-        self.cursor.execute('''
-        SELECT p.*, u.full_name as organizer_name 
-        FROM projects p 
-        LEFT JOIN users u ON p.organizer_id = u.id 
-        ORDER BY p.status, p.end_date
-        ''')
-        return self.cursor.fetchall()
-    
-    def get_tasks_by_user(self, user_id):
-        """Получение задач для конкретного пользователя"""
-        self.cursor.execute('''
-        SELECT t.*, p.name as project_name 
-        FROM tasks t 
-        LEFT JOIN projects p ON t.project_id = p.id 
-        WHERE t.assigned_to = ? 
-        ORDER BY t.priority DESC, t.deadline
-        ''', (user_id,))
-        return self.cursor.fetchall()
+        cursor = self.conn.execute('''
+        INSERT INTO tasks (title, description, project_id, assigned_to, priority, deadline,
+                           priority_rank)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (title, description, project_id, assigned_to, priority, deadline,
+              priority_rank(priority)))
+        self._commit()
+        self.cache.invalidate('tasks')
+        return cursor.lastrowid
+    
+    def get_projects(self, include_archived=False):
+        """Получение всех проектов; include_archived - вместе с архивными"""
+        def load():
+            rows = self._records(Project, PROJECT_SELECT.format(table='projects') + '''
+            ORDER BY p.status, p.end_date, p.id
+            ''').fetchall()
+            if include_archived:
+                archived = self._records(Project, PROJECT_SELECT.format(table='projects_archive') + '''
+                ORDER BY p.status, p.end_date, p.id
+                ''').fetchall()
+                rows = _merge_sorted(rows, archived, project_sort_key)
+            return rows
+        
+        return self._cached(('get_projects', include_archived),
+                            ['projects', 'users', 'projects_archive'], load)
+    
+    def _fetch_page(self, record, select_sql, where, params, columns, after, limit):
+        """Страница записей record после ключа after при сортировке по columns"""
+        order_by = ', '.join(columns)
+        rows = []
+        for condition, condition_params in _keyset_conditions(columns, after):
+            cursor = self._records(
+                record, f'{select_sql} WHERE {where} AND {condition} ORDER BY {order_by} LIMIT ?',
+                list(params) + condition_params + [limit - len(rows)])
+            rows.extend(cursor.fetchall())
+            if len(rows) >= limit:
+                break
+        return rows
+    
+    def get_projects_page(self, after=None, limit=PAGE_SIZE, include_archived=False):
+        """Страница проектов в порядке get_projects.
+        
+        Возвращает (строки, ключ следующей страницы); ключ равен None, когда
+        проекты закончились. Время выборки не зависит от номера страницы:
+        с include_archived страница читается по индексу из обеих таблиц и
+        сливается.
+        """
+        columns = ['p.status', 'p.end_date', 'p.id']
+        rows = self._fetch_page(Project, PROJECT_SELECT.format(table='projects'), '1', [],
+                                columns, after, limit)
+        if include_archived:
+            archived = self._fetch_page(Project, PROJECT_SELECT.format(table='projects_archive'),
+                                        '1', [], columns, after, limit)
+            rows = _merge_sorted(rows, archived, project_sort_key, limit)
+        
+        next_key = project_sort_key(rows[-1]) if len(rows) == limit else None
+        return rows, next_key
+    
+    def get_project_changes(self, project_ids, include_archived=False):
+        """Текущее состояние проектов project_ids для точечного обновления списка.
+        
+        С include_archived проекты, перенесённые в архив, не считаются удалёнными.
+        """
+        project_ids = list(project_ids)
+        rows = self._rows_by_id(Project, PROJECT_SELECT.format(table='projects'), 'p.id',
+                                project_ids)
+        if include_archived:
+            found = {row.id for row in rows}
+            rows += self._rows_by_id(Project, PROJECT_SELECT.format(table='projects_archive'), 'p.id',
+                                     [project_id for project_id in project_ids
+                                      if project_id not in found])
+        found = {row.id for row in rows}
+        return RowChanges(rows, [project_id for project_id in project_ids if project_id not in found])
+    
+    def _rows_by_id(self, record, select_sql, id_column, ids, where='1', params=()):
+        """Записи record, у которых id_column входит в ids, с дополнительным условием where"""
+        if not ids:
+            return []
+        return self._records(record, f'''
+        {select_sql} WHERE {id_column} IN ({', '.join('?' * len(ids))}) AND {where}
+        ''', list(ids) + list(params)).fetchall()
+    
+    def get_tasks_by_user(self, user_id, include_archived=False):
+        """Получение задач для конкретного пользователя; include_archived - вместе с архивными"""
+        rows = self._records(Task, TASK_SELECT + '''
+        WHERE t.assigned_to = ?
+        ORDER BY t.priority_rank, t.deadline, t.id
+        ''', (user_id,)).fetchall()
+        if include_archived:
+            archived = self._records(Task, ARCHIVED_TASK_SELECT + '''
+            WHERE t.assigned_to = ?
+            ORDER BY t.priority_rank, t.deadline, t.id
+            ''', (user_id,)).fetchall()
+            rows = _merge_sorted(rows, archived, task_sort_key)
+        return rows
+    
+    def get_tasks_by_user_page(self, user_id, after=None, limit=PAGE_SIZE, include_archived=False):
+        """Страница задач пользователя в порядке get_tasks_by_user.
+        
+        Возвращает (строки, ключ следующей страницы); ключ равен None, когда
+        задачи закончились.
+        """
+        columns = ['t.priority_rank', 't.deadline', 't.id']
+        rows = self._fetch_page(Task, TASK_SELECT, 't.assigned_to = ?', [user_id], columns,
+                                after, limit)
+        if include_archived:
+            archived = self._fetch_page(Task, ARCHIVED_TASK_SELECT, 't.assigned_to = ?', [user_id],
+                                        columns, after, limit)
+            rows = _merge_sorted(rows, archived, task_sort_key, limit)
+        
+        next_key = task_sort_key(rows[-1]) if len(rows) == limit else None
+        return rows, next_key
+    
+    def get_task_changes(self, user_id, task_ids, include_archived=False):
+        """Текущее состояние задач task_ids для точечного обновления списка задач пользователя.
+        
+        Задачи, которые удалены или назначены другому пользователю, возвращаются в deleted;
+        с include_archived задачи, перенесённые в архив, удалёнными не считаются.
+        """
+        task_ids = list(task_ids)
+        rows = self._rows_by_id(Task, TASK_SELECT, 't.id', task_ids, 't.assigned_to = ?', [user_id])
+        if include_archived:
+            found = {row.id for row in rows}
+            rows += self._rows_by_id(Task, ARCHIVED_TASK_SELECT, 't.id',
+                                     [task_id for task_id in task_ids if task_id not in found],
+                                     't.assigned_to = ?', [user_id])
+        found = {row.id for row in rows}
+        return RowChanges(rows, [task_id for task_id in task_ids if task_id not in found])
+    
+    def get_board_projects(self):
+        """Проекты доски задач команды с числом задач по статусам.
+        
+        Один GROUP BY по счётчикам, поддерживаемым триггерами, поэтому доска
+        открывается за время, не зависящее от числа задач.
+        """
+        return self._records(BoardGroup, '''
+        SELECT c.project_id, IFNULL(p.name, pa.name), SUM(c.count),
+               SUM(CASE c.status WHEN 'pending' THEN c.count ELSE 0 END),
+               SUM(CASE c.status WHEN 'in_progress' THEN c.count ELSE 0 END),
+               SUM(CASE c.status WHEN 'completed' THEN c.count ELSE 0 END)
+        FROM task_counts_by_project c
+        LEFT JOIN projects p ON p.id = c.project_id
+        LEFT JOIN projects_archive pa ON pa.id = c.project_id
+        GROUP BY c.project_id HAVING SUM(c.count) > 0
+        ORDER BY c.project_id = 0, IFNULL(p.name, pa.name), c.project_id
+        ''').fetchall()
+    
+    def get_board_assignees(self, project_id):
+        """Исполнители задач проекта (0 - без проекта) с числом задач по статусам.
+        
+        Группировка читает только покрывающий индекс idx_tasks_project_assignee.
+        """
+        return self._records(BoardGroup, '''
+        SELECT g.assigned_to, u.full_name, g.total, g.pending, g.in_progress, g.completed
+        FROM (SELECT IFNULL(assigned_to, 0) AS assigned_to, COUNT(*) AS total,
+                     SUM(status = 'pending') AS pending,
+                     SUM(status = 'in_progress') AS in_progress,
+                     SUM(status = 'completed') AS completed
+              FROM tasks WHERE project_id IS ?
+              GROUP BY assigned_to) g
+        LEFT JOIN users u ON u.id = g.assigned_to
+        ORDER BY g.assigned_to = 0, u.full_name, g.assigned_to
+        ''', (project_id or None,)).fetchall()
+    
+    def get_board_tasks_page(self, project_id, assigned_to, after=None, limit=PAGE_SIZE):
+        """Страница задач исполнителя в проекте в порядке get_tasks_by_user.
+        
+        project_id и assigned_to равны 0 для задач без проекта и без
+        исполнителя. Возвращает (строки, ключ следующей страницы).
+        """
+        columns = ['t.priority_rank', 't.deadline', 't.id']
+        rows = self._fetch_page(Task, TASK_SELECT, 't.project_id IS ? AND t.assigned_to IS ?',
+                                [project_id or None, assigned_to or None], columns, after, limit)
+        next_key = task_sort_key(rows[-1]) if len(rows) == limit else None
+        return rows, next_key
+    
+    def get_deadlines(self, user_id, until, after=None):
+        """Незавершённые задачи пользователя со сроком после after и не позже until.
+        
+        Даты - строки ГГГГ-ММ-ДД; after=None - включая просроченные. Задачи
+        без срока не возвращаются. Строки идут по возрастанию срока и читаются
+        диапазоном частичного индекса idx_tasks_open_deadline.
+        """
+        where = "t.assigned_to = ? AND t.status != 'completed' AND t.deadline <= ?"
+        params = [user_id, until]
+        if after is not None:
+            where += ' AND t.deadline > ?'
+            params.append(after)
+        return self._records(Task, f'''
+        {TASK_SELECT} WHERE {where} ORDER BY t.deadline, t.id
+        ''', params).fetchall()
     
     def update_task_status(self, task_id, status):
         """Обновление статуса задачи"""
-        self.cursor.execute('''
+        cursor = self.conn.execute('''
         UPDATE tasks SET status = ? WHERE id = ?
         ''', (status, task_id))
-        self.conn.commit()
+        self._commit()
+        self.cache.invalidate('tasks')
+        if cursor.rowcount:
+            self._audit('update_task_status', 'task', task_id, {'status': status})
     
-    def close(self):
-        """Закрытие соединения с БД"""
-        self.conn.close()
-
-def init_database():
-    """Инициализация базы данных с тестовыми данными"""
-    db = Database()
-    
-    # Создание тестовых пользователей, если их нет
-    db.create_user('admin', 'admin123', 'admin', 'Администратор Системы', 'admin@company.com')
-    db.create_user('director', 'dir123', 'director', 'Иванов Иван Иванович', 'director@company.com')
-    db.create_user('manager1', 'mgr123', 'manager', 'Петров Петр Петрович', 'manager1@company.com')
-    db.create_user('worker1', 'wrk123', 'worker', 'Сидоров Алексей', 'worker1@company.com')
-    db.create_user('organizer1', 'org123', 'organizer', 'Козлова Мария', 'organizer1@company.com')
-    
-    # Создание отделов
-    db.create_department('Отдел разработки', 2)
-    db.create_department('Отдел маркетинга', 3)
-    
-    # Создание проектов
-    db.create_project(
-        'Разработка новой системы',
-        'Создание системы управления проектами',
-        '2024-01-01',
-        '2024-06-30',
-        500000,
-        5
-    )
+    def update_tasks_status(self, task_ids, status):
+        """Смена статуса набора задач одной транзакцией.
+        
+        Задачи, у которых статус уже такой, не затрагиваются (триггеры
+        счётчиков и журнала изменений для них не срабатывают) и в аудит не
+        попадают, как и несуществующие id. Возвращает число изменённых задач.
+        """
+        if status not in TASK_STATUSES:
+            raise ValueError(f"Неизвестный статус задачи: {status}")
+        task_ids = list(dict.fromkeys(task_ids))
+        changed = []
+        with self.transaction():
+            for start in range(0, len(task_ids), BULK_CHUNK_SIZE):
+                chunk = task_ids[start:start + BULK_CHUNK_SIZE]
+                # Выборка и UPDATE идут в одной транзакции на запись, поэтому
+                # найденные id - ровно те задачи, которые будут изменены
+                ids = [row[0] for row in self.conn.execute(f'''
+                SELECT id FROM tasks
+                WHERE id IN ({', '.join('?' * len(chunk))}) AND status IS NOT ?
+                ''', chunk + [status])]
+                if ids:
+                    self.conn.execute(f'''
+                    UPDATE tasks SET status = ? WHERE id IN ({', '.join('?' * len(ids))})
+                    ''', [status] + ids)
+                changed.extend(ids)
+        self.cache.invalidate('tasks')
+        if changed:
+            self._audit('update_task_status', 'task', changed, {'status': status})
+        return len(changed)
+    
+    def get_task_status_counts(self, user_id=None, project_id=None):
+        """Число задач по статусам: всех, пользователя или проекта.
+        
+        Читается из счётчиков, поддерживаемых триггерами. Возвращает словарь
+        {статус: количество}.
+        """
+        if user_id is not None:
+            cursor = self.conn.execute('''
+            SELECT status, count FROM task_counts_by_user
+            WHERE user_id = ? AND count > 0
+            ''', (user_id,))
+        elif project_id is not None:
+            cursor = self.conn.execute('''
+            SELECT status, count FROM task_counts_by_project
+            WHERE project_id = ? AND count > 0
+            ''', (project_id,))
+        else:
+            cursor = self.conn.execute('''
+            SELECT status, SUM(count) FROM task_counts_by_project
+            GROUP BY status HAVING SUM(count) > 0
+            ''')
+        return dict(cursor.fetchall())
+    
+    def get_user_role_counts(self, active_only=True):
+        """Число пользователей по ролям: {роль: количество}"""
+        cursor = self.conn.execute('''
+        SELECT role, SUM(count) FROM user_counts_by_role
+        WHERE is_active = 1 OR ? = 0
+        GROUP BY role HAVING SUM(count) > 0
+        ''', (1 if active_only else 0,))
+        return dict(cursor.fetchall())
+    
+    def get_project_task_counts(self):
+        """Число задач по проектам и статусам.
+        
+        Возвращает строки (id проекта, название, статус, количество).
+        """
+        cursor = self.conn.execute('''
+        SELECT c.project_id, p.name, c.status, c.count
+        FROM task_counts_by_project c
+        LEFT JOIN projects p ON c.project_id = p.id
+        WHERE c.count > 0
+        ORDER BY c.project_id, c.status
+        ''')
+        return cursor.fetchall()
     
+    def get_user_task_counts(self):
+        """Число задач по исполнителям и статусам из счётчиков.
+        
+        Возвращает строки (id исполнителя, статус, количество); задачи без
+        исполнителя имеют id 0.
+        """
+        cursor = self.conn.execute('''
+        SELECT user_id, status, count FROM task_counts_by_user
+        WHERE count > 0
+        ORDER BY user_id, status
+        ''')
+        return cursor.fetchall()
+    
+    def get_overdue_counts(self, today, by='assignee'):
+        """Число просроченных задач (не выполнены, срок раньше today) по исполнителям или проектам.
+        
+        Читаются только частичные индексы незавершённых задач, упорядоченные
+        по группе, так что выполненная история не просматривается. Возвращает
+        строки (id исполнителя или проекта, количество); без группы - id 0.
+        """
+        column = {'assignee': 'assigned_to', 'project': 'project_id'}[by]
+        
+        def load():
+            cursor = self.conn.execute(f'''
+            SELECT IFNULL({column}, 0), COUNT(*) FROM tasks
+            WHERE status != 'completed' AND deadline < ?
+            GROUP BY {column}
+            ''', (today,))
+            return cursor.fetchall()
+        
+        return self._cached(('get_overdue_counts', today, by), ['tasks'], load)
+    
+    def get_project_burndown(self, project_id):
+        """Задачи проекта по срокам: строки (срок, выполнена ли, количество) по возрастанию срока"""
+        cursor = self.conn.execute('''
+        SELECT deadline, status = 'completed', COUNT(*) FROM tasks
+        WHERE project_id = ?
+        GROUP BY deadline, status = 'completed'
+        ORDER BY deadline
+        ''', (project_id,))
+        return cursor.fetchall()
+    
+    def get_project_status_counts(self):
+        """Число проектов по статусам: {статус: количество}"""
+        cursor = self.conn.execute('''
+        SELECT status, COUNT(*) FROM projects GROUP BY status
+        ''')
+        return dict(cursor.fetchall())
+    
+    def has_full_text_search(self):
+        """Есть ли в базе индексы FTS5"""
+        cursor = self.conn.execute('''
+        SELECT COUNT(*) FROM sqlite_master WHERE name IN ('tasks_fts', 'projects_fts')
+        ''')
+        return cursor.fetchone()[0] == 2
+    
+    def search(self, text, user_id=None, after=None, limit=PAGE_SIZE):
+        """Поиск по названиям и описаниям задач и проектов.
+        
+        Результаты упорядочены по релевантности (bm25). user_id ограничивает
+        задачи назначенными этому пользователю. Возвращает (строки, смещение
+        следующей страницы); строки - записи SearchHit, вид - 'task' или 'project'.
+        """
+        match = fts_query(text)
+        if not match:
+            return [], None
+        offset = after or 0
+        task_filter = 'AND t.assigned_to = ?' if user_id is not None else ''
+        user_params = [user_id] if user_id is not None else []
+        
+        if self.has_full_text_search():
+            # Каждая таблица отдаёт лучшие offset + limit совпадений через
+            # оптимизированный ORDER BY rank, затем выдачи сливаются
+            sql = f'''
+            SELECT * FROM (
+                SELECT 'task:' || t.id, 'task', t.id, t.title,
+                       snippet(tasks_fts, -1, '[', ']', '…', 12), tasks_fts.rank AS score
+                FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid
+                WHERE tasks_fts MATCH ? {task_filter}
+                ORDER BY tasks_fts.rank LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'project:' || p.id, 'project', p.id, p.name,
+                       snippet(projects_fts, -1, '[', ']', '…', 12), projects_fts.rank AS score
+                FROM projects_fts JOIN projects p ON p.id = projects_fts.rowid
+                WHERE projects_fts MATCH ?
+                ORDER BY projects_fts.rank LIMIT ?
+            )
+            ORDER BY score LIMIT ? OFFSET ?
+            '''
+            params = [match] + user_params + [offset + limit, match, offset + limit, limit, offset]
+        else:
+            # % и _ во введённом тексте ищутся как обычные символы; выдача
+            # упорядочена по (вид, id), чтобы страницы не перекрывались
+            escaped = text.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = '%' + escaped + '%'
+            sql = f'''
+            SELECT 'task:' || t.id, 'task', t.id, t.title, t.description, 0 AS score
+            FROM tasks t
+            WHERE (t.title LIKE ? ESCAPE '\\' OR t.description LIKE ? ESCAPE '\\') {task_filter}
+            UNION ALL
+            SELECT 'project:' || p.id, 'project', p.id, p.name, p.description, 0
+            FROM projects p
+            WHERE p.name LIKE ? ESCAPE '\\' OR p.description LIKE ? ESCAPE '\\'
+            ORDER BY 2, 3 LIMIT ? OFFSET ?
+            '''
+            params = [pattern, pattern] + user_params + [pattern, pattern, limit, offset]
+        
+        rows = self._records(SearchHit, sql, params).fetchall()
+        next_offset = offset + limit if len(rows) == limit else None
+        return rows, next_offset
+    
+    def get_last_change_seq(self):
+        """Номер последней записи журнала изменений (0, если журнал пуст)"""
+        cursor = self.conn.execute('SELECT IFNULL(MAX(seq), 0) FROM change_log')
+        return cursor.fetchone()[0]
+    
+    def get_changes_since(self, seq, limit=1000):
+        """Изменения после номера seq: строки (seq, таблица, id строки, операция).
+        
+        Чтение идёт по первичному ключу журнала, поэтому опрос без новых
+        изменений почти ничего не стоит. Если вернулось limit строк, за
+        последним номером могут быть ещё изменения.
+        """
+        cursor = self.conn.execute('''
+        SELECT seq, table_name, row_id, op FROM change_log
+        WHERE seq > ? ORDER BY seq LIMIT ?
+        ''', (seq, limit))
+        return cursor.fetchall()
+    
+    def prune_change_log(self, max_age_days=7):
+        """Удаление записей журнала изменений старше max_age_days дней.
+        
+        Запускается периодически командой "database.py prune" из планировщика;
+        клиенты журнал не очищают.
+        """
+        cursor = self.conn.execute('''
+        DELETE FROM change_log WHERE changed_at < datetime('now', ?)
+        ''', (f'-{int(max_age_days)} days',))
+        self._commit()
+        return cursor.rowcount
+    
+    def archive_old_records(self, max_age_days=ARCHIVE_AFTER_DAYS, chunk_size=ARCHIVE_CHUNK_SIZE):
+        """Перенос старых выполненных задач и закрытых проектов в архивные таблицы.
+        
+        Задача попадает в архив, если она выполнена и её дедлайн (без дедлайна -
+        дата создания) старше max_age_days дней; проект - если он закрыт,
+        закончился раньше этого срока и в рабочей таблице у него не осталось
+        задач. Перенос идёт порциями по chunk_size строк, каждая в своей
+        транзакции, чтобы не задерживать надолго других писателей; условия
+        проверяются повторно внутри транзакции. Возвращает
+        {'tasks': число задач, 'projects': число проектов}.
+        
+        Запускается периодически: обслуживанием сервера API или командой
+        "database.py archive" из планировщика; клиенты перенос не выполняют.
+        """
+        age = f'-{int(max_age_days)} days'
+        task_ids = [row[0] for row in self.conn.execute('''
+        SELECT id FROM tasks
+        WHERE status = 'completed' AND deadline < date('now', ?)
+        UNION ALL
+        SELECT id FROM tasks
+        WHERE status = 'completed' AND deadline IS NULL AND created_at < date('now', ?)
+        ''', (age, age))]
+        moved = {'tasks': self._move_to_archive('tasks', task_ids, '''
+        status = 'completed'
+        ''', chunk_size)}
+        
+        statuses = ', '.join('?' * len(CLOSED_PROJECT_STATUSES))
+        project_ids = [row[0] for row in self.conn.execute(f'''
+        SELECT id FROM projects p
+        WHERE status IN ({statuses}) AND end_date < date('now', ?)
+          AND NOT EXISTS (SELECT 1 FROM tasks t WHERE t.project_id = p.id)
+        ''', CLOSED_PROJECT_STATUSES + (age,))]
+        moved['projects'] = self._move_to_archive('projects', project_ids, f'''
+        status IN ({', '.join(repr(status) for status in CLOSED_PROJECT_STATUSES)})
+          AND NOT EXISTS (SELECT 1 FROM tasks t WHERE t.project_id = projects.id)
+        ''', chunk_size)
+        
+        if moved['tasks'] or moved['projects']:
+            self.cache.invalidate('tasks', 'projects', 'tasks_archive', 'projects_archive')
+        return moved
+    
+    def _move_to_archive(self, table, ids, condition, chunk_size):
+        """Перенос строк table с id из ids, всё ещё удовлетворяющих condition, в архив"""
+        columns = ', '.join(ARCHIVE_COLUMNS[table])
+        moved = 0
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            where = f"id IN ({', '.join('?' * len(chunk))}) AND {condition}"
+            with self.transaction():
+                self.conn.execute(f'''
+                INSERT INTO {table}_archive ({columns})
+                SELECT {columns} FROM {table} WHERE {where}
+                ''', chunk)
+                moved += self.conn.execute(f'DELETE FROM {table} WHERE {where}', chunk).rowcount
+        return moved
+    
+    def _iterate(self, sql, params=(), chunk_size=EXPORT_CHUNK_SIZE):
+        """Потоковое чтение результата запроса порциями fetchmany"""
+        cursor = self.conn.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+    
+    def iter_users(self, chunk_size=EXPORT_CHUNK_SIZE):
+        """Все пользователи по порядку id (колонки EXPORT_COLUMNS['users'])"""
+        return self._iterate('''
+        SELECT id, username, role, full_name, email, phone, created_at, is_active
+        FROM users ORDER BY id
+        ''', chunk_size=chunk_size)
+    
+    def iter_projects(self, chunk_size=EXPORT_CHUNK_SIZE):
+        """Все проекты по порядку id (колонки EXPORT_COLUMNS['projects'])"""
+        return self._iterate('''
+        SELECT p.id, p.name, p.description, u.full_name, p.start_date, p.end_date,
+               p.budget, p.status
+        FROM projects p
+        LEFT JOIN users u ON p.organizer_id = u.id
+        ORDER BY p.id
+        ''', chunk_size=chunk_size)
+    
+    def iter_tasks(self, user_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Задачи (колонки EXPORT_COLUMNS['tasks']): все по id или одного пользователя.
+        
+        Задачи пользователя идут в порядке индекса исполнителя (как в
+        get_tasks_by_user), чтобы SQLite не сортировал их во временной таблице.
+        """
+        select_sql = '''
+        SELECT t.id, t.title, t.description, p.name, u.full_name, t.priority, t.status,
+               t.deadline, t.created_at
+        FROM tasks t
+        LEFT JOIN projects p ON t.project_id = p.id
+        LEFT JOIN users u ON t.assigned_to = u.id
+        '''
+        if user_id is None:
+            return self._iterate(select_sql + 'ORDER BY t.id', chunk_size=chunk_size)
+        return self._iterate(select_sql + '''
+        WHERE t.assigned_to = ? ORDER BY t.priority_rank, t.deadline, t.id
+        ''', (user_id,), chunk_size=chunk_size)
+    
+    def count_for_export(self, kind, user_id=None):
+        """Число строк выгрузки для индикатора хода.
+        
+        Пользователи и задачи считаются по счётчикам, которые ведут триггеры;
+        проекты - группировкой по небольшой таблице projects (счётчика для них нет).
+        """
+        if kind == 'users':
+            return sum(self.get_user_role_counts(active_only=False).values())
+        if kind == 'projects':
+            return sum(self.get_project_status_counts().values())
+        return sum(self.get_task_status_counts(user_id=user_id).values())
+    
+    def _audit(self, action, entity=None, entity_id=None, details=None, user_id=None):
+        """Событие аудита от имени user_id (по умолчанию actor_id).
+        
+        entity_id - id записи или список id (по событию на каждую). События
+        ставятся в очередь менеджера соединений и записываются вместе с
+        другими одной транзакцией, не добавляя коммит к действию. У базы
+        ':memory:' нет других соединений, и события пишутся сразу.
+        """
+        occurred_at = audit_time()
+        user_id = self.actor_id if user_id is None else user_id
+        details = json.dumps(details, ensure_ascii=False) if details else None
+        entity_ids = entity_id if isinstance(entity_id, list) else [entity_id]
+        events = [(occurred_at, user_id, action, entity, item, details) for item in entity_ids]
+        if self.db_name == ':memory:':
+            self.write_audit_events(events)
+            return
+        audit = self.manager.audit_queue(self.db_name)
+        for event in events:
+            audit.record(event)
+    
+    def write_audit_events(self, events):
+        """Запись пакета событий аудита одной транзакцией.
+        
+        events - кортежи (время, user_id, действие, сущность, id сущности, JSON).
+        """
+        with self.transaction():
+            self.conn.executemany(AUDIT_INSERT, events)
+    
+    def get_audit_page(self, since=None, until=None, user_id=None, action=None, after=None,
+                       limit=PAGE_SIZE):
+        """Страница журнала аудита по времени событий (от старых к новым).
+        
+        since и until - границы времени в UTC ('ГГГГ-ММ-ДД[ ЧЧ:ММ:СС]'),
+        since включительно, until - нет. Выборка идёт по индексу времени (с
+        user_id или action - по индексу пользователя или действия).
+        Возвращает (строки, ключ следующей страницы).
+        """
+        conditions, params = ['1'], []
+        for condition, value in (('a.occurred_at >= ?', since), ('a.occurred_at < ?', until),
+                                 ('a.user_id = ?', user_id), ('a.action = ?', action)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        rows = self._fetch_page(AuditEvent, AUDIT_SELECT, ' AND '.join(conditions), params,
+                                ['a.occurred_at', 'a.id'], after, limit)
+        next_key = (rows[-1].occurred_at, rows[-1].id) if len(rows) == limit else None
+        return rows, next_key
+    
+    def close(self):
+        """Закрытие соединения с БД; накопленные события аудита записываются"""
+        if self.conn is not None:
+            try:
+                self.manager.flush_audit(self.db_name)
+            finally:
+                query_profiler.unregister(self)
+                self.manager.release(self.conn)
+                self.conn = None
+
+def init_database(db_name='uchet.db'):
+    """Инициализация базы данных: схема и тестовые данные через миграции"""
+    db = Database(db_name)
     db.close()
     print("База данных инициализирована!")
 
+def read_records(path, file_format=None):
+    """Потоковое чтение записей для импорта из CSV, JSON или JSON Lines.
+    
+    CSV и JSON Lines читаются построчно, поэтому размер файла не ограничен памятью.
+    JSON должен содержать массив объектов.
+    """
+    if file_format is None:
+        file_format = os.path.splitext(path)[1].lstrip('.').lower()
+    
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+        elif file_format == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif file_format == 'json':
+            yield from json.load(f)
+        else:
+            raise ValueError(f"Неизвестный формат файла: {file_format}")
+
+def write_records(path, columns, rows, file_format=None, progress=None, stop=None):
+    """Потоковая запись строк в CSV, XLSX или JSON Lines.
+    
+    Файл пишется во временный path + '.part' и переименовывается только
+    после успешного завершения. progress(число строк) вызывается после
+    каждых EXPORT_CHUNK_SIZE строк; установленное событие stop прерывает
+    запись. Возвращает число записанных строк или None при прерывании.
+    """
+    if file_format is None:
+        file_format = os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format not in ('csv', 'xlsx', 'jsonl'):
+        raise ValueError(f"Неизвестный формат файла: {file_format}")
+    
+    partial = path + '.part'
+    count = 0
+    try:
+        if file_format == 'xlsx':
+            f = XlsxWriter(partial)
+            f.write_row(columns, style=1)
+            write_row = f.write_row
+        else:
+            f = open(partial, 'w', encoding='utf-8-sig' if file_format == 'csv' else 'utf-8', newline='')
+            if file_format == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                write_row = writer.writerow
+            else:
+                write_row = lambda row: f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n')
+        with f:
+            for row in rows:
+                write_row(row)
+                count += 1
+                if count % EXPORT_CHUNK_SIZE == 0:
+                    if stop is not None and stop.is_set():
+                        break
+                    if progress:
+                        progress(count)
+        if stop is not None and stop.is_set():
+            os.remove(partial)
+            return None
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    if progress:
+        progress(count)
+    return count
+
+def export_records(db, kind, path, file_format=None, user_id=None, progress=None, stop=None):
+    """Выгрузка записей указанного вида (users, projects, tasks) в файл.
+    
+    user_id ограничивает выгрузку задач задачами одного исполнителя.
+    progress(выгружено, всего) получает ход выгрузки.
+    """
+    iterators = {
+        'users': db.iter_users,
+        'projects': db.iter_projects,
+        'tasks': lambda: db.iter_tasks(user_id),
+    }
+    total = db.count_for_export(kind, user_id)
+    report = (lambda count: progress(count, total)) if progress else None
+    return write_records(path, EXPORT_COLUMNS[kind], iterators[kind](), file_format, report, stop)
+
+def import_records(db, kind, records):
+    """Импорт записей указанного вида (users, projects, tasks)"""
+    importers = {
+        'users': db.create_users_bulk,
+        'projects': db.create_projects_bulk,
+        'tasks': db.create_tasks_bulk,
+    }
+    return importers[kind](records)
+
+def main(argv=None):
+    """Командная строка: инициализация, импорт, выгрузка, очистка журнала и архивирование"""
+    parser = argparse.ArgumentParser(description="База данных системы учета")
+    parser.add_argument('--db', default='uchet.db', help="Путь к файлу базы данных")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    import_parser = subparsers.add_parser('import', help="Импорт записей из CSV/JSON")
+    import_parser.add_argument('kind', choices=['users', 'projects', 'tasks'])
+    import_parser.add_argument('path', help="Файл с записями")
+    import_parser.add_argument('--format', choices=['csv', 'json', 'jsonl'],
+                               help="Формат файла (по умолчанию по расширению)")
+    
+    export_parser = subparsers.add_parser('export', help="Выгрузка записей в CSV/XLSX/JSON Lines")
+    export_parser.add_argument('kind', choices=['users', 'projects', 'tasks'])
+    export_parser.add_argument('path', help="Файл для записей")
+    export_parser.add_argument('--format', choices=['csv', 'xlsx', 'jsonl'],
+                               help="Формат файла (по умолчанию по расширению)")
+    export_parser.add_argument('--user-id', type=int, help="Только задачи этого исполнителя")
+    
+    prune_parser = subparsers.add_parser('prune', help="Удаление старых записей журнала изменений")
+    prune_parser.add_argument('--days', type=int, default=7,
+                              help="Возраст записей в днях (по умолчанию %(default)s)")
+    
+    archive_parser = subparsers.add_parser('archive', help="Перенос старых выполненных задач "
+                                                          "и закрытых проектов в архив")
+    archive_parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                                help="Возраст записей в днях (по умолчанию %(default)s)")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command not in ('import', 'export', 'prune', 'archive'):
+        init_database(args.db)
+        return 0
+    
+    if args.command == 'prune':
+        db = Database(args.db)
+        try:
+            removed = db.prune_change_log(args.days)
+        finally:
+            db.close()
+        print(f"Удалено записей журнала: {removed}")
+        return 0
+    
+    if args.command == 'archive':
+        db = Database(args.db)
+        try:
+            moved = db.archive_old_records(args.days)
+        finally:
+            db.close()
+        print(f"Перенесено в архив: задач {moved['tasks']}, проектов {moved['projects']}")
+        return 0
+    
+    if args.command == 'export':
+        db = Database(args.db)
+        try:
+            count = export_records(db, args.kind, args.path, args.format, args.user_id)
+        finally:
+            db.close()
+        print(f"Выгружено записей: {count}")
+        return 0
+    
+    db = Database(args.db)
+    try:
+        result = import_records(db, args.kind, read_records(args.path, args.format))
+    finally:
+        db.close()
+    
+    print(f"Добавлено записей: {result.inserted}")
+    for index, record, reason in result.errors:
+        print(f"Запись {index + 1} пропущена: {reason}")
+    return 1 if result.errors else 0
+
 if __name__ == "__main__":
-    init_database()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from database import Database
+
+# Имена для генерации пользователей
+FIRST_NAMES = ['Иван', 'Петр', 'Алексей', 'Мария', 'Анна', 'Елена', 'Дмитрий', 'Ольга',
+               'Сергей', 'Наталья', 'Андрей', 'Татьяна', 'Михаил', 'Ирина', 'Николай']
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев',
+              'Соколов', 'Михайлов', 'Новиков', 'Федоров', 'Морозов', 'Волков', 'Козлов']
+
+# Слова для названий и описаний проектов и задач
+WORDS = ['отчёт', 'сервер', 'база', 'данных', 'интерфейс', 'ошибка', 'клиент', 'дизайн',
+         'тестирование', 'релиз', 'бюджет', 'договор', 'поставка', 'склад', 'закупка',
+         'обучение', 'документация', 'аудит', 'миграция', 'интеграция', 'сайт', 'отдел',
+         'презентация', 'анализ', 'план', 'проверка', 'настройка', 'подготовка']
+TASK_VERBS = ['Подготовить', 'Проверить', 'Согласовать', 'Исправить', 'Разработать',
+              'Обновить', 'Настроить', 'Провести', 'Оформить', 'Описать']
+
+# Доли ролей среди пользователей (остальные - работники)
+ROLE_SHARES = [('director', 0.01), ('manager', 0.05), ('organizer', 0.03)]
+
+PRIORITY_WEIGHTS = [('low', 30), ('medium', 40), ('high', 20), ('critical', 10)]
+
+def _phrase(rng, length):
+    """Случайная фраза из словаря"""
+    return ' '.join(rng.choices(WORDS, k=length))
+
+def generate_users(rng, count, prefix):
+    """Пользователи: небольшие доли руководящих ролей, остальные работники"""
+    for number in range(1, count + 1):
+        role = 'worker'
+        point = rng.random()
+        for candidate, share in ROLE_SHARES:
+            if point < share:
+                role = candidate
+                break
+            point -= share
+        yield {
+            'username': f'{prefix}{number}',
+            'password': f'pass{number}',
+            'role': role,
+            'full_name': f'{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}',
+            'email': f'{prefix}{number}@company.com',
+        }
+
+def generate_projects(rng, count, organizer_ids, today):
+    """Проекты за последние три года; законченные давно проекты закрыты"""
+    for number in range(count):
+        start = today - timedelta(days=rng.randint(0, 3 * 365))
+        end = start + timedelta(days=rng.randint(30, 365))
+        yield {
+            'name': f'Проект {number + 1}: {_phrase(rng, 2)}',
+            'description': _phrase(rng, rng.randint(10, 40)),
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            # Бюджеты распределены логнормально: много небольших, мало крупных
+            'budget': round(rng.lognormvariate(13, 1), 2),
+            'organizer_id': rng.choice(organizer_ids) if organizer_ids else None,
+            'status': 'closed' if end < today - timedelta(days=90) else 'active',
+        }
+
+def generate_tasks(rng, count, projects, worker_ids, today):
+    """Задачи с неравномерной нагрузкой: часть проектов и работников получают больше задач"""
+    # Веса по закону Ципфа: k-й проект (работник) получает задачи с весом 1/k
+    project_weights = [1 / rank for rank in range(1, len(projects) + 1)]
+    worker_weights = [1 / rank for rank in range(1, len(worker_ids) + 1)]
+    priorities, priority_weights = zip(*PRIORITY_WEIGHTS)
+    
+    for _ in range(count):
+        project_id, start, end = rng.choices(projects, project_weights)[0]
+        deadline = None
+        if rng.random() < 0.9:
+            deadline = start + timedelta(days=rng.randint(0, max((end - start).days, 1)))
+        
+        # Задачи с прошедшим дедлайном чаще всего уже выполнены
+        if deadline is not None and deadline < today:
+            status = 'completed' if rng.random() < 0.85 else 'pending'
+        else:
+            status = rng.choices(['pending', 'in_progress', 'completed'], [50, 30, 20])[0]
+        
+        yield {
+            'title': f'{rng.choice(TASK_VERBS)} {_phrase(rng, 3)}',
+            'description': _phrase(rng, rng.randint(5, 30)),
+            'project_id': project_id,
+            'assigned_to': rng.choices(worker_ids, worker_weights)[0] if worker_ids else None,
+            'priority': rng.choices(priorities, priority_weights)[0],
+            'deadline': deadline.isoformat() if deadline else None,
+            'status': status,
+        }
+
+def generate(db, users=100, departments=5, projects=50, tasks=10000, seed=1, today=None):
+    """Заполнение базы синтетическими данными; при одинаковом seed данные одинаковы.
+    
+    today - опорная дата для сроков проектов и задач; по умолчанию фиксирована,
+    чтобы генерация не зависела от дня запуска. Возвращает словарь с числом
+    добавленных записей каждого вида.
+    """
+    rng = random.Random(seed)
+    today = today or date(2024, 6, 1)
+    
+    db.create_users_bulk(generate_users(rng, users, prefix=f'gen{seed}_'))
+    role_ids = {}
+    for user_id, role in db.conn.execute('SELECT id, role FROM users'):
+        role_ids.setdefault(role, []).append(user_id)
+    
+    with db.transaction():
+        # Отделы образуют дерево: каждый следующий с вероятностью 3/4 вложен
+        # в один из уже созданных; сотрудники распределяются по отделам
+        directors = role_ids.get('director', []) + role_ids.get('manager', [])
+        department_ids = []
+        for number in range(departments):
+            parent_id = rng.choice(department_ids) if department_ids and rng.random() < 0.75 else None
+            department_ids.append(db.conn.execute('''
+            INSERT INTO departments (name, director_id, parent_id) VALUES (?, ?, ?)
+            ''', (f'Отдел {number + 1}', rng.choice(directors) if directors else None,
+                  parent_id)).lastrowid)
+        if department_ids:
+            staff = role_ids.get('worker', []) + role_ids.get('manager', [])
+            db.conn.executemany('''
+            INSERT OR IGNORE INTO department_members (department_id, user_id) VALUES (?, ?)
+            ''', [(rng.choice(department_ids), user_id) for user_id in staff])
+    
+    db.create_projects_bulk(generate_projects(rng, projects, role_ids.get('organizer', []), today))
+    project_rows = [(project_id, date.fromisoformat(start), date.fromisoformat(end))
+                    for project_id, start, end in db.conn.execute(
+                        'SELECT id, start_date, end_date FROM projects WHERE start_date IS NOT NULL')]
+    rng.shuffle(project_rows)
+    worker_ids = role_ids.get('worker', [])
+    rng.shuffle(worker_ids)
+    
+    result = db.create_tasks_bulk(generate_tasks(rng, tasks, project_rows, worker_ids, today))
+    return {'users': users, 'departments': departments, 'projects': projects,
+            'tasks': result.inserted}
+
+def main(argv=None):
+    """Командная строка генератора"""
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных для системы учета")
+    parser.add_argument('--db', default='uchet.db', help="Путь к файлу базы данных")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--departments', type=int, default=5)
+    parser.add_argument('--projects', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    
+    db = Database(args.db)
+    try:
+        counts = generate(db, args.users, args.departments, args.projects, args.tasks, args.seed)
+    finally:
+        db.close()
+    print(", ".join(f"{kind}: {count}" for kind, count in counts.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
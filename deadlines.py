@@ -0,0 +1,188 @@
+import heapq
+from datetime import date, datetime, timedelta
+
+# Состояния срока незавершённой задачи: скоро срок, срок сегодня, просрочена
+SOON, TODAY, OVERDUE = 'soon', 'today', 'overdue'
+
+def deadline_state(task, today, horizon_days):
+    """Состояние срока задачи на дату today (None - срок не близко или задача выполнена)"""
+    if task.status == 'completed' or not task.deadline:
+        return None
+    try:
+        deadline = date.fromisoformat(task.deadline)
+    except ValueError:
+        return None
+    if deadline < today:
+        return OVERDUE
+    if deadline == today:
+        return TODAY
+    if deadline <= today + timedelta(days=horizon_days):
+        return SOON
+    return None
+
+def _midnight(day):
+    return datetime.combine(day, datetime.min.time())
+
+class DeadlineScheduler:
+    """Отслеживание сроков задач пользователя с одним таймером Tk.
+    
+    При запуске одним запросом по индексу загружаются незавершённые задачи со
+    сроком не позже horizon_days дней от сегодня (включая просроченные). Для
+    каждой задачи в куче лежит момент её следующего перехода (скоро срок ->
+    срок сегодня -> просрочена), и root.after заводится только на ближайший
+    из них; таблица задач не опрашивается. В полночь окно сроков сдвигается
+    на день запросом только по новому дню.
+    
+    Изменения задач передаются в apply_changes (RowChanges, как для
+    PagedTreeview) и обрабатываются точечно. notify(events) вызывается в
+    потоке Tk со списком (задача, прежнее состояние, новое состояние).
+    """
+    
+    MAX_TIMER_MS = 15 * 60 * 1000  # таймер перезаводится не реже (сон, перевод часов)
+    
+    def __init__(self, root, executor, user_id, notify, horizon_days=3):
+        self.root = root
+        self.executor = executor
+        self.user_id = user_id
+        self.notify = notify
+        self.horizon_days = horizon_days
+        self.tracked = {}  # id задачи -> (задача, состояние, момент следующего перехода)
+        self.heap = []  # (момент, id задачи); устаревшие элементы пропускаются
+        self.loaded_until = None
+        self.timer = None
+        self.query = None
+    
+    def start(self):
+        """Загрузка ближайших сроков в фоновом потоке"""
+        today = date.today()
+        until = today + timedelta(days=self.horizon_days)
+        self.query = self.executor.submit(
+            lambda db: db.get_deadlines(self.user_id, until.isoformat()),
+            lambda tasks: self.on_loaded(tasks, today, until), self.on_error)
+    
+    def on_loaded(self, tasks, today, until):
+        """Заполнение кучи загруженными задачами"""
+        self.query = None
+        self.loaded_until = until
+        events = self._track_all(tasks, today)
+        self._schedule()
+        self.notify(events)
+    
+    def on_error(self, error):
+        """Ошибка загрузки: повтор при следующем срабатывании таймера"""
+        self.query = None
+        self._schedule()
+    
+    def state(self, task, today=None):
+        """Состояние срока задачи на сегодня"""
+        return deadline_state(task, today or date.today(), self.horizon_days)
+    
+    def counts(self):
+        """Число отслеживаемых задач по состояниям"""
+        counts = {SOON: 0, TODAY: 0, OVERDUE: 0}
+        for _, state, _ in self.tracked.values():
+            counts[state] += 1
+        return counts
+    
+    def _track_all(self, tasks, today):
+        events = []
+        for task in tasks:
+            event = self._track(task, today)
+            if event is not None:
+                events.append(event)
+        return events
+    
+    def _track(self, task, today):
+        """Учёт задачи (новой или изменённой); возвращает событие при смене состояния"""
+        old = self.tracked.pop(task.id, None)
+        old_state = old[1] if old else None
+        state = deadline_state(task, today, self.horizon_days)
+        if state is not None:
+            deadline = date.fromisoformat(task.deadline)
+            # Следующий переход: в день срока и на следующий день после него
+            when = None
+            if state == SOON:
+                when = _midnight(deadline)
+            elif state == TODAY:
+                when = _midnight(deadline + timedelta(days=1))
+            self.tracked[task.id] = (task, state, when)
+            if when is not None:
+                heapq.heappush(self.heap, (when, task.id))
+        if state != old_state:
+            return task, old_state, state
+        return None
+    
+    def apply_changes(self, changes):
+        """Точечный учёт изменённых и удалённых задач (RowChanges)"""
+        today = date.today()
+        events = []
+        for task_id in changes.deleted:
+            old = self.tracked.pop(task_id, None)
+            if old is not None:
+                events.append((old[0], old[1], None))
+        for task in changes.rows:
+            deadline = task.deadline
+            if (task.id not in self.tracked and deadline and self.loaded_until is not None
+                    and deadline > self.loaded_until.isoformat()):
+                continue  # срок за окном: задача придёт со сдвигом окна
+            event = self._track(task, today)
+            if event is not None:
+                events.append(event)
+        if events:
+            self._schedule()
+            self.notify(events)
+    
+    def _schedule(self):
+        """Таймер на ближайший переход или полночь (сдвиг окна сроков)"""
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+        while self.heap and not self._is_current(*self.heap[0]):
+            heapq.heappop(self.heap)
+        
+        when = _midnight(date.today() + timedelta(days=1))
+        if self.heap:
+            when = min(when, self.heap[0][0])
+        delay = (when - datetime.now()).total_seconds() * 1000
+        self.timer = self.root.after(int(min(max(delay, 0), self.MAX_TIMER_MS)) + 1, self.fire)
+    
+    def _is_current(self, when, task_id):
+        entry = self.tracked.get(task_id)
+        return entry is not None and entry[2] == when
+    
+    def fire(self):
+        """Срабатывание таймера: переходы, наступившие к текущему моменту"""
+        self.timer = None
+        now = datetime.now()
+        today = now.date()
+        events = []
+        while self.heap and self.heap[0][0] <= now:
+            when, task_id = heapq.heappop(self.heap)
+            if self._is_current(when, task_id):
+                event = self._track(self.tracked[task_id][0], today)
+                if event is not None:
+                    events.append(event)
+        
+        until = today + timedelta(days=self.horizon_days)
+        if self.loaded_until is None:
+            if self.query is None:
+                self.start()
+        elif until > self.loaded_until and self.query is None:
+            # Новый день: догружаются только задачи со сроком в сдвинутой части окна
+            after = self.loaded_until
+            self.query = self.executor.submit(
+                lambda db: db.get_deadlines(self.user_id, until.isoformat(), after.isoformat()),
+                lambda tasks: self.on_loaded(tasks, date.today(), until), self.on_error)
+        
+        self._schedule()
+        if events:
+            self.notify(events)
+    
+    def stop(self):
+        """Остановка таймера и отмена загрузки"""
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+        if self.query is not None:
+            self.query.cancel()
+            self.query = None
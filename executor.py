@@ -0,0 +1,142 @@
+import queue
+import threading
+from database import Database
+
+class QueryHandle:
+    """Запрос, поставленный в очередь фонового исполнителя"""
+    
+    def __init__(self, func, callback=None, errback=None):
+        self.func = func
+        self.callback = callback
+        self.errback = errback
+        self.cancelled = False
+        self.done = False
+        self._worker = None
+    
+    def cancel(self):
+        """Отмена запроса: результат не будет доставлен в интерфейс.
+        
+        Если запрос уже выполняется, текущая SQL-команда прерывается.
+        """
+        self.cancelled = True
+        worker = self._worker
+        if worker is not None:
+            worker.interrupt(self)
+
+class _WorkerState:
+    """Соединение рабочего потока и запрос, который он сейчас выполняет"""
+    
+    def __init__(self, db):
+        self.db = db
+        self.current = None
+        self.lock = threading.Lock()
+    
+    def interrupt(self, handle):
+        """Прерывание SQL-команды, только если поток всё ещё выполняет handle.
+        
+        Соединение сразу переходит к следующему запросу очереди, поэтому без
+        проверки под блокировкой поздняя отмена прервала бы чужой запрос.
+        """
+        with self.lock:
+            if self.current is handle and self.db.conn is not None:
+                self.db.conn.interrupt()
+
+class QueryExecutor:
+    """Выполнение запросов к БД в фоновых потоках.
+    
+    Каждый рабочий поток держит собственное соединение (Database), поэтому
+    медленный запрос или заблокированная база не останавливают цикл Tk.
+    func(db) выполняется в рабочем потоке, а callback(result) или errback(error)
+    вызываются в потоке Tk через root.after. factory() создаёт объект базы для
+    рабочего потока (по умолчанию Database(db_name, manager)); так исполнитель
+    работает и с клиентом сервера API.
+    """
+    
+    POLL_INTERVAL = 20  # мс между проверками готовых результатов
+    
+    def __init__(self, root, db_name='uchet.db', workers=2, manager=None, factory=None):
+        self.root = root
+        self.db_name = db_name
+        self.manager = manager
+        self.factory = factory or (lambda: Database(self.db_name, self.manager))
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._threads = []
+        for number in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"db-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._poll_id = self.root.after(self.POLL_INTERVAL, self._poll)
+    
+    def submit(self, func, callback=None, errback=None):
+        """Постановка запроса в очередь; возвращает QueryHandle для отмены"""
+        handle = QueryHandle(func, callback, errback)
+        self._tasks.put(handle)
+        return handle
+    
+    def _worker(self):
+        """Цикл рабочего потока"""
+        db = self.factory()
+        state = _WorkerState(db)
+        try:
+            while True:
+                handle = self._tasks.get()
+                if handle is None:
+                    break
+                if handle.cancelled:
+                    continue
+                
+                with state.lock:
+                    state.current = handle
+                    handle._worker = state
+                result = error = None
+                try:
+                    result = handle.func(db)
+                except Exception as e:
+                    error = e
+                finally:
+                    with state.lock:
+                        state.current = None
+                        handle._worker = None
+                
+                if db.conn is not None and db.conn.in_transaction:
+                    # Незавершённая транзакция (ошибка или отмена) не должна держать блокировку
+                    db.conn.rollback()
+                # Ошибка "interrupted" бывает только у отменённого запроса,
+                # и в errback она не попадает
+                if not handle.cancelled:
+                    self._results.put((handle, result, error))
+        finally:
+            db.close()
+    
+    def _poll(self):
+        """Доставка готовых результатов в потоке Tk"""
+        try:
+            while True:
+                try:
+                    handle, result, error = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if handle.cancelled:
+                    continue
+                handle.done = True
+                if error is None:
+                    if handle.callback:
+                        handle.callback(result)
+                elif handle.errback:
+                    handle.errback(error)
+                else:
+                    self.root.report_callback_exception(type(error), error, error.__traceback__)
+        finally:
+            self._poll_id = self.root.after(self.POLL_INTERVAL, self._poll)
+    
+    def shutdown(self, timeout=2.0):
+        """Остановка рабочих потоков и закрытие их соединений"""
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
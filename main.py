@@ -1,22 +1,263 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from database import Database
-import sys
+from tkinter import ttk, messagebox, filedialog
+from database import (BoardGroup, Database, Task, export_records, project_sort_key,
+                      task_sort_key)
+import analytics
+import backup
+from audit import AUDIT_ACTIONS
+from deadlines import DeadlineScheduler, SOON, TODAY, OVERDUE
+from executor import QueryExecutor
+from profiler import query_profiler
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta, timezone
+
+# Названия ролей и статусов задач на русском
+ROLE_NAMES = {
+    'admin': 'Администратор',
+    'director': 'Директор',
+    'manager': 'Менеджер',
+    'worker': 'Работник',
+    'organizer': 'Организатор'
+}
+
+STATUS_NAMES = {
+    'pending': 'Ожидает',
+    'in_progress': 'В работе',
+    'completed': 'Выполнена',
+    '': 'Без статуса'
+}
+
+# Действия и объекты журнала аудита на русском
+AUDIT_ACTION_NAMES = {
+    'login': 'Вход',
+    'login_failed': 'Неудачный вход',
+    'create_project': 'Создание проекта',
+    'update_task_status': 'Смена статуса задачи'
+}
+
+AUDIT_ENTITY_NAMES = {
+    'user': 'Пользователь',
+    'project': 'Проект',
+    'task': 'Задача'
+}
+
+def audit_bound(day):
+    """Начало местных суток day в UTC в формате времени журнала аудита"""
+    moment = datetime.combine(day, datetime.min.time()).astimezone(timezone.utc)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def audit_row_values(event):
+    """Колонки строки журнала аудита: местное время, кто, действие, объект, подробности"""
+    moment = datetime.strptime(event.occurred_at[:19], '%Y-%m-%d %H:%M:%S')
+    moment = moment.replace(tzinfo=timezone.utc).astimezone()
+    details = json.loads(event.details) if event.details else {}
+    if 'status' in details:
+        details['status'] = STATUS_NAMES.get(details['status'], details['status'])
+    target = ""
+    if event.entity:
+        target = f"{AUDIT_ENTITY_NAMES.get(event.entity, event.entity)} #{event.entity_id}"
+    return (moment.strftime('%Y-%m-%d %H:%M:%S'),
+            event.user_name or (f"#{event.user_id}" if event.user_id else ""),
+            AUDIT_ACTION_NAMES.get(event.action, event.action), target,
+            ", ".join(str(value) for value in details.values()))
+
+def fetch_dashboard_stats(db, user_id, role):
+    """Данные дашборда для роли (выполняется в фоновом потоке).
+    
+    Для работника - счётчики его задач по статусам, для остальных ролей -
+    (пользователи по ролям, задачи по статусам, задачи по проектам).
+    """
+    if role == 'worker':
+        return db.get_task_status_counts(user_id=user_id)
+    return (db.get_user_role_counts(active_only=False),
+            db.get_task_status_counts(),
+            db.get_project_task_counts())
+
+class PagedTreeview:
+    """Подгрузка строк в Treeview страницами по мере прокрутки.
+    
+    fetch_page(db, after) выполняется в фоновом потоке исполнителя запросов и
+    возвращает (строки, ключ следующей страницы), как постраничные методы
+    Database; row_values(row) - значения колонок строки, sort_key(row) - ключ
+    сортировки строки в том же порядке, что и в запросе, row_tags(row) -
+    необязательные теги строки для оформления. Открытие таблицы стоит одну
+    страницу независимо от размера таблицы в БД.
+    
+    Элементы таблицы имеют iid, равный id строки, поэтому изменения можно
+    применять точечно (apply_changes), сохраняя выделение и прокрутку.
+    """
+    
+    LOADING_TEXT = "Загрузка..."
+    
+    def __init__(self, tree, scrollbar, executor, fetch_page, row_values, sort_key,
+                 threshold=0.9, row_tags=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.executor = executor
+        self.fetch_page = fetch_page
+        self.row_values = row_values
+        self.sort_key = sort_key
+        self.row_tags = row_tags or (lambda row: ())
+        self.threshold = threshold
+        self.keys = []  # отсортированные (ключ, iid) загруженных строк
+        self.key_by_iid = {}
+        self.next_key = None
+        self.finished = False
+        self.query = None
+        self.loading_item = None
+        
+        tree.configure(yscrollcommand=self.on_scroll)
+        scrollbar.configure(command=tree.yview)
+        tree.bind("<Destroy>", lambda event: self.cancel(), add="+")
+        self.load_more()
+    
+    def load_more(self):
+        """Запрос следующей страницы"""
+        if self.finished or self.query is not None:
+            return
+        
+        # Строка-индикатор в конце таблицы, пока страница загружается
+        self.loading_item = self.tree.insert("", tk.END, values=(self.LOADING_TEXT,))
+        after = self.next_key
+        self.query = self.executor.submit(lambda db: self.fetch_page(db, after),
+                                          self.on_page, self.on_error)
+    
+    def on_page(self, result):
+        """Добавление полученной страницы в таблицу"""
+        self.query = None
+        if not self.tree.winfo_exists():
+            return
+        self.remove_loading_item()
+        
+        rows, self.next_key = result
+        for row in rows:
+            iid = str(row[0])
+            if self.tree.exists(iid):
+                continue
+            self.tree.insert("", tk.END, iid=iid, values=self.row_values(row),
+                             tags=self.row_tags(row))
+            key = self.comparable(self.sort_key(row))
+            self.keys.append((key, iid))
+            self.key_by_iid[iid] = key
+        self.finished = self.next_key is None
+    
+    @staticmethod
+    def comparable(key):
+        """Ключ сортировки, сравнимый в Python так же, как в SQLite (NULL первым)"""
+        return tuple((value is not None, value) for value in key)
+    
+    def apply_changes(self, changes):
+        """Точечное обновление таблицы по RowChanges без перезагрузки.
+        
+        Изменённые строки обновляются на месте и при необходимости
+        перемещаются на своё место в сортировке, новые вставляются, удалённые
+        убираются. Строки за пределами загруженной части пропускаются: они
+        придут со следующими страницами.
+        """
+        if not self.tree.winfo_exists():
+            return
+        
+        for row_id in changes.deleted:
+            self.remove_row(str(row_id))
+        
+        boundary = None if self.finished else self.comparable(self.next_key)
+        for row in changes.rows:
+            iid = str(row[0])
+            key = self.comparable(self.sort_key(row))
+            self.remove_key(iid)
+            
+            if boundary is not None and key > boundary:
+                # Строка ушла за загруженную часть
+                if self.tree.exists(iid):
+                    self.tree.delete(iid)
+                continue
+            
+            index = bisect_left(self.keys, (key, iid))
+            self.keys.insert(index, (key, iid))
+            self.key_by_iid[iid] = key
+            if self.tree.exists(iid):
+                self.tree.move(iid, "", index)
+                self.tree.item(iid, values=self.row_values(row), tags=self.row_tags(row))
+            else:
+                self.tree.insert("", index, iid=iid, values=self.row_values(row),
+                                 tags=self.row_tags(row))
+    
+    def remove_key(self, iid):
+        """Удаление строки из списка ключей сортировки"""
+        key = self.key_by_iid.pop(iid, None)
+        if key is not None:
+            del self.keys[bisect_left(self.keys, (key, iid))]
+    
+    def remove_row(self, iid):
+        """Удаление строки из таблицы"""
+        self.remove_key(iid)
+        if self.tree.exists(iid):
+            self.tree.delete(iid)
+    
+    def on_error(self, error):
+        """Ошибка загрузки страницы"""
+        self.query = None
+        if self.tree.winfo_exists():
+            self.remove_loading_item()
+        messagebox.showerror("Ошибка", f"Не удалось загрузить данные:\n{error}")
+    
+    def remove_loading_item(self):
+        """Удаление строки-индикатора загрузки"""
+        if self.loading_item is not None:
+            self.tree.delete(self.loading_item)
+            self.loading_item = None
+    
+    def cancel(self):
+        """Отмена незавершённой загрузки (например, при уничтожении таблицы)"""
+        if self.query is not None:
+            self.query.cancel()
+            self.query = None
+    
+    def clear(self):
+        """Отмена загрузки и удаление всех строк таблицы"""
+        self.cancel()
+        self.tree.delete(*self.tree.get_children())
+        self.loading_item = None
+        self.keys = []
+        self.key_by_iid = {}
+        self.next_key = None
+        self.finished = True
+    
+    def reset(self, fetch_page):
+        """Новая выборка в той же таблице: строки заменяются страницами fetch_page"""
+        self.clear()
+        self.fetch_page = fetch_page
+        self.finished = False
+        self.load_more()
+    
+    def on_scroll(self, first, last):
+        """Прокрутка близко к концу загруженных строк запрашивает следующую страницу"""
+        self.scrollbar.set(first, last)
+        if self.finished or self.query is not None or not self.tree.winfo_ismapped():
+            # Скрытая вкладка сообщает (0, 1) - это не повод грузить всё подряд
+            return
+        if float(last) >= self.threshold:
+            self.load_more()
 
 class LoginWindow:
     """Окно авторизации"""
-    def __init__(self, root, on_login_success):
+    def __init__(self, root, on_login_success, db=None):
         self.root = root
         self.root.title("Авторизация")
         self.root.geometry("400x300")
         self.on_login_success = on_login_success
+        self.db = db or Database()
         
         # Центрирование окна
         self.center_window()
         
         # Создание элементов интерфейса
         self.create_widgets()
-        
+    
     def center_window(self):
         """Центрирование окна на экране"""
         self.root.update_idletasks()
@@ -29,7 +270,7 @@ class LoginWindow:
     def create_widgets(self):
         """Создание элементов интерфейса авторизации"""
         # Фрейм для элементов
-        frame = ttk.Frame(self.root, padding="20")
+        frame = self.frame = ttk.Frame(self.root, padding="20")
         frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Заголовок
@@ -63,29 +304,160 @@ class LoginWindow:
             messagebox.showerror("Ошибка", "Заполните все поля!")
             return
         
-        db = Database()
-        user_data = db.authenticate_user(username, password)
-        db.close()
+        try:
+            user_data = self.db.authenticate_user(username, password)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Нет связи с базой данных:\n{e}")
+            return
         
         if user_data:
-            self.root.destroy()
+            # Окно Tk переходит главному окну приложения, убирается только форма входа
+            self.frame.destroy()
             self.on_login_success(user_data)
         else:
             messagebox.showerror("Ошибка", "Неверный логин или пароль!")
 
 class MainApplication:
     """Главное окно приложения"""
-    def __init__(self, user_data):
+    
+    CHANGE_POLL_INTERVAL = 3000  # мс между опросами журнала изменений
+    SEARCH_DELAY = 250  # мс без ввода, после которых запускается поиск
+    STARTUP_BUDGET_MS = 500  # бюджет от входа до данных видимой вкладки
+    STARTUP_NOTICE_MS = 15000  # сколько показывается сообщение о превышении бюджета
+    DEADLINE_HORIZON_DAYS = 3  # за сколько дней предупреждать о сроке задачи
+    DEADLINE_NOTICE_MS = 10000  # сколько показывается сообщение о наступившем сроке
+    DEADLINE_COLORS = {OVERDUE: '#c0392b', TODAY: '#d35400', SOON: '#9a7d0a'}
+    
+    def __init__(self, user_data, db=None, root=None):
+        self.started = time.perf_counter()
+        self.startup_timings = {}
         self.user_data = user_data
-        self.user_id, self.username, self.role, self.full_name = user_data
+        self.user_id = user_data.id
+        self.username = user_data.username
+        self.role = user_data.role
+        self.full_name = user_data.full_name
         
-        self.root = tk.Tk()
+        # Окно входа передаёт своё корневое окно, второй экземпляр Tk не создаётся
+        self.root = root or tk.Tk()
         self.root.title(f"Система учета - {self.full_name} ({self.role})")
         self.root.geometry("1200x700")
         
-        self.db = Database()
+        # Соединение, открытое окном входа, переиспользуется
+        self.db = db or Database()
+        
+        # Запросы интерфейса выполняются в фоновых потоках со своими соединениями
+        # (при работе через сервер API - со своими HTTP-клиентами)
+        self.remote = not isinstance(self.db, Database)
+        if not self.remote:
+            # Действия этого окна попадают в журнал аудита от имени вошедшего
+            # (через сервер API пользователя подставляет сервер)
+            self.db.actor_id = self.user_id
+        self.executor = QueryExecutor(self.root, self.db.db_name, manager=self.db.manager,
+                                      factory=self.db.clone)
+        self.queries = {}
+        
+        # Номер журнала изменений запрашивается раньше данных вкладок, чтобы
+        # не пропустить правки, сделанные другими клиентами во время загрузки
+        self.last_change_seq = None
+        self.run_query(lambda db: db.get_last_change_seq(), self.start_change_feed)
         self.setup_ui()
-        
+        self.root.after_idle(self.mark_startup, 'window')
+        
+        # Сроки задач отслеживаются одним таймером, без опроса таблицы;
+        # загрузка ставится в очередь после данных видимой вкладки
+        self.deadline_notice = None
+        self.deadlines = DeadlineScheduler(self.root, self.executor, self.user_id,
+                                           self.on_deadlines, self.DEADLINE_HORIZON_DAYS)
+        self.deadlines.start()
+    
+    def mark_startup(self, stage):
+        """Отметка этапа запуска: миллисекунды от входа в систему.
+        
+        'window' - окно построено и отрисовано, 'data' - видимая вкладка
+        получила данные. Превышение STARTUP_BUDGET_MS показывается в строке
+        статуса; щелчок по сообщению открывает диагностику запросов.
+        """
+        if stage in self.startup_timings:
+            return
+        self.startup_timings[stage] = round((time.perf_counter() - self.started) * 1000, 1)
+        if stage == 'data' and self.startup_timings[stage] > self.STARTUP_BUDGET_MS:
+            names = {'window': "окно", 'data': "данные"}
+            timings = ", ".join(f"{names.get(name, name)} {ms:g} мс"
+                                for name, ms in self.startup_timings.items())
+            self.startup_label.configure(
+                text=f"Запуск дольше {self.STARTUP_BUDGET_MS} мс: {timings}")
+            self.root.after(self.STARTUP_NOTICE_MS, lambda: self.startup_label.configure(text=""))
+    
+    def run_query(self, func, callback, key=None):
+        """Фоновый запрос к БД: func(db) в рабочем потоке, callback(result) в потоке Tk.
+        
+        Новый запрос с тем же key отменяет предыдущий, ещё не завершённый.
+        """
+        if key in self.queries:
+            self.queries.pop(key).cancel()
+        
+        def on_result(result):
+            self.queries.pop(key, None)
+            callback(result)
+        
+        def on_error(error):
+            self.queries.pop(key, None)
+            messagebox.showerror("Ошибка", f"Ошибка при обращении к базе данных:\n{error}")
+        
+        handle = self.executor.submit(func, on_result, on_error)
+        if key is not None:
+            self.queries[key] = handle
+        return handle
+    
+    def start_change_feed(self, seq):
+        """Запуск периодического опроса журнала изменений"""
+        self.last_change_seq = seq
+        self.root.after(self.CHANGE_POLL_INTERVAL, self.poll_changes)
+    
+    def poll_changes(self):
+        """Опрос журнала изменений: правки других клиентов применяются точечно"""
+        since = self.last_change_seq
+        tasks_archived = self.tasks_archived.get()
+        projects_archived = self.projects_archived.get()
+        
+        def fetch(db):
+            changes = db.get_changes_since(since)
+            if not changes:
+                return since, [], None, None
+            
+            changed = {'users': set(), 'projects': set(), 'tasks': set()}
+            for _, table, row_id, _ in changes:
+                changed[table].add(row_id)
+            task_changes = project_changes = None
+            if changed['tasks']:
+                task_changes = db.get_task_changes(self.user_id, changed['tasks'],
+                                                   include_archived=tasks_archived)
+            if changed['projects']:
+                project_changes = db.get_project_changes(changed['projects'],
+                                                         include_archived=projects_archived)
+            return changes[-1][0], changes, task_changes, project_changes
+        
+        def apply(result):
+            self.last_change_seq, changes, task_changes, project_changes = result
+            # Ещё не открытые вкладки получат актуальные данные при первом показе
+            if task_changes:
+                self.deadlines.apply_changes(task_changes)
+            if task_changes and self.tasks_view is not None:
+                self.tasks_view.apply_changes(task_changes)
+            if project_changes and self.projects_view is not None:
+                self.projects_view.apply_changes(project_changes)
+            if (self.dashboard_tab in self.loaded_tabs and
+                    any(table in ('users', 'tasks') for _, table, _, _ in changes)):
+                # Счётчики дашборда читаются за постоянное время - достаточно перечитать их
+                self.load_dashboard()
+            self.root.after(self.CHANGE_POLL_INTERVAL, self.poll_changes)
+        
+        def retry(error):
+            # Временная ошибка (например, база занята) не должна останавливать опрос
+            self.root.after(self.CHANGE_POLL_INTERVAL, self.poll_changes)
+        
+        self.executor.submit(fetch, apply, retry)
+    
     def setup_ui(self):
         """Настройка пользовательского интерфейса"""
         # Создание меню
@@ -97,7 +469,7 @@ class MainApplication:
         # Основная область
         self.create_main_area()
         
-        # Загрузка данных в зависимости от роли
+        # Данные загружаются только для видимой вкладки
         self.load_role_specific_data()
     
     def create_menu(self):
@@ -108,6 +480,18 @@ class MainApplication:
         # Меню "Файл"
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Файл", menu=file_menu)
+        
+        # Выгрузка читает базу потоком напрямую, через сервер API она недоступна
+        if not self.remote:
+            export_menu = tk.Menu(file_menu, tearoff=0)
+            file_menu.add_cascade(label="Экспорт", menu=export_menu)
+            export_menu.add_command(label="Проекты...", command=lambda: self.export_data('projects'))
+            export_menu.add_command(label="Задачи...", command=lambda: self.export_data('tasks'))
+            if self.role in ['admin', 'director', 'manager']:
+                export_menu.add_command(label="Пользователи...", command=lambda: self.export_data('users'))
+            if self.role in ['admin', 'director']:
+                file_menu.add_command(label="Резервная копия...", command=self.backup_database)
+            file_menu.add_separator()
         file_menu.add_command(label="Выход", command=self.exit_app)
         
         # Меню "Справочники" (только для админов и директоров)
@@ -116,6 +500,7 @@ class MainApplication:
             menubar.add_cascade(label="Справочники", menu=reference_menu)
             reference_menu.add_command(label="Пользователи", command=self.show_users)
             reference_menu.add_command(label="Отделы", command=self.show_departments)
+            reference_menu.add_command(label="Журнал аудита", command=self.show_audit)
         
         # Меню "Проекты"
         project_menu = tk.Menu(menubar, tearoff=0)
@@ -129,6 +514,7 @@ class MainApplication:
         task_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Задачи", menu=task_menu)
         task_menu.add_command(label="Мои задачи", command=self.show_my_tasks)
+        task_menu.add_command(label="Поиск", command=self.show_search)
         
         if self.role in ['admin', 'director', 'manager']:
             task_menu.add_command(label="Назначить задачу", command=self.assign_task)
@@ -136,6 +522,7 @@ class MainApplication:
         # Меню "Помощь"
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Помощь", menu=help_menu)
+        help_menu.add_command(label="Диагностика запросов", command=self.show_diagnostics)
         help_menu.add_command(label="О программе", command=self.show_about)
     
     def create_status_bar(self):
@@ -147,6 +534,17 @@ class MainApplication:
                  relief=tk.SUNKEN, anchor=tk.W).pack(side=tk.LEFT, fill=tk.X, expand=True)
         
         ttk.Button(status_frame, text="Выход", command=self.exit_app).pack(side=tk.RIGHT, padx=5)
+        
+        # Сроки задач; щелчок открывает вкладку задач
+        self.deadline_label = ttk.Label(status_frame, text="", cursor="hand2")
+        self.deadline_label.pack(side=tk.RIGHT, padx=10)
+        self.deadline_label.bind("<Button-1>", lambda event: self.show_my_tasks())
+        
+        # Превышение бюджета запуска; щелчок открывает диагностику запросов
+        self.startup_label = ttk.Label(status_frame, text="", cursor="hand2",
+                                       foreground=self.DEADLINE_COLORS[TODAY])
+        self.startup_label.pack(side=tk.RIGHT, padx=10)
+        self.startup_label.bind("<Button-1>", lambda event: self.show_diagnostics())
     
     def create_main_area(self):
         """Создание основной области"""
@@ -165,17 +563,47 @@ class MainApplication:
         # Вкладка "Задачи"
         self.tasks_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.tasks_tab, text="Задачи")
-    
-    def load_role_specific_data(self):
-        """Загрузка данных в зависимости от роли пользователя"""
-        # Дашборд
-        self.load_dashboard()
         
-        # Проекты
-        self.load_projects()
+        # Вкладка "Поиск"
+        self.search_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.search_tab, text="Поиск")
+        self.root.bind("<Control-f>", lambda event: self.show_search())
+        
+        # Вкладки заполняются при первом открытии
+        self.tab_loaders = {
+            self.dashboard_tab: self.load_dashboard,
+            self.projects_tab: self.load_projects,
+            self.tasks_tab: self.load_tasks,
+            self.search_tab: self.load_search,
+        }
         
-        # Задачи
-        self.load_tasks()
+        # Вкладки "Команда" и "Аналитика" (для руководителей)
+        self.board_tree = None
+        if self.role in ['admin', 'director', 'manager']:
+            self.board_tab = ttk.Frame(self.notebook)
+            self.notebook.add(self.board_tab, text="Команда")
+            self.tab_loaders[self.board_tab] = self.load_board
+            
+            self.analytics_tab = ttk.Frame(self.notebook)
+            self.notebook.add(self.analytics_tab, text="Аналитика")
+            self.tab_loaders[self.analytics_tab] = self.load_analytics
+        self.loaded_tabs = set()
+        self.projects_view = self.tasks_view = self.search_view = None
+        
+        # Показывать ли в списках проектов и задач записи из архива
+        self.projects_archived = tk.BooleanVar(self.root, value=False)
+        self.tasks_archived = tk.BooleanVar(self.root, value=False)
+        self.notebook.bind("<<NotebookTabChanged>>", lambda event: self.load_role_specific_data())
+    
+    def load_role_specific_data(self):
+        """Загрузка данных выбранной вкладки, если она ещё не открывалась"""
+        self.ensure_tab_loaded(self.notebook.nametowidget(self.notebook.select()))
+    
+    def ensure_tab_loaded(self, tab):
+        """Заполнение вкладки при первом обращении к ней"""
+        if tab not in self.loaded_tabs:
+            self.loaded_tabs.add(tab)
+            self.tab_loaders[tab]()
     
     def load_dashboard(self):
         """Загрузка дашборда"""
@@ -193,27 +621,82 @@ class MainApplication:
         ttk.Label(frame, text=welcome_text, font=('Arial', 12)).pack(anchor=tk.W, pady=(0, 20))
         
         # Статистика в зависимости от роли
+        stats_label = ttk.Label(frame, text="Загрузка статистики...", font=('Arial', 11))
+        stats_label.pack(anchor=tk.W)
+        
+        def show_stats(stats_text):
+            self.mark_startup('data')
+            if stats_label.winfo_exists():
+                stats_label.config(text=stats_text)
+        
         if self.role == 'worker':
-            tasks = self.db.get_tasks_by_user(self.user_id)
-            active_tasks = [t for t in tasks if t[6] == 'active']
-            
-            stats_text = f"Ваши задачи:\n"
-            stats_text += f"Всего: {len(tasks)}\n"
-            stats_text += f"Активные: {len(active_tasks)}\n"
-            stats_text += f"Выполнено: {len(tasks) - len(active_tasks)}"
+            def worker_stats(counts):
+                total = sum(counts.values())
+                completed = counts.get('completed', 0)
+                
+                stats_text = f"Ваши задачи:\n"
+                stats_text += f"Всего: {total}\n"
+                stats_text += f"Активные: {total - completed}\n"
+                stats_text += f"Выполнено: {completed}"
+                show_stats(stats_text)
             
-        elif self.role == 'manager':
-            users = self.db.get_all_users()
-            workers = [u for u in users if u[2] == 'worker']
-            
-            stats_text = f"Статистика:\n"
-            stats_text += f"Всего сотрудников: {len(workers)}\n"
-            stats_text += f"Всего пользователей: {len(users)}"
+            self.run_query(lambda db: fetch_dashboard_stats(db, self.user_id, self.role),
+                           worker_stats, key='dashboard')
+            return
+        
+        def overview_stats(stats):
+            role_counts, status_counts, project_counts = stats
             
-        else:
-            stats_text = "Используйте меню для навигации по системе"
+            if self.role == 'manager':
+                stats_text = f"Статистика:\n"
+                stats_text += f"Всего сотрудников: {role_counts.get('worker', 0)}\n"
+                stats_text += f"Всего пользователей: {sum(role_counts.values())}\n\n"
+            else:
+                stats_text = "Используйте меню для навигации по системе\n\n"
+                stats_text += self.format_counts("Пользователи по ролям", role_counts, ROLE_NAMES)
+                stats_text += "\n\n"
+            stats_text += self.format_counts("Задачи по статусам", status_counts, STATUS_NAMES)
+            show_stats(stats_text)
+            self.show_project_counts(frame, project_counts)
+        
+        # Все счётчики читаются одним фоновым запросом из таблиц, поддерживаемых триггерами
+        self.run_query(lambda db: fetch_dashboard_stats(db, self.user_id, self.role),
+                       overview_stats, key='dashboard')
+    
+    def format_counts(self, title, counts, names):
+        """Текст разбивки количества по категориям"""
+        lines = [f"{title}:"]
+        for key, count in sorted(counts.items()):
+            lines.append(f"{names.get(key, key)}: {count}")
+        if not counts:
+            lines.append("нет данных")
+        return "\n".join(lines)
+    
+    def show_project_counts(self, frame, project_counts):
+        """Таблица числа задач по проектам на дашборде"""
+        if not frame.winfo_exists() or not project_counts:
+            return
         
-        ttk.Label(frame, text=stats_text, font=('Arial', 11)).pack(anchor=tk.W)
+        ttk.Label(frame, text="Задачи по проектам", font=('Arial', 11, 'bold')).pack(anchor=tk.W, pady=(20, 5))
+        
+        columns = ("Проект", "Всего", "Активные", "Выполнено")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=8)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100)
+        tree.column("Проект", width=300)
+        
+        # Строки счётчиков (проект, название, статус, количество) сворачиваются по проектам
+        totals = {}
+        for project_id, name, status, count in project_counts:
+            entry = totals.setdefault(project_id, [name or "Без проекта", 0, 0])
+            entry[1] += count
+            if status == 'completed':
+                entry[2] += count
+        
+        for name, total, completed in totals.values():
+            tree.insert("", tk.END, values=(name, total, total - completed, completed))
+        tree.pack(anchor=tk.W, fill=tk.X)
     
     def load_projects(self):
         """Загрузка списка проектов"""
@@ -223,8 +706,13 @@ class MainApplication:
         frame = ttk.Frame(self.projects_tab)
         frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Заголовок
-        ttk.Label(frame, text="Список проектов", font=('Arial', 14, 'bold')).pack(anchor=tk.W, pady=(0, 10))
+        # Заголовок и переключатель архива (список перезагружается)
+        header = ttk.Frame(frame)
+        header.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(header, text="Список проектов", font=('Arial', 14, 'bold')).pack(side=tk.LEFT)
+        ttk.Checkbutton(header, text="Показывать архив", variable=self.projects_archived,
+                        command=self.load_projects).pack(side=tk.RIGHT)
+        include_archived = self.projects_archived.get()
         
         # Таблица проектов
         columns = ("ID", "Название", "Организатор", "Дата начала", "Дата окончания", "Бюджет", "Статус")
@@ -238,14 +726,16 @@ class MainApplication:
         tree.column("Название", width=200)
         tree.column("Организатор", width=150)
         
-        # Добавление данных
-        projects = self.db.get_projects()
-        for project in projects:
-            tree.insert("", tk.END, values=project)
-        
-        # Полоса прокрутки
-        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
+        # Полоса прокрутки и постраничная загрузка данных
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL)
+        self.projects_view = PagedTreeview(tree, scrollbar, self.executor,
+                                           fetch_page=lambda db, after: db.get_projects_page(
+                                               after, include_archived=include_archived),
+                                           row_values=lambda project: (
+                                               project.id, project.name, project.organizer_name,
+                                               project.start_date, project.end_date,
+                                               project.budget, project.status),
+                                           sort_key=project_sort_key)
         
         # Размещение
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -259,12 +749,18 @@ class MainApplication:
         frame = ttk.Frame(self.tasks_tab)
         frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Заголовок
-        ttk.Label(frame, text="Мои задачи", font=('Arial', 14, 'bold')).pack(anchor=tk.W, pady=(0, 10))
+        # Заголовок и переключатель архива (список перезагружается)
+        header = ttk.Frame(frame)
+        header.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(header, text="Мои задачи", font=('Arial', 14, 'bold')).pack(side=tk.LEFT)
+        ttk.Checkbutton(header, text="Показывать архив", variable=self.tasks_archived,
+                        command=self.load_tasks).pack(side=tk.RIGHT)
+        include_archived = self.tasks_archived.get()
         
         # Таблица задач
         columns = ("ID", "Задача", "Проект", "Приоритет", "Дедлайн", "Статус")
-        tree = ttk.Treeview(frame, columns=columns, show="headings", height=15)
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=15,
+                            selectmode="extended")
         
         # Настройка колонок
         for col in columns:
@@ -274,26 +770,368 @@ class MainApplication:
         tree.column("Задача", width=250)
         tree.column("Проект", width=150)
         
-        # Добавление данных
-        tasks = self.db.get_tasks_by_user(self.user_id)
-        for task in tasks:
-            tree.insert("", tk.END, values=task[:6])
-        
-        # Полоса прокрутки
-        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
+        # Полоса прокрутки и постраничная загрузка данных
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL)
+        self.tasks_view = PagedTreeview(tree, scrollbar, self.executor,
+                                        fetch_page=lambda db, after: db.get_tasks_by_user_page(
+                                            self.user_id, after, include_archived=include_archived),
+                                        row_values=lambda task: (
+                                            task.id, task.title, task.project_name,
+                                            task.priority, task.deadline, task.status),
+                                        sort_key=task_sort_key,
+                                        row_tags=self.deadline_tags)
+        for state, color in self.DEADLINE_COLORS.items():
+            tree.tag_configure(state, foreground=color)
         
         # Размещение
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Кнопки для рабочих
+        # Кнопки для рабочих: действие применяется ко всем выделенным задачам
+        # (выделение нескольких строк - Ctrl/Shift+щелчок, Ctrl+A - все загруженные)
         if self.role == 'worker':
             btn_frame = ttk.Frame(frame)
             btn_frame.pack(pady=10)
             
-            ttk.Button(btn_frame, text="Отметить как выполненную", 
-                      command=lambda: self.update_task_status(tree)).pack(side=tk.LEFT, padx=5)
+            ttk.Button(btn_frame, text="Взять в работу",
+                      command=lambda: self.update_task_status(tree, 'in_progress')).pack(side=tk.LEFT, padx=5)
+            ttk.Button(btn_frame, text="Отметить как выполненные", 
+                      command=lambda: self.update_task_status(tree, 'completed')).pack(side=tk.LEFT, padx=5)
+            ttk.Button(btn_frame, text="Вернуть в ожидание",
+                      command=lambda: self.update_task_status(tree, 'pending')).pack(side=tk.LEFT, padx=5)
+            tree.bind("<Control-a>", lambda event: tree.selection_set(
+                [iid for iid in tree.get_children() if iid != self.tasks_view.loading_item]))
+    
+    def load_search(self):
+        """Вкладка полнотекстового поиска по задачам и проектам"""
+        for widget in self.search_tab.winfo_children():
+            widget.destroy()
+        
+        frame = ttk.Frame(self.search_tab)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Строка поиска
+        ttk.Label(frame, text="Поиск по задачам и проектам", font=('Arial', 14, 'bold')).pack(anchor=tk.W, pady=(0, 10))
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(frame, textvariable=self.search_var, width=60)
+        self.search_entry.pack(anchor=tk.W, pady=(0, 10))
+        
+        # Таблица результатов
+        columns = ("Тип", "ID", "Название", "Совпадение")
+        tree_frame = ttk.Frame(frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.search_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15)
+        for col in columns:
+            self.search_tree.heading(col, text=col)
+            self.search_tree.column(col, width=80)
+        self.search_tree.column("Название", width=250)
+        self.search_tree.column("Совпадение", width=500)
+        
+        self.search_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+        self.search_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.search_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.search_view = None
+        self.search_after_id = None
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+    
+    def show_search(self):
+        """Переход на вкладку поиска"""
+        self.notebook.select(self.search_tab)
+        self.ensure_tab_loaded(self.search_tab)
+        self.search_entry.focus_set()
+    
+    def schedule_search(self):
+        """Поиск по мере ввода: запрос уходит после короткой паузы в наборе"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(self.SEARCH_DELAY, self.run_search)
+    
+    def run_search(self):
+        """Выполнение поиска по введённому тексту"""
+        self.search_after_id = None
+        text = self.search_var.get()
+        if not text.strip():
+            if self.search_view is not None:
+                self.search_view.clear()
+            return
+        
+        # Работник видит только свои задачи, остальные роли - все
+        user_id = self.user_id if self.role == 'worker' else None
+        def fetch_page(db, after):
+            return db.search(text, user_id=user_id, after=after)
+        
+        if self.search_view is not None:
+            # Таблица и её обработчики создаются один раз, новый поиск только
+            # перезапускает выборку
+            self.search_view.reset(fetch_page)
+            return
+        
+        kind_names = {'task': "Задача", 'project': "Проект"}
+        self.search_view = PagedTreeview(
+            self.search_tree, self.search_scrollbar, self.executor,
+            fetch_page=fetch_page,
+            row_values=lambda hit: (kind_names[hit.kind], hit.id, hit.title, hit.snippet),
+            sort_key=lambda hit: (hit.score, hit.key))
+    
+    def load_board(self):
+        """Доска задач команды: проекты, в них исполнители, у исполнителей задачи.
+        
+        При открытии загружаются только проекты с числом задач по статусам
+        (один GROUP BY по счётчикам). Исполнители проекта запрашиваются при
+        первом раскрытии проекта, задачи исполнителя - при раскрытии его узла,
+        страницами по мере нажатия "Загрузить ещё".
+        """
+        for widget in self.board_tab.winfo_children():
+            widget.destroy()
+        
+        frame = ttk.Frame(self.board_tab)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        header = ttk.Frame(frame)
+        header.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(header, text="Задачи команды", font=('Arial', 14, 'bold')).pack(side=tk.LEFT)
+        ttk.Button(header, text="Обновить", command=self.load_board).pack(side=tk.RIGHT)
+        ttk.Button(header, text="Назначить задачу", command=self.assign_task).pack(side=tk.RIGHT, padx=5)
+        
+        columns = ("Приоритет", "Дедлайн", "Статус", "Всего", "Ожидает", "В работе", "Выполнено")
+        tree_frame = ttk.Frame(frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        tree = ttk.Treeview(tree_frame, columns=columns, show="tree headings", height=20)
+        tree.heading("#0", text="Проект / исполнитель / задача")
+        tree.column("#0", width=350)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=90)
+        for state, color in self.DEADLINE_COLORS.items():
+            tree.tag_configure(state, foreground=color)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.board_tree = tree
+        self.board_counts = {}  # узел группы -> [всего, ожидает, в работе, выполнено]
+        self.board_placeholders = {}  # узел группы -> строка "Загрузка..." до загрузки
+        self.board_pages = {}  # узел исполнителя -> [ключи загруженных задач, ключ следующей страницы]
+        self.board_requested = set()
+        
+        tree.bind("<<TreeviewOpen>>", lambda event: self.open_board_node(tree.focus()))
+        tree.bind("<<TreeviewSelect>>", lambda event: self.on_board_select())
+        self.run_query(lambda db: db.get_board_projects(),
+                       lambda groups: self.add_board_groups("", groups), key='board')
+    
+    @staticmethod
+    def board_node(project_id, user_id=None):
+        """iid узла проекта или исполнителя в проекте на доске команды"""
+        if user_id is None:
+            return f"p{project_id}"
+        return f"p{project_id}:u{user_id}"
+    
+    def set_board_counts(self, iid, counts):
+        """Запоминание и показ числа задач группы по статусам"""
+        self.board_counts[iid] = counts
+        self.board_tree.item(iid, values=("", "", "", *counts))
+    
+    def add_board_groups(self, parent, groups, index=tk.END):
+        """Узлы проектов (parent="") или исполнителей проекта; содержимое - при раскрытии"""
+        tree = self.board_tree
+        if tree is None or not tree.winfo_exists():
+            return
+        if parent in self.board_placeholders:
+            tree.delete(self.board_placeholders.pop(parent))
+        for group in groups:
+            if parent:
+                iid = f"{parent}:u{group.id}"
+                name = group.name or ("Без исполнителя" if not group.id else f"#{group.id}")
+            else:
+                iid = self.board_node(group.id)
+                name = group.name or ("Без проекта" if not group.id else f"Проект #{group.id}")
+            tree.insert(parent, index, iid=iid, text=name)
+            self.set_board_counts(iid, [group.total, group.pending, group.in_progress,
+                                        group.completed])
+            self.board_placeholders[iid] = tree.insert(iid, tk.END, text="Загрузка...")
+    
+    def open_board_node(self, iid):
+        """Первое раскрытие проекта или исполнителя: загрузка его содержимого"""
+        if iid not in self.board_placeholders or iid in self.board_requested:
+            return
+        self.board_requested.add(iid)
+        project_id, _, user_id = iid[1:].partition(":u")
+        if not user_id:
+            self.run_query(lambda db: db.get_board_assignees(int(project_id)),
+                           lambda groups: self.add_board_groups(iid, groups))
+        else:
+            self.board_pages[iid] = [[], None]
+            self.load_board_tasks(iid)
+    
+    def load_board_tasks(self, iid):
+        """Следующая страница задач исполнителя в проекте"""
+        project_id, _, user_id = iid[1:].partition(":u")
+        after = self.board_pages[iid][1]
+        self.run_query(lambda db: db.get_board_tasks_page(int(project_id), int(user_id), after),
+                       lambda result: self.add_board_tasks(iid, *result))
+    
+    def board_task_values(self, task):
+        return (task.priority, task.deadline, STATUS_NAMES.get(task.status, task.status),
+                "", "", "", "")
+    
+    def add_board_tasks(self, iid, tasks, next_key):
+        """Строки страницы задач под узлом исполнителя и строка "Загрузить ещё..." """
+        tree = self.board_tree
+        if tree is None or not tree.exists(iid):
+            return
+        placeholder = self.board_placeholders.pop(iid, None)
+        if placeholder is not None:
+            tree.delete(placeholder)
+        keys, _ = self.board_pages[iid]
+        for task in tasks:
+            tree.insert(iid, tk.END, iid=f"t{task.id}", text=task.title,
+                        values=self.board_task_values(task), tags=self.deadline_tags(task))
+            keys.append(PagedTreeview.comparable(task_sort_key(task)))
+        self.board_pages[iid][1] = next_key
+        if next_key is not None:
+            tree.insert(iid, tk.END, iid=f"{iid}:more", text="Загрузить ещё...")
+    
+    def on_board_select(self):
+        """Выбор строки "Загрузить ещё": запрос следующей страницы задач"""
+        for iid in self.board_tree.selection():
+            if iid.endswith(":more"):
+                self.board_tree.delete(iid)
+                self.load_board_tasks(iid[:-len(":more")])
+    
+    def board_position(self, parent, group_id, name):
+        """Место нового узла группы под parent: по названию, группа с id 0 - последней"""
+        if not group_id or not name:
+            return tk.END
+        last = f"{parent}:u0" if parent else self.board_node(0)
+        names = [self.board_tree.item(child, 'text') for child in self.board_tree.get_children(parent)
+                 if child != last]
+        return bisect_left(names, name)
+    
+    def board_add_task(self, task, project_name, assignee_name):
+        """Новая задача на доске без перезагрузки: счётчики групп и строка задачи.
+        
+        Недостающие узлы проекта и исполнителя создаются. Строка задачи
+        вставляется на своё место, если задачи исполнителя уже загружены и
+        она попадает в загруженную часть списка; иначе придёт со страницей.
+        """
+        tree = self.board_tree
+        if tree is None or not tree.winfo_exists():
+            return
+        project_id, user_id = task.project_id or 0, task.assigned_to or 0
+        iid = self.board_node(project_id)
+        group_iids = [iid]
+        if not tree.exists(iid):
+            self.add_board_groups("", [BoardGroup(project_id, project_name, 0, 0, 0, 0)],
+                                  self.board_position("", project_id, project_name))
+        if iid in self.board_requested:
+            member = self.board_node(project_id, user_id)
+            group_iids.append(member)
+            # Пока исполнители проекта загружаются, новая задача придёт вместе с ними
+            if not tree.exists(member) and iid not in self.board_placeholders:
+                self.add_board_groups(iid, [BoardGroup(user_id, assignee_name, 0, 0, 0, 0)],
+                                      self.board_position(iid, user_id, assignee_name))
+        
+        for group in group_iids:
+            if tree.exists(group):
+                total, pending, in_progress, completed = self.board_counts[group]
+                self.set_board_counts(group, [total + 1, pending + 1, in_progress, completed])
+        
+        member = group_iids[-1]
+        if member in self.board_pages and member not in self.board_placeholders:
+            keys, next_key = self.board_pages[member]
+            key = PagedTreeview.comparable(task_sort_key(task))
+            if next_key is None or key < keys[-1]:
+                index = bisect_left(keys, key)
+                keys.insert(index, key)
+                tree.insert(member, index, iid=f"t{task.id}", text=task.title,
+                            values=self.board_task_values(task), tags=self.deadline_tags(task))
+                tree.see(f"t{task.id}")
+    
+    def load_analytics(self):
+        """Вкладка аналитики: загрузка исполнителей, проекты и график сгорания"""
+        for widget in self.analytics_tab.winfo_children():
+            widget.destroy()
+        
+        frame = ttk.Frame(self.analytics_tab)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Заголовок, итоги и время расчёта
+        header = ttk.Frame(frame)
+        header.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(header, text="Аналитика", font=('Arial', 14, 'bold')).pack(side=tk.LEFT)
+        ttk.Button(header, text="Обновить", command=self.load_analytics).pack(side=tk.RIGHT)
+        totals_label = ttk.Label(frame, text="Расчёт...")
+        totals_label.pack(anchor=tk.W, pady=(0, 10))
+        
+        def table(parent, title, columns, height):
+            ttk.Label(parent, text=title, font=('Arial', 11, 'bold')).pack(anchor=tk.W, pady=(0, 5))
+            tree_frame = ttk.Frame(parent)
+            tree_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+            tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=height)
+            for col in columns:
+                tree.heading(col, text=col)
+                tree.column(col, width=90, anchor=tk.E)
+            scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            return tree
+        
+        workload_tree = table(frame, "Загрузка исполнителей",
+                              ("Исполнитель", "Всего", "Ожидает", "В работе", "Выполнено",
+                               "Просрочено", "% просрочки", "% нагрузки"), 8)
+        workload_tree.column("Исполнитель", width=200, anchor=tk.W)
+        projects_tree = table(frame, "Проекты (выберите проект для графика сгорания)",
+                              ("ID", "Проект", "Статус", "Бюджет", "Задач", "Открыто",
+                               "Просрочено", "% выполнения", "Бюджет на задачу"), 8)
+        projects_tree.column("Проект", width=200, anchor=tk.W)
+        projects_tree.column("Статус", anchor=tk.W)
+        burndown_tree = table(frame, "График сгорания по неделям сроков",
+                              ("Неделя", "Срок на неделе", "Выполнено", "Осталось",
+                               "Осталось по плану"), 6)
+        
+        def percent(value):
+            return f"{value * 100:.1f}"
+        
+        def money(value):
+            return "" if value is None else f"{value:,.0f}".replace(",", " ")
+        
+        def show(report):
+            if not frame.winfo_exists():
+                return
+            totals = report.totals
+            totals_label.config(text=(
+                f"На {report.today}: задач {totals['tasks']}, открыто {totals['open']}, "
+                f"просрочено {totals['overdue']} ({percent(totals['overdue_ratio'])}%), "
+                f"бюджет {money(totals['budget'])}, на задачу {money(totals['budget_per_task'])} | "
+                f"расчёт {report.elapsed_ms} мс"))
+            for row in report.workload:
+                workload_tree.insert("", tk.END, values=(
+                    row.full_name, row.total, row.pending, row.in_progress, row.completed,
+                    row.overdue, percent(row.overdue_ratio), percent(row.load_share)))
+            for row in report.projects:
+                projects_tree.insert("", tk.END, iid=str(row.project_id), values=(
+                    row.project_id, row.name, row.status, money(row.budget), row.total, row.open,
+                    row.overdue, percent(row.progress), money(row.budget_per_task)))
+        
+        def show_burndown(points):
+            if not frame.winfo_exists():
+                return
+            burndown_tree.delete(*burndown_tree.get_children())
+            for point in points:
+                burndown_tree.insert("", tk.END, values=point)
+        
+        def select_project(event):
+            selection = projects_tree.selection()
+            if selection:
+                project_id = int(selection[0])
+                self.run_query(lambda db: analytics.burndown(db, project_id), show_burndown,
+                               key='burndown')
+        
+        projects_tree.bind("<<TreeviewSelect>>", select_project)
+        self.run_query(analytics.analyze, show, key='analytics')
     
     def show_users(self):
         """Показать список пользователей"""
@@ -311,9 +1149,18 @@ class MainApplication:
             tree.heading(col, text=col)
             tree.column(col, width=100)
         
-        users = self.db.get_all_users()
-        for user in users:
-            tree.insert("", tk.END, values=user[:7])
+        loading_item = tree.insert("", tk.END, values=("", "Загрузка..."))
+        
+        def show(users):
+            if not tree.winfo_exists():
+                return
+            tree.delete(loading_item)
+            for user in users:
+                tree.insert("", tk.END, values=(user.id, user.username, user.role, user.full_name,
+                                                user.email, user.phone, user.created_at))
+        
+        query = self.run_query(lambda db: db.get_all_users(), show)
+        users_window.bind("<Destroy>", lambda event: query.cancel(), add="+")
         
         scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
         tree.configure(yscroll=scrollbar.set)
@@ -375,58 +1222,486 @@ class MainApplication:
             messagebox.showerror("Ошибка", "Бюджет должен быть числом!")
             return
         
-        project_id = self.db.create_project(
-            name=name,
-            description=description,
-            start_date="2024-01-01",
-            end_date="2024-12-31",
-            budget=budget,
-            organizer_id=self.user_id
-        )
-        
-        if project_id:
-            messagebox.showinfo("Успех", "Проект успешно создан!")
+        def save(db):
+            project_id = db.create_project(
+                name=name,
+                description=description,
+                start_date="2024-01-01",
+                end_date="2024-12-31",
+                budget=budget,
+                organizer_id=self.user_id
+            )
+            return project_id, db.get_project_changes([project_id] if project_id else [])
+        
+        def on_saved(result):
+            project_id, changes = result
+            if project_id:
+                messagebox.showinfo("Успех", "Проект успешно создан!")
+                if dialog.winfo_exists():
+                    dialog.destroy()
+                # Новая строка вставляется в уже загруженный список без перезагрузки
+                if self.projects_view is not None:
+                    self.projects_view.apply_changes(changes)
+        
+        self.run_query(save, on_saved)
+    
+    def export_data(self, kind):
+        """Выгрузка проектов, задач или пользователей в XLSX/CSV.
+        
+        Строки читаются и пишутся в файл потоком в фоновом потоке, окно
+        показывает ход выгрузки и позволяет её отменить.
+        """
+        titles = {'projects': "проектов", 'tasks': "задач", 'users': "пользователей"}
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title=f"Экспорт {titles[kind]}", defaultextension=".xlsx",
+            filetypes=[("Книга Excel", "*.xlsx"), ("CSV", "*.csv")], initialfile=f"{kind}.xlsx")
+        if not path:
+            return
+        
+        # Работник выгружает только свои задачи
+        user_id = self.user_id if kind == 'tasks' and self.role == 'worker' else None
+        progress = {'done': 0, 'total': 0}
+        stop = threading.Event()
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Экспорт")
+        dialog.geometry("420x130")
+        dialog.transient(self.root)
+        
+        status_label = ttk.Label(dialog, text=f"Экспорт {titles[kind]}...")
+        status_label.pack(pady=(15, 5))
+        bar = ttk.Progressbar(dialog, length=380, mode='determinate')
+        bar.pack(padx=20)
+        
+        def report(done, total):
+            # Вызывается в рабочем потоке: только запоминает значения для окна
+            progress['done'], progress['total'] = done, total
+        
+        def export(db):
+            return export_records(db, kind, path, user_id=user_id, progress=report, stop=stop)
+        
+        def refresh():
+            if not dialog.winfo_exists():
+                return
+            bar['maximum'] = max(progress['total'], 1)
+            bar['value'] = progress['done']
+            status_label.config(text=f"Выгружено {progress['done']} из {progress['total']}")
+            dialog.after(100, refresh)
+        
+        def on_done(count):
+            if dialog.winfo_exists():
+                dialog.destroy()
+            if count is not None:
+                messagebox.showinfo("Экспорт", f"Выгружено записей: {count}\n{path}")
+        
+        def on_error(error):
+            if dialog.winfo_exists():
+                dialog.destroy()
+            messagebox.showerror("Ошибка", f"Не удалось выполнить экспорт:\n{error}")
+        
+        handle = self.executor.submit(export, on_done, on_error)
+        
+        def cancel():
+            stop.set()
+            handle.cancel()
+            dialog.destroy()
+        
+        ttk.Button(dialog, text="Отмена", command=cancel).pack(pady=10)
+        dialog.protocol("WM_DELETE_WINDOW", cancel)
+        refresh()
+    
+    def backup_database(self):
+        """Резервная копия базы в выбранный файл без остановки работы.
+        
+        Копирование идёт порциями в фоновом потоке; остальные клиенты в это
+        время продолжают читать и записывать.
+        """
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title="Резервная копия базы", defaultextension=".db",
+            filetypes=[("База SQLite", "*.db")],
+            initialfile=f"uchet-{time.strftime(backup.SNAPSHOT_TIME_FORMAT)}.db")
+        if not path:
+            return
+        
+        progress = {'done': 0, 'total': 0}
+        stop = threading.Event()
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Резервная копия")
+        dialog.geometry("420x130")
+        dialog.transient(self.root)
+        
+        status_label = ttk.Label(dialog, text="Копирование базы...")
+        status_label.pack(pady=(15, 5))
+        bar = ttk.Progressbar(dialog, length=380, mode='determinate')
+        bar.pack(padx=20)
+        
+        def report(remaining, total):
+            # Вызывается в рабочем потоке; исключение прерывает копирование
+            if stop.is_set():
+                raise backup.BackupError("Копирование отменено")
+            progress['done'], progress['total'] = total - remaining, total
+        
+        def refresh():
+            if not dialog.winfo_exists():
+                return
+            bar['maximum'] = max(progress['total'], 1)
+            bar['value'] = progress['done']
+            status_label.config(text=f"Скопировано страниц: {progress['done']} из {progress['total']}")
+            dialog.after(100, refresh)
+        
+        def on_done(result):
+            if dialog.winfo_exists():
+                dialog.destroy()
+            messagebox.showinfo("Резервная копия", f"Копия базы сохранена и проверена:\n{path}")
+        
+        def on_error(error):
+            if dialog.winfo_exists():
+                dialog.destroy()
+            if not stop.is_set():
+                messagebox.showerror("Ошибка", f"Не удалось создать резервную копию:\n{error}")
+        
+        db_name = self.db.db_name
+        handle = self.executor.submit(lambda db: backup.backup(db_name, path, progress=report),
+                                      on_done, on_error)
+        
+        def cancel():
+            stop.set()
+            handle.cancel()
             dialog.destroy()
-            self.load_projects()
+        
+        ttk.Button(dialog, text="Отмена", command=cancel).pack(pady=10)
+        dialog.protocol("WM_DELETE_WINDOW", cancel)
+        refresh()
     
     def assign_task(self):
-        """Назначение задачи"""
-        messagebox.showinfo("Информация", "Функция назначения задач будет реализована в следующей версии")
+        """Назначение новой задачи исполнителю.
+        
+        Проект и исполнитель подставляются из выбранной строки доски команды.
+        Задача создаётся через create_task, и доска обновляется на месте.
+        """
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Назначить задачу")
+        dialog.geometry("500x420")
+        dialog.transient(self.root)
+        
+        ttk.Label(dialog, text="Новая задача", font=('Arial', 12, 'bold')).pack(pady=10)
+        
+        fields_frame = ttk.Frame(dialog, padding="20")
+        fields_frame.pack()
+        
+        ttk.Label(fields_frame, text="Название:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        title_entry = ttk.Entry(fields_frame, width=40)
+        title_entry.grid(row=0, column=1, pady=5)
+        
+        ttk.Label(fields_frame, text="Описание:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        desc_entry = tk.Text(fields_frame, width=40, height=4)
+        desc_entry.grid(row=1, column=1, pady=5)
+        
+        ttk.Label(fields_frame, text="Проект:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        project_box = ttk.Combobox(fields_frame, width=38, state="readonly", values=["Загрузка..."])
+        project_box.grid(row=2, column=1, pady=5)
+        
+        ttk.Label(fields_frame, text="Исполнитель:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        user_box = ttk.Combobox(fields_frame, width=38, state="readonly", values=["Загрузка..."])
+        user_box.grid(row=3, column=1, pady=5)
+        
+        ttk.Label(fields_frame, text="Приоритет:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        priority_box = ttk.Combobox(fields_frame, width=38, state="readonly",
+                                    values=["low", "medium", "high", "critical"])
+        priority_box.set("medium")
+        priority_box.grid(row=4, column=1, pady=5)
+        
+        ttk.Label(fields_frame, text="Дедлайн (ГГГГ-ММ-ДД):").grid(row=5, column=0, sticky=tk.W, pady=5)
+        deadline_entry = ttk.Entry(fields_frame, width=40)
+        deadline_entry.grid(row=5, column=1, pady=5)
+        
+        # Проект и исполнитель выбранной строки доски
+        selected_project = selected_user = None
+        if self.board_tree is not None and self.board_tree.winfo_exists():
+            node = next(iter(self.board_tree.selection()), "")
+            if node.startswith("t"):
+                node = self.board_tree.parent(node)
+            if node.startswith("p"):
+                project_id, _, user_id = node[1:].partition(":u")
+                selected_project = int(project_id)
+                selected_user = int(user_id) if user_id else None
+        
+        choices = {'projects': [], 'users': []}
+        
+        def show_choices(result):
+            if not dialog.winfo_exists():
+                return
+            choices['projects'], choices['users'] = result
+            project_box['values'] = [project.name for project in choices['projects']]
+            user_box['values'] = [f"{user.full_name} ({ROLE_NAMES.get(user.role, user.role)})"
+                                  for user in choices['users']]
+            project_box.set("")
+            user_box.set("")
+            for index, project in enumerate(choices['projects']):
+                if project.id == selected_project:
+                    project_box.current(index)
+            for index, user in enumerate(choices['users']):
+                if user.id == selected_user:
+                    user_box.current(index)
+        
+        def load_choices(db):
+            users = [user for user in db.get_all_users()
+                     if user.is_active and user.role in ('worker', 'manager')]
+            return db.get_projects(), users
+        
+        query = self.run_query(load_choices, show_choices)
+        dialog.bind("<Destroy>", lambda event: query.cancel(), add="+")
+        
+        def save():
+            title = title_entry.get().strip()
+            deadline = deadline_entry.get().strip() or None
+            if not title:
+                messagebox.showerror("Ошибка", "Введите название задачи!", parent=dialog)
+                return
+            if project_box.current() < 0 or user_box.current() < 0:
+                messagebox.showerror("Ошибка", "Выберите проект и исполнителя!", parent=dialog)
+                return
+            if deadline:
+                try:
+                    date.fromisoformat(deadline)
+                except ValueError:
+                    messagebox.showerror("Ошибка", "Дедлайн должен быть в формате ГГГГ-ММ-ДД!",
+                                         parent=dialog)
+                    return
+            project = choices['projects'][project_box.current()]
+            user = choices['users'][user_box.current()]
+            description = desc_entry.get("1.0", tk.END).strip()
+            priority = priority_box.get()
+            
+            def on_created(task_id):
+                if dialog.winfo_exists():
+                    dialog.destroy()
+                task = Task(task_id, title, project.name, priority, deadline, 'pending',
+                            description, project.id, user.id)
+                self.board_add_task(task, project.name, user.full_name)
+            
+            self.run_query(lambda db: db.create_task(title, description, project.id, user.id,
+                                                     priority, deadline), on_created)
+        
+        btn_frame = ttk.Frame(dialog)
+        btn_frame.pack(pady=10)
+        ttk.Button(btn_frame, text="Назначить", command=save).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Отмена", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
     
-    def update_task_status(self, tree):
-        """Обновление статуса задачи"""
-        selected = tree.selection()
-        if not selected:
+    def update_task_status(self, tree, status='completed'):
+        """Смена статуса всех выделенных задач одним запросом"""
+        task_ids = [int(iid) for iid in tree.selection() if iid != self.tasks_view.loading_item]
+        if not task_ids:
             messagebox.showwarning("Внимание", "Выберите задачу!")
             return
         
-        task_id = tree.item(selected[0])['values'][0]
-        self.db.update_task_status(task_id, 'completed')
-        messagebox.showinfo("Успех", "Статус задачи обновлен!")
-        self.load_tasks()
+        include_archived = self.tasks_archived.get()
+        
+        def update(db):
+            # Задачи из архива (видны с "Показывать архив") статус не меняют
+            active = [task.id for task in db.get_task_changes(self.user_id, task_ids).rows]
+            updated = db.update_tasks_status(active, status) if active else 0
+            changes = db.get_task_changes(self.user_id, task_ids, include_archived=include_archived)
+            return updated, len(task_ids) - len(active), changes
+        
+        def on_updated(result):
+            updated, skipped, changes = result
+            # Изменённые строки обновляются на месте, остальная таблица не перестраивается
+            self.deadlines.apply_changes(changes)
+            self.tasks_view.apply_changes(changes)
+            message = (f"Статус «{STATUS_NAMES.get(status, status)}» "
+                       f"установлен у задач: {updated}")
+            if skipped:
+                message += f"\nЗадачи из архива не изменяются, пропущено: {skipped}"
+            messagebox.showinfo("Успех", message)
+        
+        self.run_query(update, on_updated)
+    
+    def deadline_tags(self, task):
+        """Теги строки задачи по состоянию её срока (подсветка в таблице)"""
+        state = self.deadlines.state(task)
+        return (state,) if state else ()
+    
+    def on_deadlines(self, events):
+        """Смена состояний сроков задач: подсветка строк, сводка и оповещение"""
+        for task, _, _ in events:
+            if self.tasks_view is not None and self.tasks_view.tree.exists(str(task.id)):
+                self.tasks_view.tree.item(str(task.id), tags=self.deadline_tags(task))
+        
+        # Оповещение - только о наступивших сроках, не о состоянии при загрузке
+        # и не о задачах, которые перестали отслеживаться
+        arrived = [(task, state) for task, old_state, state in events
+                   if old_state is not None and state in (TODAY, OVERDUE)]
+        if arrived:
+            task, state = arrived[0]
+            text = (f"Срок задачи «{task.title}» сегодня" if state == TODAY
+                    else f"Задача «{task.title}» просрочена")
+            if len(arrived) > 1:
+                text += f" (и ещё {len(arrived) - 1})"
+            self.deadline_notice = text
+            self.root.bell()
+            self.root.after(self.DEADLINE_NOTICE_MS, self.clear_deadline_notice, text)
+        self.show_deadline_summary()
+    
+    def clear_deadline_notice(self, text):
+        """Возврат строки статуса к сводке после показа оповещения"""
+        if self.deadline_notice == text:
+            self.deadline_notice = None
+            self.show_deadline_summary()
+    
+    def show_deadline_summary(self):
+        """Сводка сроков в строке статуса"""
+        counts = self.deadlines.counts()
+        parts = []
+        if counts[OVERDUE]:
+            parts.append(f"просрочено: {counts[OVERDUE]}")
+        if counts[TODAY]:
+            parts.append(f"срок сегодня: {counts[TODAY]}")
+        if counts[SOON]:
+            parts.append(f"скоро срок: {counts[SOON]}")
+        text = self.deadline_notice or ("Задачи - " + ", ".join(parts) if parts else "")
+        state = OVERDUE if counts[OVERDUE] else TODAY if counts[TODAY] else SOON
+        self.deadline_label.configure(text=text, foreground=self.DEADLINE_COLORS[state])
     
     def get_role_name(self):
         """Получение названия роли на русском"""
-        role_names = {
-            'admin': 'Администратор',
-            'director': 'Директор',
-            'manager': 'Менеджер',
-            'worker': 'Работник',
-            'organizer': 'Организатор'
-        }
-        return role_names.get(self.role, self.role)
+        return ROLE_NAMES.get(self.role, self.role)
     
     def get_current_date(self):
         """Получение текущей даты"""
         from datetime import datetime
         return datetime.now().strftime("%d.%m.%Y %H:%M")
     
+    def show_diagnostics(self):
+        """Окно диагностики: статистика запросов к БД и журнал медленных вызовов"""
+        window = tk.Toplevel(self.root)
+        window.title("Диагностика запросов")
+        window.geometry("950x600")
+        
+        # Управление профилированием
+        controls = ttk.Frame(window, padding="10")
+        controls.pack(fill=tk.X)
+        
+        enabled_var = tk.BooleanVar(value=query_profiler.enabled)
+        threshold_var = tk.StringVar(value=f"{query_profiler.slow_threshold_ms:g}")
+        
+        def toggle():
+            if enabled_var.get():
+                apply_threshold()
+                query_profiler.enable()
+            else:
+                query_profiler.disable()
+            refresh()
+        
+        def apply_threshold(event=None):
+            try:
+                query_profiler.slow_threshold_ms = float(threshold_var.get())
+            except ValueError:
+                threshold_var.set(f"{query_profiler.slow_threshold_ms:g}")
+        
+        def reset():
+            query_profiler.reset()
+            refresh()
+        
+        def save():
+            path = filedialog.asksaveasfilename(parent=window, defaultextension=".json",
+                                                filetypes=[("JSON", "*.json")],
+                                                initialfile="diagnostics.json")
+            if path:
+                try:
+                    query_profiler.dump(path)
+                except OSError as e:
+                    messagebox.showerror("Ошибка", f"Не удалось сохранить файл:\n{e}", parent=window)
+        
+        ttk.Checkbutton(controls, text="Профилирование включено", variable=enabled_var,
+                        command=toggle).pack(side=tk.LEFT)
+        ttk.Label(controls, text="Порог медленных вызовов, мс:").pack(side=tk.LEFT, padx=(20, 5))
+        threshold_entry = ttk.Entry(controls, textvariable=threshold_var, width=8)
+        threshold_entry.pack(side=tk.LEFT)
+        threshold_entry.bind("<Return>", apply_threshold)
+        threshold_entry.bind("<FocusOut>", apply_threshold)
+        ttk.Button(controls, text="Сохранить в JSON...", command=save).pack(side=tk.RIGHT)
+        ttk.Button(controls, text="Сбросить", command=reset).pack(side=tk.RIGHT, padx=5)
+        
+        timings = ", ".join(f"{stage}: {ms} мс" for stage, ms in self.startup_timings.items())
+        ttk.Label(window, text=f"Запуск главного окна ({timings or 'нет данных'}), "
+                               f"бюджет {self.STARTUP_BUDGET_MS} мс").pack(anchor=tk.W, padx=10, pady=(0, 5))
+        
+        panes = ttk.PanedWindow(window, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        
+        # Статистика по запросам (методам Database)
+        columns = ("Запрос", "Вызовов", "Ошибок", "Среднее, мс", "p50, мс", "p95, мс", "Макс., мс")
+        stats_tree = ttk.Treeview(panes, columns=columns, show="headings", height=10)
+        for col in columns:
+            stats_tree.heading(col, text=col)
+            stats_tree.column(col, width=100, anchor=tk.E)
+        stats_tree.column("Запрос", width=250, anchor=tk.W)
+        panes.add(stats_tree, weight=1)
+        
+        # Журнал медленных вызовов и планы их команд
+        slow_frame = ttk.Frame(panes)
+        panes.add(slow_frame, weight=1)
+        slow_columns = ("Время", "Запрос", "Длительность, мс", "Поток")
+        slow_tree = ttk.Treeview(slow_frame, columns=slow_columns, show="headings", height=8)
+        for col in slow_columns:
+            slow_tree.heading(col, text=col)
+            slow_tree.column(col, width=150)
+        slow_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        plan_text = tk.Text(slow_frame, width=60, wrap=tk.WORD)
+        plan_text.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        
+        slow_entries = {}
+        
+        def show_plan(event=None):
+            plan_text.delete("1.0", tk.END)
+            selection = slow_tree.selection()
+            entry = slow_entries.get(selection[0]) if selection else None
+            if entry is None:
+                return
+            for statement in entry['statements']:
+                plan_text.insert(tk.END, f"{statement['sql']}\n({statement['elapsed_ms']} мс)\n")
+                for line in statement['plan']:
+                    plan_text.insert(tk.END, f"    {line}\n")
+                plan_text.insert(tk.END, "\n")
+        
+        slow_tree.bind("<<TreeviewSelect>>", show_plan)
+        
+        def refresh():
+            snapshot = query_profiler.snapshot()
+            stats_tree.delete(*stats_tree.get_children())
+            for name, stats in sorted(snapshot['queries'].items(),
+                                      key=lambda item: -item[1]['mean_ms'] * item[1]['calls']):
+                stats_tree.insert("", tk.END, values=(
+                    name, stats['calls'], stats['errors'], stats['mean_ms'],
+                    stats['p50_ms'], stats['p95_ms'], stats['max_ms']))
+            
+            # Журнал только дописывается: добавляются новые записи, вытесненные удаляются
+            current = {str(entry['id']): entry for entry in snapshot['slow_queries']}
+            for iid in list(slow_entries):
+                if iid not in current:
+                    del slow_entries[iid]
+                    slow_tree.delete(iid)
+            for iid, entry in current.items():
+                if iid not in slow_entries:
+                    slow_entries[iid] = entry
+                    slow_tree.insert("", 0, iid=iid, values=(
+                        entry['time'], entry['name'], entry['elapsed_ms'], entry['thread']))
+        
+        def auto_refresh():
+            if window.winfo_exists():
+                refresh()
+                window.after(1000, auto_refresh)
+        
+        auto_refresh()
+    
     def show_about(self):
         """Показать информацию о программе"""
         about_text = """Система учета персонала и проектов
-        
+
 Версия 1.0
-        
+
 Разработано для демонстрационного экзамена
 Роли пользователей:
 - Администратор: полный доступ
@@ -438,12 +1713,198 @@ class MainApplication:
         messagebox.showinfo("О программе", about_text)
     
     def show_departments(self):
-        """Показать отделы"""
-        messagebox.showinfo("Информация", "Функция просмотра отделов будет реализована в следующей версии")
+        """Дерево отделов.
+        
+        Сначала загружаются только корневые отделы; подотделы и сотрудники
+        отдела запрашиваются при первом раскрытии его узла. По выбранному
+        отделу показываются путь от корня и число сотрудников с подотделами.
+        """
+        window = tk.Toplevel(self.root)
+        window.title("Отделы")
+        window.geometry("800x500")
+        
+        frame = ttk.Frame(window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        columns = ("Руководитель", "Роль", "Подотделов", "Сотрудников")
+        tree = ttk.Treeview(frame, columns=columns, show="tree headings", height=20)
+        tree.heading("#0", text="Отдел / сотрудник")
+        tree.column("#0", width=300)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=110)
+        tree.column("Руководитель", width=180)
+        
+        summary_label = ttk.Label(window, text="Выберите отдел", anchor=tk.W)
+        summary_label.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
+        
+        placeholders = {}  # узел отдела -> строка "Загрузка..." до загрузки его содержимого
+        requested = set()
+        queries = []
+        
+        def add_departments(parent, departments):
+            for department in departments:
+                iid = f"d{department.id}"
+                tree.insert(parent, tk.END, iid=iid, text=department.name, values=(
+                    department.director_name or "", "", department.child_count,
+                    department.member_count))
+                if department.child_count or department.member_count:
+                    placeholders[iid] = tree.insert(iid, tk.END, text="Загрузка...")
+        
+        def load(parent, department_id):
+            def fetch(db):
+                children = db.get_child_departments(department_id)
+                members = [] if department_id is None else db.get_department_members(department_id)
+                return children, members
+            
+            def show(result):
+                if not tree.winfo_exists():
+                    return
+                children, members = result
+                if parent in placeholders:
+                    tree.delete(placeholders.pop(parent))
+                add_departments(parent, children)
+                for user in members:
+                    tree.insert(parent, tk.END, text=user.full_name,
+                                values=("", ROLE_NAMES.get(user.role, user.role), "", ""))
+            
+            queries.append(self.run_query(fetch, show))
+        
+        def on_open(event):
+            iid = tree.focus()
+            if iid in placeholders and iid not in requested:
+                requested.add(iid)
+                load(iid, int(iid[1:]))
+        
+        def on_select(event):
+            selection = tree.selection()
+            if not selection or not selection[0].startswith("d"):
+                return
+            department_id = int(selection[0][1:])
+            
+            def fetch(db):
+                return (db.get_department_ancestors(department_id),
+                        db.count_department_members(department_id))
+            
+            def show(result):
+                if not summary_label.winfo_exists():
+                    return
+                path, count = result
+                summary_label.config(text=" / ".join(department.name for department in path)
+                                     + f" | сотрудников с подотделами: {count}")
+            
+            queries.append(self.run_query(fetch, show, key='department_summary'))
+        
+        tree.bind("<<TreeviewOpen>>", on_open)
+        tree.bind("<<TreeviewSelect>>", on_select)
+        
+        def cancel_queries(event):
+            for query in queries:
+                query.cancel()
+        
+        window.bind("<Destroy>", cancel_queries, add="+")
+        
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscroll=scrollbar.set)
+        
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        load("", None)
+    
+    def show_audit(self):
+        """Журнал аудита за период с фильтром по пользователю и действию.
+        
+        Записи идут от старых к новым и подгружаются страницами по индексу
+        времени. Период задаётся местными датами; перед первой страницей
+        записываются события, ещё ждущие в очереди аудита.
+        """
+        window = tk.Toplevel(self.root)
+        window.title("Журнал аудита")
+        window.geometry("950x550")
+        
+        filters = ttk.Frame(window)
+        filters.pack(fill=tk.X, padx=10, pady=(10, 0))
+        today = date.today()
+        since_var = tk.StringVar(value=(today - timedelta(days=7)).isoformat())
+        until_var = tk.StringVar(value=today.isoformat())
+        ttk.Label(filters, text="С:").pack(side=tk.LEFT)
+        ttk.Entry(filters, textvariable=since_var, width=11).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filters, text="По:").pack(side=tk.LEFT)
+        ttk.Entry(filters, textvariable=until_var, width=11).pack(side=tk.LEFT, padx=(5, 10))
+        
+        all_users = "Все пользователи"
+        user_ids = {all_users: None}
+        user_var = tk.StringVar(value=all_users)
+        user_combo = ttk.Combobox(filters, textvariable=user_var, state="readonly", width=28,
+                                  values=[all_users])
+        user_combo.pack(side=tk.LEFT, padx=(0, 10))
+        
+        all_actions = "Все действия"
+        action_codes = {all_actions: None}
+        action_codes.update((AUDIT_ACTION_NAMES.get(action, action), action)
+                            for action in AUDIT_ACTIONS)
+        action_var = tk.StringVar(value=all_actions)
+        ttk.Combobox(filters, textvariable=action_var, state="readonly", width=22,
+                     values=list(action_codes)).pack(side=tk.LEFT, padx=(0, 10))
+        
+        frame = ttk.Frame(window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        columns = ("Время", "Пользователь", "Действие", "Объект", "Подробности")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=20)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=150)
+        tree.column("Пользователь", width=200)
+        tree.column("Подробности", width=250)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        view = None
+        
+        def show():
+            nonlocal view
+            try:
+                since = date.fromisoformat(since_var.get().strip())
+                until = date.fromisoformat(until_var.get().strip())
+            except ValueError:
+                messagebox.showerror("Ошибка", "Даты указываются в формате ГГГГ-ММ-ДД",
+                                     parent=window)
+                return
+            since, until = audit_bound(since), audit_bound(until + timedelta(days=1))
+            user_id = user_ids.get(user_var.get())
+            action = action_codes.get(action_var.get())
+            
+            def fetch_page(db, after):
+                if after is None and isinstance(db, Database):
+                    db.manager.flush_audit(db.db_name)
+                return db.get_audit_page(since, until, user_id, action, after=after)
+            
+            if view is not None:
+                view.cancel()
+            tree.delete(*tree.get_children())
+            view = PagedTreeview(tree, scrollbar, self.executor, fetch_page=fetch_page,
+                                 row_values=audit_row_values,
+                                 sort_key=lambda event: (event.occurred_at, event.id))
+        
+        def show_users(users):
+            if not user_combo.winfo_exists():
+                return
+            for user in users:
+                user_ids[f"{user.full_name} ({user.username})"] = user.id
+            user_combo.configure(values=list(user_ids))
+        
+        query = self.run_query(lambda db: db.get_all_users(), show_users)
+        window.bind("<Destroy>", lambda event: query.cancel(), add="+")
+        ttk.Button(filters, text="Показать", command=show).pack(side=tk.LEFT)
+        show()
     
     def exit_app(self):
-        """Выход из приложения"""
+        """Выход из приложения; события аудита из очереди записываются при закрытии базы"""
         if messagebox.askyesno("Выход", "Вы уверены, что хотите выйти?"):
+            self.deadlines.stop()
+            self.executor.shutdown()
             self.db.close()
             self.root.quit()
     
@@ -453,20 +1914,31 @@ class MainApplication:
 
 def main():
     """Главная функция"""
-    # Инициализация базы данных
-    from database import init_database
-    init_database()
+    # UCHET_PROFILE=<порог, мс> включает профилирование запросов с запуска
+    if os.environ.get('UCHET_PROFILE'):
+        try:
+            query_profiler.enable(float(os.environ['UCHET_PROFILE']))
+        except ValueError:
+            query_profiler.enable()
+    
+    # UCHET_SERVER=http://хост:порт - работа тонким клиентом через сервер API
+    # (server.py); иначе подключение к файлу базы (миграции применяются при открытии)
+    server_url = os.environ.get('UCHET_SERVER')
+    if server_url:
+        from client import RemoteDatabase
+        db = RemoteDatabase(server_url)
+    else:
+        db = Database()
     
-    # Создание корневого окна для авторизации
-    login_root = tk.Tk()
+    # Одно корневое окно и одно соединение служат и окну входа, и главному окну
+    root = tk.Tk()
     
     def on_login_success(user_data):
         """Обработчик успешного входа"""
-        app = MainApplication(user_data)
-        app.run()
+        MainApplication(user_data, db, root)
     
-    login_app = LoginWindow(login_root, on_login_success)
-    login_root.mainloop()
+    login_app = LoginWindow(root, on_login_success, db)
+    root.mainloop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
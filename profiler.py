@@ -0,0 +1,287 @@
+import functools
+import inspect
+import json
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+
+# Верхние границы интервалов гистограммы задержек, мс; последний интервал открыт
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Команды, для которых имеет смысл EXPLAIN QUERY PLAN
+PLANNED_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+class QueryStats:
+    """Число вызовов и гистограмма задержек одного запроса"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+    
+    def add(self, elapsed_ms, failed=False):
+        self.calls += 1
+        self.errors += failed
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed_ms <= bound:
+                break
+        else:
+            index = len(LATENCY_BUCKETS)
+        self.buckets[index] += 1
+    
+    def percentile(self, fraction):
+        """Оценка перцентиля по гистограмме (верхняя граница интервала)"""
+        rank = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max_ms
+        return 0.0
+    
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max_ms, 3),
+            'histogram': {f'<={bound}': count for bound, count
+                          in zip(LATENCY_BUCKETS + ('inf',), self.buckets)},
+        }
+
+class ProfiledConnection:
+    """Обёртка соединения, замеряющая выполнение каждой SQL-команды.
+    
+    Замеряется сам execute; строки, которые читаются из курсора позже,
+    входят во время вызова метода Database, но не команды.
+    Остальные атрибуты соединения передаются без изменений.
+    """
+    
+    def __init__(self, conn, profiler):
+        self.raw = conn
+        self._profiler = profiler
+    
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return self.raw.execute(sql, parameters)
+        finally:
+            self._profiler.statement(sql, parameters, time.perf_counter() - started)
+    
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return self.raw.executemany(sql, seq_of_parameters)
+        finally:
+            # Параметры пакета уже прочитаны; для плана подставляются NULL
+            self._profiler.statement(sql, None, time.perf_counter() - started)
+    
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+class QueryProfiler:
+    """Профилирование вызовов методов Database.
+    
+    Пока профилирование выключено, объекты Database работают с исходным
+    соединением и исходными методами, так что издержек нет. При включении
+    публичные методы каждого открытого объекта Database оборачиваются замером
+    времени (имя запроса - имя метода), а соединение - ProfiledConnection,
+    который собирает выполненные внутри метода команды. Вызовы дольше
+    slow_threshold_ms попадают в журнал медленных запросов вместе с планами
+    их команд (EXPLAIN QUERY PLAN); если задан slow_log_path, журнал
+    дописывается в этот файл строками JSON.
+    """
+    
+    # Методы, которые не имеет смысла замерять
+    EXCLUDED_METHODS = frozenset({'close', 'migrate', 'transaction', 'batch', 'clone',
+                                  'hash_password'})
+    
+    def __init__(self, slow_threshold_ms=100.0, slow_log_size=200, slow_log_path=None):
+        self.enabled = False
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_path = slow_log_path
+        self.slow_log = deque(maxlen=slow_log_size)
+        self._slow_count = 0
+        self.started_at = None
+        self._stats = {}
+        self._databases = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def register(self, db):
+        """Учёт нового объекта Database (вызывается из его конструктора)"""
+        with self._lock:
+            self._databases.add(db)
+            if self.enabled:
+                self._attach(db)
+    
+    def unregister(self, db):
+        """Снятие обёрток перед закрытием объекта Database"""
+        with self._lock:
+            self._databases.discard(db)
+            self._detach(db)
+    
+    def enable(self, slow_threshold_ms=None):
+        """Включение профилирования для всех открытых и будущих объектов Database"""
+        with self._lock:
+            if slow_threshold_ms is not None:
+                self.slow_threshold_ms = slow_threshold_ms
+            if self.enabled:
+                return
+            self.enabled = True
+            self.started_at = self.started_at or datetime.now().isoformat(timespec='seconds')
+            for db in list(self._databases):
+                self._attach(db)
+    
+    def disable(self):
+        """Выключение профилирования; накопленная статистика сохраняется"""
+        with self._lock:
+            self.enabled = False
+            for db in list(self._databases):
+                self._detach(db)
+    
+    def reset(self):
+        """Сброс накопленной статистики и журнала медленных запросов"""
+        with self._lock:
+            self._stats = {}
+            self.slow_log.clear()
+            self.started_at = datetime.now().isoformat(timespec='seconds') if self.enabled else None
+    
+    def _attach(self, db):
+        if db.conn is None or isinstance(db.conn, ProfiledConnection):
+            return
+        db.conn = ProfiledConnection(db.conn, self)
+        for name, method in inspect.getmembers(db, inspect.ismethod):
+            if not name.startswith('_') and name not in self.EXCLUDED_METHODS:
+                setattr(db, name, self._wrap(db, name, method))
+    
+    def _detach(self, db):
+        if isinstance(db.conn, ProfiledConnection):
+            db.conn = db.conn.raw
+        for name, value in list(vars(db).items()):
+            if getattr(value, '__profiled__', False):
+                delattr(db, name)
+    
+    def _wrap(self, db, name, method):
+        """Обёртка метода, замеряющая вызов и собирающая его команды"""
+        
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            stack = self._statements_stack()
+            statements = []
+            stack.append(statements)
+            failed = True
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                stack.pop()
+                if stack:
+                    # Вложенный вызов: команды принадлежат и внешнему методу
+                    stack[-1].extend(statements)
+                self._record(name, elapsed_ms, failed)
+                if not stack and elapsed_ms >= self.slow_threshold_ms:
+                    self._log_slow(db, name, elapsed_ms, statements)
+        
+        profiled.__profiled__ = True
+        return profiled
+    
+    def _statements_stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def statement(self, sql, parameters, elapsed):
+        """Учёт команды, выполненной через ProfiledConnection"""
+        stack = getattr(self._local, 'stack', None)
+        if stack:
+            stack[-1].append((sql, parameters, elapsed * 1000))
+    
+    def _record(self, name, elapsed_ms, failed):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = QueryStats()
+            stats.add(elapsed_ms, failed)
+    
+    def _log_slow(self, db, name, elapsed_ms, statements):
+        """Запись медленного вызова с планами выполненных команд"""
+        conn = db.conn.raw if isinstance(db.conn, ProfiledConnection) else db.conn
+        entry = {
+            'id': None,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'name': name,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'thread': threading.current_thread().name,
+            'statements': [],
+        }
+        plans = {}
+        for sql, parameters, statement_ms in statements:
+            text = ' '.join(sql.split())
+            if text not in plans:
+                plans[text] = self.explain(conn, sql, parameters)
+            entry['statements'].append({
+                'sql': text,
+                'elapsed_ms': round(statement_ms, 3),
+                'plan': plans[text],
+            })
+        
+        with self._lock:
+            self._slow_count += 1
+            entry['id'] = self._slow_count
+            self.slow_log.append(entry)
+            if self.slow_log_path:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    
+    @staticmethod
+    def explain(conn, sql, parameters=None):
+        """План запроса (EXPLAIN QUERY PLAN) в виде строк с отступами по вложенности"""
+        if conn is None or not sql.lstrip().upper().startswith(PLANNED_STATEMENTS):
+            return []
+        if parameters is None:
+            parameters = [None] * sql.count('?')
+        try:
+            rows = conn.execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+        except Exception as e:
+            return [f'план недоступен: {e}']
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return lines
+    
+    def snapshot(self):
+        """Текущая статистика в виде словаря для JSON"""
+        with self._lock:
+            queries = {name: stats.as_dict() for name, stats in sorted(self._stats.items())}
+            slow = list(self.slow_log)
+        return {
+            'enabled': self.enabled,
+            'started_at': self.started_at,
+            'dumped_at': datetime.now().isoformat(timespec='seconds'),
+            'slow_threshold_ms': self.slow_threshold_ms,
+            'queries': queries,
+            'slow_queries': slow,
+        }
+    
+    def dump(self, path):
+        """Сохранение статистики в файл JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+# Профилировщик по умолчанию, общий для всего приложения
+query_profiler = QueryProfiler()
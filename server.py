@@ -0,0 +1,491 @@
+import argparse
+import asyncio
+import backup
+import inspect
+import json
+import queue
+import secrets
+import sys
+import threading
+import time
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from database import (Database, User, Project, Task, Department, SearchHit, RowChanges,
+                      BulkResult, BoardGroup, AuditEvent)
+
+# Записи, которые передаются через API как объекты с полем "_type"
+RECORD_TYPES = {cls.__name__: cls for cls in (User, Project, Task, Department, SearchHit,
+                                              RowChanges, BulkResult, BoardGroup, AuditEvent)}
+
+# Методы Database, доступные через API: имя -> роли, которым разрешён вызов (None - всем).
+# Чтения выполняются параллельно пулом соединений, записи - пакетами одним писателем.
+READ_METHODS = {
+    'get_user_by_id': ('admin', 'director', 'manager'),
+    'get_all_users': ('admin', 'director', 'manager'),
+    'get_departments': None,
+    'get_child_departments': None,
+    'get_department_ancestors': None,
+    'get_department_members': ('admin', 'director', 'manager'),
+    'count_department_members': ('admin', 'director', 'manager'),
+    'get_users_under_director': ('admin', 'director', 'manager'),
+    'get_projects': None,
+    'get_projects_page': None,
+    'get_project_changes': None,
+    'get_tasks_by_user_page': None,
+    'get_task_changes': None,
+    'get_deadlines': None,
+    'get_board_projects': ('admin', 'director', 'manager'),
+    'get_board_assignees': ('admin', 'director', 'manager'),
+    'get_board_tasks_page': ('admin', 'director', 'manager'),
+    'get_task_status_counts': None,
+    'get_user_role_counts': None,
+    'get_project_task_counts': None,
+    'get_project_status_counts': None,
+    'get_user_task_counts': ('admin', 'director', 'manager'),
+    'get_overdue_counts': ('admin', 'director', 'manager'),
+    'get_project_burndown': ('admin', 'director', 'manager'),
+    'search': None,
+    'get_last_change_seq': None,
+    'get_changes_since': None,
+    'get_audit_page': ('admin', 'director'),
+}
+WRITE_METHODS = {
+    'create_department': ('admin', 'director'),
+    'move_department': ('admin', 'director'),
+    'add_department_member': ('admin', 'director'),
+    'remove_department_member': ('admin', 'director'),
+    'create_project': ('admin', 'director', 'organizer'),
+    'create_task': ('admin', 'director', 'manager'),
+    'update_task_status': None,
+    'update_tasks_status': None,
+}
+API_METHODS = frozenset(READ_METHODS) | frozenset(WRITE_METHODS)
+# Методы, которые остальные роли могут вызывать только со своим user_id
+OWN_USER_METHODS = frozenset({'get_user_by_id'})
+
+def to_json(value):
+    """Результат метода Database в данные JSON; записи становятся объектами с полем "_type" """
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        data = {'_type': type(value).__name__}
+        data.update((field, to_json(item)) for field, item in zip(value._fields, value))
+        return data
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    return value
+
+def from_json(value):
+    """Обратное преобразование: объекты с полем "_type" снова становятся записями"""
+    if isinstance(value, list):
+        return [from_json(item) for item in value]
+    if isinstance(value, dict):
+        data = {key: from_json(item) for key, item in value.items()}
+        record = RECORD_TYPES.get(data.pop('_type', None))
+        return record(**data) if record else data
+    return value
+
+class ApiError(Exception):
+    """Ошибка запроса к API с HTTP-статусом ответа"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ConnectionPool:
+    """Рабочие потоки с собственными соединениями для запросов сервера.
+    
+    Как и в QueryExecutor, каждый поток держит свой объект Database, поэтому
+    кэш запросов его соединения остаётся тёплым между запросами клиентов.
+    run(func) ставит func(db) в очередь и возвращает future цикла asyncio.
+    """
+    
+    def __init__(self, db_name, size=4, manager=None, name='db-pool'):
+        self.db_name = db_name
+        self.manager = manager
+        self._tasks = queue.Queue()
+        self._threads = []
+        for number in range(size):
+            thread = threading.Thread(target=self._worker, name=f"{name}-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def run(self, func):
+        """Выполнение func(db) в рабочем потоке; результат - awaitable future"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._tasks.put((func, future, loop))
+        return future
+    
+    @staticmethod
+    def _resolve(future, result, error):
+        if future.cancelled():
+            return
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+    
+    def _worker(self):
+        """Цикл рабочего потока"""
+        db = Database(self.db_name, self.manager)
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                func, future, loop = task
+                result = error = None
+                try:
+                    result = func(db)
+                except Exception as e:
+                    error = e
+                if db.conn.in_transaction:
+                    db.conn.rollback()
+                loop.call_soon_threadsafe(self._resolve, future, result, error)
+        finally:
+            db.close()
+    
+    def close(self, timeout=5.0):
+        """Остановка потоков и закрытие их соединений"""
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+class ApiServer:
+    """HTTP/JSON сервер над Database для многих клиентов.
+    
+    Запрос POST /api/<метод> с телом {"args": [...], "kwargs": {...}} вызывает
+    метод Database из READ_METHODS или WRITE_METHODS и возвращает {"result": ...}.
+    Вход - POST /api/login {"username", "password"}; выданный токен передаётся
+    в заголовке "Authorization: Bearer <токен>". Работник получает только свои
+    задачи: параметр user_id подменяется его id, а статус можно менять только
+    у назначенных ему задач. Сессии, простаивающие дольше SESSION_TIMEOUT,
+    удаляются обслуживанием раз в MAINTENANCE_INTERVAL.
+    
+    Чтения выполняются пулом из readers соединений. Записи идут через одно
+    соединение-писатель: всё, что накопилось в очереди, пока фиксировался
+    предыдущий пакет, выполняется одной транзакцией (каждая запись - в своей
+    точке сохранения, так что ошибка одной не отменяет остальные).
+    
+    События аудита записываются от имени пользователя сессии общей очередью
+    аудита; остаток очереди записывается при остановке сервера.
+    
+    Если задан backup_dir, раз в backup_interval секунд в него снимается
+    резервная копия базы (хранятся backup_keep последних).
+    """
+    
+    MAX_BATCH = 200  # записей в одной транзакции
+    MAX_BODY = 1 << 20  # байт в теле запроса
+    KEEPALIVE_TIMEOUT = 60  # секунд простоя соединения клиента
+    SESSION_TIMEOUT = 12 * 3600  # секунд простоя сессии
+    MAINTENANCE_INTERVAL = 3600  # секунд между обслуживанием: журнал, архив, сессии
+    
+    def __init__(self, db_name='uchet.db', host='127.0.0.1', port=8765, readers=4,
+                 backup_dir=None, backup_interval=backup.BACKUP_INTERVAL,
+                 backup_keep=backup.BACKUP_KEEP):
+        self.db_name = db_name
+        self.host = host
+        self.port = port
+        self.readers_count = readers
+        self.backup_dir = backup_dir
+        self.backup_interval = backup_interval
+        self.backup_keep = backup_keep
+        self.sessions = {}  # токен -> [пользователь, время последнего запроса]
+        self.server = None
+        self._write_loop_task = None
+        self._maintenance_task = None
+        self._backup_task = None
+    
+    async def start(self):
+        """Запуск пулов соединений и приём подключений"""
+        self.readers = ConnectionPool(self.db_name, self.readers_count, name='api-reader')
+        self.writer = ConnectionPool(self.db_name, 1, name='api-writer')
+        self._writes = asyncio.Queue()
+        self._write_loop_task = asyncio.create_task(self._write_loop())
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        if self.backup_dir:
+            self._backup_task = asyncio.create_task(self._backup_loop())
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+    
+    async def close(self):
+        """Остановка сервера и закрытие соединений"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._write_loop_task is not None:
+            self._write_loop_task.cancel()
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+        if self._backup_task is not None:
+            self._backup_task.cancel()
+        self.readers.close()
+        self.writer.close()
+    
+    async def _maintenance(self):
+        """Обслуживание базы писателем между пакетами записей.
+        
+        Журнал изменений чистит и старые записи в архив переносит сервер:
+        клиенты, работающие через него, этого не делают. Просроченные сессии
+        удаляются здесь же.
+        """
+        self.sweep_sessions()
+        await self.writer.run(lambda db: db.prune_change_log())
+        await self.writer.run(lambda db: db.archive_old_records())
+    
+    async def _maintenance_loop(self):
+        """Обслуживание при запуске и затем раз в MAINTENANCE_INTERVAL секунд"""
+        while True:
+            try:
+                await self._maintenance()
+            except Exception as e:
+                print(f"Ошибка обслуживания базы: {e}", file=sys.stderr)
+            await asyncio.sleep(self.MAINTENANCE_INTERVAL)
+    
+    def sweep_sessions(self):
+        """Удаление сессий, простаивающих дольше SESSION_TIMEOUT; возвращает их число"""
+        now = time.monotonic()
+        expired = [token for token, (_, last_seen) in self.sessions.items()
+                   if now - last_seen > self.SESSION_TIMEOUT]
+        for token in expired:
+            del self.sessions[token]
+        return len(expired)
+    
+    async def _backup_loop(self):
+        """Плановые снимки базы в отдельном потоке (клиенты не блокируются).
+        
+        Срок следующего снимка считается от последнего снимка в каталоге,
+        поэтому перезапуск сервера не порождает лишних копий.
+        """
+        while True:
+            await asyncio.sleep(backup.seconds_until_due(self.backup_dir, self.db_name,
+                                                         self.backup_interval))
+            try:
+                path = await asyncio.to_thread(backup.snapshot, self.db_name, self.backup_dir,
+                                               self.backup_keep)
+                print(f"Снимок базы: {path}")
+            except Exception as e:
+                print(f"Ошибка снимка базы: {e}", file=sys.stderr)
+                await asyncio.sleep(min(self.backup_interval, self.MAINTENANCE_INTERVAL))
+    
+    async def write(self, func):
+        """Постановка записи func(db) в очередь писателя"""
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((func, future))
+        return await future
+    
+    async def _write_loop(self):
+        """Группировка записей в пакеты и их выполнение писателем"""
+        while True:
+            batch = [await self._writes.get()]
+            while len(batch) < self.MAX_BATCH and not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            funcs = [func for func, _ in batch]
+            try:
+                results = await self.writer.run(lambda db: self._run_batch(db, funcs))
+            except Exception as e:
+                # Пакет не зафиксирован: ошибка относится ко всем его записям
+                results = [(None, e)] * len(batch)
+            for (_, future), (result, error) in zip(batch, results):
+                ConnectionPool._resolve(future, result, error)
+    
+    @staticmethod
+    def _run_batch(db, funcs):
+        """Пакет записей одной транзакцией; возвращает [(результат, ошибка)]"""
+        results = []
+        with db.batch():
+            for func in funcs:
+                db.conn.execute('SAVEPOINT api_write')
+                try:
+                    results.append((func(db), None))
+                except Exception as e:
+                    db.conn.execute('ROLLBACK TO api_write')
+                    results.append((None, e))
+                db.conn.execute('RELEASE api_write')
+        return results
+    
+    async def _handle(self, reader, writer):
+        """Обслуживание соединения клиента (HTTP/1.1 с keep-alive)"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except ApiError as e:
+                    self._send(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                
+                method, path, headers, body = request
+                try:
+                    status, payload = 200, await self._dispatch(method, path, headers, body)
+                except ApiError as e:
+                    status, payload = e.status, json.dumps({'error': str(e)}, ensure_ascii=False)
+                except Exception as e:
+                    status, payload = 500, json.dumps({'error': str(e)}, ensure_ascii=False)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._send(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _read_request(self, reader):
+        """Чтение запроса: (метод, путь, заголовки, тело) или None при закрытии соединения"""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, _ = line.decode('ascii').split(' ', 2)
+        except (UnicodeDecodeError, ValueError):
+            raise ApiError(400, "Некорректная строка запроса")
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise ApiError(400, "Некорректный Content-Length")
+        if length > self.MAX_BODY:
+            raise ApiError(413, "Слишком большой запрос")
+        body = await reader.readexactly(length) if length else b''
+        return method, path, headers, body
+    
+    @staticmethod
+    def _send(writer, status, payload, keep_alive):
+        if isinstance(payload, dict):
+            payload = json.dumps(payload, ensure_ascii=False)
+        body = payload.encode('utf-8') if isinstance(payload, str) else payload
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('ascii') + body)
+    
+    def _session(self, headers):
+        """Пользователь по токену из заголовка Authorization"""
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        session = self.sessions.get(token) if scheme.lower() == 'bearer' else None
+        now = time.monotonic()
+        if session is None or now - session[1] > self.SESSION_TIMEOUT:
+            self.sessions.pop(token, None)
+            raise ApiError(401, "Требуется вход в систему")
+        session[1] = now
+        return session[0]
+    
+    async def _dispatch(self, method, path, headers, body):
+        """Выполнение запроса; возвращает тело ответа в JSON"""
+        path = urlsplit(path).path
+        if path == '/api/health':
+            return {'status': 'ok', 'sessions': len(self.sessions)}
+        if method != 'POST':
+            raise ApiError(405, "Ожидается метод POST")
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise ApiError(400, "Тело запроса должно быть JSON")
+        if not isinstance(data, dict):
+            raise ApiError(400, "Тело запроса должно быть объектом JSON")
+        
+        if path == '/api/login':
+            username, password = data.get('username'), data.get('password')
+            user = await self.readers.run(lambda db: db.authenticate_user(username, password))
+            if not user:
+                raise ApiError(401, "Неверный логин или пароль")
+            token = secrets.token_urlsafe(24)
+            self.sessions[token] = [user, time.monotonic()]
+            return {'token': token, 'user': to_json(user)}
+        
+        user = self._session(headers)
+        if path == '/api/logout':
+            self.sessions.pop(headers['authorization'].partition(' ')[2], None)
+            return {'result': None}
+        
+        name = path[len('/api/'):] if path.startswith('/api/') else None
+        if name not in API_METHODS:
+            raise ApiError(404, f"Неизвестный метод: {path}")
+        roles = READ_METHODS.get(name) if name in READ_METHODS else WRITE_METHODS[name]
+        own_only = roles is not None and user.role not in roles
+        if own_only and name not in OWN_USER_METHODS:
+            raise ApiError(403, "Недостаточно прав")
+        
+        try:
+            bound = inspect.signature(getattr(Database, name)).bind(
+                None, *data.get('args', []), **data.get('kwargs', {}))
+        except TypeError as e:
+            raise ApiError(400, f"Некорректные аргументы: {e}")
+        arguments = bound.arguments
+        if own_only and arguments.get('user_id') != user.id:
+            raise ApiError(403, "Недостаточно прав")
+        if user.role == 'worker' and 'user_id' in inspect.signature(getattr(Database, name)).parameters:
+            arguments['user_id'] = user.id
+        args, kwargs = bound.args[1:], bound.kwargs
+        
+        def call(db):
+            # События аудита пишутся от имени пользователя сессии
+            db.actor_id = user.id
+            if name in ('update_task_status', 'update_tasks_status') and user.role == 'worker':
+                task_ids = arguments.get('task_ids') or [arguments.get('task_id')]
+                placeholders = ', '.join('?' * len(task_ids))
+                own = db.conn.execute(f'''
+                SELECT COUNT(*) FROM tasks WHERE id IN ({placeholders}) AND assigned_to = ?
+                ''', list(task_ids) + [user.id]).fetchone()[0]
+                if own != len(set(task_ids)):
+                    raise ApiError(403, "Задача назначена другому пользователю")
+            # Ответ кодируется в рабочем потоке, чтобы не занимать цикл asyncio
+            return json.dumps({'result': to_json(getattr(db, name)(*args, **kwargs))},
+                              ensure_ascii=False)
+        
+        if name in WRITE_METHODS:
+            return await self.write(call)
+        return await self.readers.run(call)
+
+async def serve(db_name, host, port, readers, **options):
+    """Запуск сервера до прерывания"""
+    server = ApiServer(db_name, host, port, readers, **options)
+    await server.start()
+    print(f"Сервер API: http://{server.host}:{server.port} (база {db_name})")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv=None):
+    """Командная строка сервера"""
+    parser = argparse.ArgumentParser(description="HTTP/JSON сервер системы учета")
+    parser.add_argument('--db', default='uchet.db', help="Путь к файлу базы данных")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--readers', type=int, default=4, help="Соединений для чтения")
+    parser.add_argument('--backup-dir', help="Каталог плановых снимков базы")
+    parser.add_argument('--backup-interval', type=float, default=backup.BACKUP_INTERVAL,
+                        help="Секунд между снимками")
+    parser.add_argument('--backup-keep', type=int, default=backup.BACKUP_KEEP,
+                        help="Сколько снимков хранить")
+    args = parser.parse_args(argv)
+    
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.readers,
+                          backup_dir=args.backup_dir, backup_interval=args.backup_interval,
+                          backup_keep=args.backup_keep))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import pytest
+from database import Database
+
+@pytest.fixture
+def db(tmp_path):
+    """Новая база во временном каталоге"""
+    database = Database(str(tmp_path / 'test.db'))
+    yield database
+    database.close()
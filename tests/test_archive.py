@@ -0,0 +1,80 @@
+import pytest
+
+@pytest.fixture
+def worker(db):
+    return db.create_user('worker', 'pass', 'worker', 'Работник')
+
+def old_completed_task(db, worker, title, deadline='2000-01-01', project_id=None):
+    task_id = db.create_task(title, '', project_id, worker, 'low', deadline)
+    db.update_task_status(task_id, 'completed')
+    return task_id
+
+def closed_project(db, name, end_date='2000-01-01'):
+    project_id = db.create_project(name, '', '1999-01-01', end_date, 0, None)
+    db.conn.execute("UPDATE projects SET status = 'completed' WHERE id = ?", (project_id,))
+    db.conn.commit()
+    return project_id
+
+def ids(rows):
+    return [row.id for row in rows]
+
+def test_moves_only_old_completed_tasks(db, worker):
+    old = old_completed_task(db, worker, 'Старая')
+    recent = old_completed_task(db, worker, 'Недавняя', deadline='2999-01-01')
+    open_task = db.create_task('Открытая', '', None, worker, 'low', '2000-01-01')
+    
+    assert db.archive_old_records()['tasks'] >= 1
+    assert set(ids(db.get_tasks_by_user(worker))) == {recent, open_task}
+    assert set(ids(db.get_tasks_by_user(worker, include_archived=True))) == {old, recent, open_task}
+    # Повторный запуск ничего не переносит
+    assert db.archive_old_records() == {'tasks': 0, 'projects': 0}
+
+def test_archived_tasks_leave_counters(db, worker):
+    old_completed_task(db, worker, 'Старая')
+    db.create_task('Открытая', '', None, worker, 'low', None)
+    db.archive_old_records()
+    assert db.get_task_status_counts(user_id=worker) == {'pending': 1}
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 10])
+def test_pages_merge_hot_and_archive_in_order(db, worker, limit):
+    for n in range(4):
+        old_completed_task(db, worker, f'Архив {n}', deadline=f'2000-01-0{n + 1}')
+        db.create_task(f'Рабочая {n}', '', None, worker, 'low', f'2000-01-0{n + 1}')
+    db.create_task('Без срока', '', None, worker, 'low', None)
+    db.archive_old_records()
+    
+    rows, after = [], None
+    while True:
+        page, after = db.get_tasks_by_user_page(worker, after, limit, include_archived=True)
+        rows.extend(page)
+        if after is None:
+            break
+    assert ids(rows) == ids(db.get_tasks_by_user(worker, include_archived=True))
+    assert len(rows) == 9
+    assert [row.deadline for row in rows] == sorted(
+        (row.deadline for row in rows), key=lambda deadline: (deadline is not None, deadline))
+
+def test_task_changes_with_archive(db, worker):
+    old = old_completed_task(db, worker, 'Старая')
+    db.archive_old_records()
+    assert db.get_task_changes(worker, [old]).deleted == [old]
+    changes = db.get_task_changes(worker, [old], include_archived=True)
+    assert ids(changes.rows) == [old] and changes.deleted == []
+
+def test_closed_project_waits_for_its_tasks(db, worker):
+    project = closed_project(db, 'Закрытый')
+    task = db.create_task('Открытая', '', project, worker, 'low', None)
+    assert db.archive_old_records()['projects'] == 0
+    
+    db.update_task_status(task, 'completed')
+    db.conn.execute("UPDATE tasks SET deadline = '2000-01-01' WHERE id = ?", (task,))
+    db.conn.commit()
+    # Задачи переносятся первыми, после них у проекта не остаётся рабочих задач
+    assert db.archive_old_records() == {'tasks': 1, 'projects': 1}
+    assert project not in ids(db.get_projects())
+    assert project in ids(db.get_projects(include_archived=True))
+
+def test_archived_status_is_not_changed(db, worker):
+    old = old_completed_task(db, worker, 'Старая')
+    db.archive_old_records()
+    assert db.update_tasks_status([old], 'in_progress') == 0
@@ -0,0 +1,48 @@
+from audit import AuditQueue
+
+def audited_tasks(db):
+    db.manager.flush_audit(db.db_name)
+    return [row[0] for row in db.conn.execute('''
+    SELECT entity_id FROM audit_log WHERE action = 'update_task_status' ORDER BY id
+    ''')]
+
+def test_batch_status_audits_only_changed_tasks(db):
+    tasks = [db.create_task(f'Задача {n}', '', None, None, 'low', None) for n in range(3)]
+    db.update_task_status(tasks[2], 'completed')
+    before = audited_tasks(db)
+    
+    assert db.update_tasks_status(tasks + [10 ** 9], 'completed') == 2
+    assert audited_tasks(db)[len(before):] == tasks[:2]
+
+def test_unchanged_batch_is_not_audited(db):
+    task = db.create_task('Задача', '', None, None, 'low', None)
+    db.update_tasks_status([task], 'completed')
+    before = audited_tasks(db)
+    assert db.update_tasks_status([task, 10 ** 9], 'completed') == 0
+    assert db.update_tasks_status([], 'completed') == 0
+    assert audited_tasks(db) == before
+
+def test_missing_task_is_not_audited(db):
+    before = audited_tasks(db)
+    db.update_task_status(10 ** 9, 'completed')
+    assert audited_tasks(db) == before
+
+def test_event_is_written_on_flush_with_actor(db):
+    task = db.create_task('Задача', '', None, None, 'low', None)
+    db.actor_id = 1
+    db.update_task_status(task, 'in_progress')
+    db.manager.flush_audit(db.db_name)
+    rows, _ = db.get_audit_page(action='update_task_status')
+    assert [(row.user_id, row.entity_id) for row in rows][-1] == (1, task)
+
+def test_queue_groups_events_into_one_write():
+    batches = []
+    queue = AuditQueue(batches.append, flush_size=100, flush_interval=60)
+    try:
+        for n in range(5):
+            queue.record(n)
+        queue.flush()
+    finally:
+        queue.close()
+    assert batches == [[0, 1, 2, 3, 4]]
+    assert (queue.written, queue.flushes) == (5, 1)
@@ -0,0 +1,26 @@
+import hashlib
+import benchmark
+from database import Database
+from datagen import generate
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def test_existing_database_is_not_modified(tmp_path, capsys):
+    path = str(tmp_path / 'source.db')
+    db = Database(path)
+    generate(db, users=20, projects=5, tasks=200, seed=1)
+    db.close()
+    before = digest(path)
+    
+    assert benchmark.main(['--db', path, '--repeat', '1']) == 0
+    assert digest(path) == before
+    assert list(tmp_path.iterdir()) == [tmp_path / 'source.db']
+
+def test_write_benchmarks_run_last(db):
+    generate(db, users=20, projects=5, tasks=200, seed=1)
+    names = list(benchmark.run(db, repeat=1))
+    writes = [name.startswith(benchmark.WRITE_PREFIXES) for name in names]
+    assert any(writes)
+    assert writes == sorted(writes)
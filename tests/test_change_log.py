@@ -0,0 +1,56 @@
+from database import main
+
+def test_writes_are_logged_in_order(db):
+    start = db.get_last_change_seq()
+    user = db.create_user('worker', 'pass', 'worker', 'Работник')
+    project = db.create_project('Проект', '', None, None, 0, user)
+    task = db.create_task('Задача', '', project, user, 'low', None)
+    db.update_task_status(task, 'completed')
+    db.conn.execute('DELETE FROM tasks WHERE id = ?', (task,))
+    db.conn.commit()
+    
+    changes = db.get_changes_since(start)
+    assert [change[1:] for change in changes] == [
+        ('users', user, 'insert'),
+        ('projects', project, 'insert'),
+        ('tasks', task, 'insert'),
+        ('tasks', task, 'update'),
+        ('tasks', task, 'delete'),
+    ]
+    assert [change[0] for change in changes] == sorted(change[0] for change in changes)
+    assert db.get_last_change_seq() == changes[-1][0]
+
+def test_changes_since_respects_limit(db):
+    start = db.get_last_change_seq()
+    for n in range(5):
+        db.create_task(f'Задача {n}', '', None, None, 'low', None)
+    first = db.get_changes_since(start, limit=3)
+    rest = db.get_changes_since(first[-1][0])
+    assert len(first) == 3 and len(rest) == 2
+
+def test_no_changes_after_last_seq(db):
+    db.create_task('Задача', '', None, None, 'low', None)
+    assert db.get_changes_since(db.get_last_change_seq()) == []
+
+def test_prune_keeps_recent_and_seq_grows(db):
+    db.create_task('Старая', '', None, None, 'low', None)
+    db.conn.execute("UPDATE change_log SET changed_at = datetime('now', '-30 days')")
+    db.conn.commit()
+    last = db.get_last_change_seq()
+    db.create_task('Новая', '', None, None, 'low', None)
+    
+    assert db.prune_change_log(7) == last
+    remaining = db.get_changes_since(0)
+    assert len(remaining) == 1 and remaining[0][0] > last
+    # AUTOINCREMENT не переиспользует номера удалённых записей
+    db.conn.execute('DELETE FROM change_log')
+    db.create_task('Ещё одна', '', None, None, 'low', None)
+    assert db.get_last_change_seq() > remaining[0][0]
+
+def test_prune_command(db, capsys):
+    db.create_task('Задача', '', None, None, 'low', None)
+    db.conn.execute("UPDATE change_log SET changed_at = datetime('now', '-30 days')")
+    db.conn.commit()
+    assert main(['--db', db.db_name, 'prune', '--days', '7']) == 0
+    assert db.get_changes_since(0) == []
+    assert 'Удалено записей журнала' in capsys.readouterr().out
@@ -0,0 +1,60 @@
+def actual_task_counts(db, where='1', params=()):
+    cursor = db.conn.execute(
+        f'SELECT status, COUNT(*) FROM tasks WHERE {where} GROUP BY status', params)
+    return dict(cursor.fetchall())
+
+def actual_role_counts(db):
+    cursor = db.conn.execute('SELECT role, COUNT(*) FROM users WHERE is_active = 1 GROUP BY role')
+    return dict(cursor.fetchall())
+
+def assert_counters_match(db, user_ids, project_ids):
+    assert db.get_task_status_counts() == actual_task_counts(db)
+    for user_id in user_ids:
+        assert (db.get_task_status_counts(user_id=user_id)
+                == actual_task_counts(db, 'assigned_to = ?', (user_id,)))
+    for project_id in project_ids:
+        assert (db.get_task_status_counts(project_id=project_id)
+                == actual_task_counts(db, 'project_id = ?', (project_id,)))
+    assert db.get_user_role_counts() == actual_role_counts(db)
+
+def test_task_counters_follow_inserts_updates_and_deletes(db):
+    first = db.create_user('first', 'pass', 'worker', 'Первый')
+    second = db.create_user('second', 'pass', 'worker', 'Второй')
+    project = db.create_project('Проект', '', None, None, 0, None)
+    tasks = [db.create_task(f'Задача {n}', '', project, first, 'medium', None) for n in range(4)]
+    users, projects = [first, second], [project]
+    assert_counters_match(db, users, projects)
+    assert db.get_task_status_counts(user_id=first) == {'pending': 4}
+    
+    db.update_task_status(tasks[0], 'completed')
+    assert_counters_match(db, users, projects)
+    
+    db.conn.execute('UPDATE tasks SET assigned_to = ?, project_id = NULL WHERE id = ?',
+                    (second, tasks[1]))
+    db.conn.commit()
+    assert_counters_match(db, users, projects)
+    assert db.get_task_status_counts(user_id=second) == {'pending': 1}
+    
+    db.conn.execute('DELETE FROM tasks WHERE id IN (?, ?)', (tasks[0], tasks[2]))
+    db.conn.commit()
+    assert_counters_match(db, users, projects)
+    assert db.get_task_status_counts(project_id=project) == {'pending': 1}
+
+def test_project_task_counts_skip_empty_rows(db):
+    project = db.create_project('Проект', '', None, None, 0, None)
+    task = db.create_task('Задача', '', project, None, 'low', None)
+    db.conn.execute('DELETE FROM tasks WHERE id = ?', (task,))
+    db.conn.commit()
+    assert project not in [row[0] for row in db.get_project_task_counts()]
+
+def test_role_counters_follow_role_and_activity(db):
+    user = db.create_user('manager', 'pass', 'worker', 'Менеджер')
+    assert_counters_match(db, [], [])
+    db.conn.execute("UPDATE users SET role = 'manager' WHERE id = ?", (user,))
+    db.conn.commit()
+    assert_counters_match(db, [], [])
+    before = db.get_user_role_counts(active_only=False)
+    db.conn.execute('UPDATE users SET is_active = 0 WHERE id = ?', (user,))
+    db.conn.commit()
+    assert_counters_match(db, [], [])
+    assert db.get_user_role_counts(active_only=False) == before
@@ -0,0 +1,91 @@
+import pytest
+
+def closure(db):
+    return set(db.conn.execute('SELECT ancestor_id, descendant_id, depth FROM department_tree'))
+
+def expected_closure(db):
+    """Замыкание, пересчитанное по parent_id рекурсивным запросом"""
+    return set(db.conn.execute('''
+    WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0 FROM departments
+        UNION ALL
+        SELECT t.ancestor_id, d.id, t.depth + 1
+        FROM tree t JOIN departments d ON d.parent_id = t.descendant_id
+    )
+    SELECT ancestor_id, descendant_id, depth FROM tree
+    '''))
+
+@pytest.fixture
+def tree(db):
+    """Компания -> (Продажи -> Регионы -> Север), (Разработка -> Тестирование)"""
+    ids = {'company': db.create_department('Компания')}
+    ids['sales'] = db.create_department('Продажи', parent_id=ids['company'])
+    ids['regions'] = db.create_department('Регионы', parent_id=ids['sales'])
+    ids['north'] = db.create_department('Север', parent_id=ids['regions'])
+    ids['dev'] = db.create_department('Разработка', parent_id=ids['company'])
+    ids['qa'] = db.create_department('Тестирование', parent_id=ids['dev'])
+    return ids
+
+def names(departments):
+    return [department.name for department in departments]
+
+def test_closure_follows_inserts(db, tree):
+    assert closure(db) == expected_closure(db)
+    assert names(db.get_department_ancestors(tree['north'])) == [
+        'Компания', 'Продажи', 'Регионы', 'Север']
+
+def test_move_subtree(db, tree):
+    db.move_department(tree['regions'], tree['dev'])
+    assert closure(db) == expected_closure(db)
+    assert names(db.get_department_ancestors(tree['north'])) == [
+        'Компания', 'Разработка', 'Регионы', 'Север']
+    assert names(db.get_child_departments(tree['sales'])) == []
+    
+    db.move_department(tree['regions'], None)
+    assert closure(db) == expected_closure(db)
+    assert names(db.get_department_ancestors(tree['north'])) == ['Регионы', 'Север']
+
+@pytest.mark.parametrize('target', ['sales', 'regions', 'north'])
+def test_cycle_move_is_rejected(db, tree, target):
+    before = closure(db)
+    with pytest.raises(ValueError):
+        db.move_department(tree['sales'], tree[target])
+    assert closure(db) == before
+    parent = db.conn.execute('SELECT parent_id FROM departments WHERE id = ?',
+                             (tree['sales'],)).fetchone()[0]
+    assert parent == tree['company']
+    # Отклонённый перенос не оставляет открытой транзакции и блокировки записи
+    assert not db.conn.in_transaction
+    db.move_department(tree['qa'], tree['sales'])
+    assert closure(db) == expected_closure(db)
+
+@pytest.mark.parametrize('deleted', ['north', 'regions'])
+def test_delete_moves_children_up(db, tree, deleted):
+    db.conn.execute('DELETE FROM departments WHERE id = ?', (tree[deleted],))
+    db.conn.commit()
+    assert closure(db) == expected_closure(db)
+    if deleted == 'regions':
+        assert names(db.get_child_departments(tree['sales'])) == ['Север']
+
+def test_subtree_members_and_director(db, tree):
+    director = db.create_user('test_director', 'pass', 'director', 'Директор')
+    db.conn.execute('UPDATE departments SET director_id = ? WHERE id = ?', (director, tree['sales']))
+    db.conn.commit()
+    workers = {key: db.create_user(f'w_{key}', 'pass', 'worker', f'Работник {key}')
+               for key in ('sales', 'north', 'qa')}
+    for key, user_id in workers.items():
+        db.add_department_member(tree[key], user_id)
+    
+    def member_ids(users):
+        return {user.id for user in users}
+    
+    assert member_ids(db.get_department_members(tree['sales'])) == {workers['sales']}
+    assert (member_ids(db.get_department_members(tree['sales'], subtree=True))
+            == {workers['sales'], workers['north']})
+    assert db.count_department_members(tree['company']) == 3
+    assert (member_ids(db.get_users_under_director(director))
+            == {workers['sales'], workers['north']})
+    
+    db.move_department(tree['regions'], tree['dev'])
+    assert member_ids(db.get_users_under_director(director)) == {workers['sales']}
+    assert db.count_department_members(tree['dev']) == 2
@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+import time
+import pytest
+from executor import QueryExecutor, QueryHandle, _WorkerState
+
+# Рекурсивный запрос, который выполняется заметно дольше теста без отмены
+SLOW_SQL = '''
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n)
+SELECT count(*) FROM n
+'''
+
+class FakeRoot:
+    """Замена Tk: after только запоминается, _poll вызывается тестом"""
+    
+    def after(self, ms, func):
+        return 'after'
+    
+    def after_cancel(self, after_id):
+        pass
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def run(executor, handle):
+    wait_for(lambda: handle.done or not executor._results.empty())
+    executor._poll()
+
+def test_cancel_interrupts_running_query(db):
+    executor = QueryExecutor(FakeRoot(), db.db_name, workers=1)
+    try:
+        errors = []
+        started = threading.Event()
+        def slow(worker_db):
+            started.set()
+            return worker_db.conn.execute(SLOW_SQL).fetchone()
+        handle = executor.submit(slow, errback=errors.append)
+        started.wait(5)
+        # Отмена может прийти до начала SQL-команды; повторяем, пока запрос выполняется
+        while handle._worker is not None:
+            handle.cancel()
+            time.sleep(0.01)
+        results = []
+        follow = executor.submit(lambda worker_db: 42, callback=results.append)
+        run(executor, follow)
+        assert results == [42]
+        assert errors == []
+    finally:
+        executor.shutdown()
+
+def interrupt_later(state, handle):
+    timer = threading.Timer(0.1, state.interrupt, (handle,))
+    timer.start()
+    return timer
+
+def test_stale_cancel_does_not_interrupt_next_query(db):
+    state = _WorkerState(db)
+    finished, running = QueryHandle(None), QueryHandle(None)
+    state.current = running
+    timer = interrupt_later(state, finished)
+    try:
+        # Запрос ограничен по длине, чтобы тест завершался и без прерывания
+        count = db.conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 2000000)
+        SELECT count(*) FROM n
+        ''').fetchone()[0]
+    finally:
+        timer.join()
+    assert count == 2000000
+
+def test_cancel_of_current_handle_interrupts(db):
+    state = _WorkerState(db)
+    running = QueryHandle(None)
+    state.current = running
+    timer = interrupt_later(state, running)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match='interrupt'):
+            db.conn.execute(SLOW_SQL).fetchone()
+    finally:
+        timer.join()
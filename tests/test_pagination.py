@@ -0,0 +1,63 @@
+import pytest
+
+def all_pages(fetch_page, limit):
+    rows, after = [], None
+    while True:
+        page, after = fetch_page(after, limit)
+        rows.extend(page)
+        if after is None:
+            return rows
+
+@pytest.fixture
+def worker(db):
+    user_id = db.create_user('worker', 'pass', 'worker', 'Работник')
+    # Одинаковые приоритеты и сроки, пустые сроки среди заполненных
+    for n in range(12):
+        priority = ['critical', 'high', 'medium'][n % 3]
+        deadline = [None, '2024-01-01', '2024-02-01', None][n % 4]
+        db.create_task(f'Задача {n}', '', None, user_id, priority, deadline)
+    return user_id
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 5, 12, 13])
+def test_task_pages_match_full_listing(db, worker, limit):
+    rows = all_pages(lambda after, limit: db.get_tasks_by_user_page(worker, after, limit), limit)
+    assert [row[0] for row in rows] == [row[0] for row in db.get_tasks_by_user(worker)]
+
+def test_ties_are_ordered_by_id(db, worker):
+    rows, _ = db.get_tasks_by_user_page(worker, limit=100)
+    keys = [(row.priority, row.deadline) for row in rows]
+    for (key, row), (next_key, next_row) in zip(zip(keys, rows), zip(keys[1:], rows[1:])):
+        if key == next_key:
+            assert row[0] < next_row[0]
+
+def test_null_deadline_sorts_first_within_priority(db, worker):
+    rows, _ = db.get_tasks_by_user_page(worker, limit=100)
+    critical = [row.deadline for row in rows if row.priority == 'critical']
+    assert critical == sorted(critical, key=lambda deadline: (deadline is not None, deadline))
+    assert critical[0] is None
+
+def test_page_after_null_deadline_key(db, worker):
+    first, after = db.get_tasks_by_user_page(worker, limit=1)
+    assert first[0].deadline is None
+    assert after[1] is None
+    rest, _ = db.get_tasks_by_user_page(worker, after, limit=100)
+    assert [row[0] for row in first + rest] == [row[0] for row in db.get_tasks_by_user(worker)]
+
+def test_exact_last_page_returns_empty_tail(db, worker):
+    rows, after = db.get_tasks_by_user_page(worker, limit=12)
+    assert len(rows) == 12 and after is not None
+    assert db.get_tasks_by_user_page(worker, after, limit=12) == ([], None)
+
+def test_other_users_tasks_are_not_paged(db, worker):
+    other = db.create_user('other', 'pass', 'worker', 'Другой')
+    db.create_task('Чужая', '', None, other, 'critical', None)
+    rows = all_pages(lambda after, limit: db.get_tasks_by_user_page(worker, after, limit), 4)
+    assert 'Чужая' not in [row.title for row in rows]
+
+@pytest.mark.parametrize('limit', [1, 2, 7])
+def test_project_pages_match_full_listing(db, limit):
+    for n in range(9):
+        db.create_project(f'Проект {n}', '', '2024-01-01', [None, '2024-06-01', '2024-03-01'][n % 3],
+                          0, None)
+    rows = all_pages(db.get_projects_page, limit)
+    assert [row[0] for row in rows] == [row[0] for row in db.get_projects()]
@@ -0,0 +1,34 @@
+from database import PRIORITY_RANKS, DEFAULT_PRIORITY_RANK, priority_rank
+
+def rank_of(db, task_id):
+    return db.conn.execute('SELECT priority_rank FROM tasks WHERE id = ?', (task_id,)).fetchone()[0]
+
+def test_create_task_stores_rank(db):
+    task_id = db.create_task('Задача', '', None, None, 'high', '2024-01-01')
+    assert rank_of(db, task_id) == PRIORITY_RANKS['high']
+
+def test_insert_without_rank_gets_rank_from_trigger(db):
+    cursor = db.conn.execute("INSERT INTO tasks (title, priority) VALUES ('Импорт', 'critical')")
+    assert rank_of(db, cursor.lastrowid) == PRIORITY_RANKS['critical']
+
+def test_insert_with_wrong_rank_is_corrected(db):
+    cursor = db.conn.execute(
+        "INSERT INTO tasks (title, priority, priority_rank) VALUES ('Импорт', 'low', 1)")
+    assert rank_of(db, cursor.lastrowid) == PRIORITY_RANKS['low']
+
+def test_priority_change_updates_rank(db):
+    task_id = db.create_task('Задача', '', None, None, 'low', None)
+    db.conn.execute("UPDATE tasks SET priority = 'critical' WHERE id = ?", (task_id,))
+    assert rank_of(db, task_id) == PRIORITY_RANKS['critical']
+
+def test_unknown_priority_sorts_last():
+    assert priority_rank(None) == priority_rank('неизвестный') == DEFAULT_PRIORITY_RANK
+    assert DEFAULT_PRIORITY_RANK > max(PRIORITY_RANKS.values())
+
+def test_tasks_by_user_ordered_by_rank_then_deadline(db):
+    user_id = db.create_user('worker', 'pass', 'worker', 'Работник')
+    for title, priority, deadline in [('b', 'low', '2024-01-01'), ('a', 'critical', '2024-03-01'),
+                                      ('c', 'critical', '2024-02-01'), ('d', 'medium', None)]:
+        db.create_task(title, '', None, user_id, priority, deadline)
+    titles = [row[1] for row in db.get_tasks_by_user(user_id)]
+    assert titles == ['c', 'a', 'd', 'b']
@@ -0,0 +1,47 @@
+import pytest
+
+@pytest.fixture(params=['fts', 'like'])
+def search_db(request, db, monkeypatch):
+    """База с поиском через FTS5 и через запасной LIKE"""
+    if request.param == 'like':
+        monkeypatch.setattr(db, 'has_full_text_search', lambda: False)
+    return db
+
+def keys(rows):
+    return [row[0] for row in rows]
+
+def test_finds_tasks_and_projects(search_db):
+    project = search_db.create_project('Квартальный отчёт', '', None, None, 0, None)
+    task = search_db.create_task('Собрать отчёт', 'по продажам', None, None, 'low', None)
+    search_db.create_task('Другое', '', None, None, 'low', None)
+    rows, _ = search_db.search('отчёт')
+    assert set(keys(rows)) == {f'project:{project}', f'task:{task}'}
+
+def test_user_filter_limits_tasks(search_db):
+    worker = search_db.create_user('worker', 'pass', 'worker', 'Работник')
+    mine = search_db.create_task('Сверка склада', '', None, worker, 'low', None)
+    search_db.create_task('Сверка кассы', '', None, None, 'low', None)
+    rows, _ = search_db.search('Сверка', user_id=worker)
+    assert keys(rows) == [f'task:{mine}']
+
+def test_pages_do_not_overlap(search_db):
+    for n in range(7):
+        search_db.create_task(f'Инвентаризация {n}', '', None, None, 'low', None)
+        search_db.create_project(f'Инвентаризация {n}', '', None, None, 0, None)
+    found, after = [], None
+    while True:
+        rows, after = search_db.search('Инвентаризация', after=after, limit=3)
+        found.extend(keys(rows))
+        if after is None:
+            break
+    assert len(found) == len(set(found)) == 14
+
+def test_empty_query(search_db):
+    assert search_db.search('  ') == ([], None)
+
+def test_like_fallback_treats_wildcards_literally(db, monkeypatch):
+    monkeypatch.setattr(db, 'has_full_text_search', lambda: False)
+    exact = db.create_task('Скидка 100%_', '', None, None, 'low', None)
+    db.create_task('Скидка 1000', '', None, None, 'low', None)
+    rows, _ = db.search('100%_')
+    assert keys(rows) == [f'task:{exact}']
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import pytest
+from client import RemoteDatabase, RemoteError
+from server import ApiServer
+
+@pytest.fixture
+def server(db):
+    """Сервер API над временной базой в отдельном потоке с циклом asyncio"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    api = ApiServer(db.db_name, port=0, readers=2)
+    asyncio.run_coroutine_threadsafe(api.start(), loop).result(10)
+    yield api
+    asyncio.run_coroutine_threadsafe(api.close(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+@pytest.fixture
+def users(db):
+    return {role: db.create_user(f'test_{role}', 'pass', role, f'Тест {role}')
+            for role in ('worker', 'organizer', 'manager')}
+
+@pytest.fixture
+def login(server):
+    clients = []
+    def login(role):
+        remote = RemoteDatabase(f'http://127.0.0.1:{server.port}')
+        assert remote.authenticate_user(f'test_{role}', 'pass') is not None
+        clients.append(remote)
+        return remote
+    yield login
+    for remote in clients:
+        remote.close()
+
+def test_wrong_password(server, users):
+    remote = RemoteDatabase(f'http://127.0.0.1:{server.port}')
+    assert remote.authenticate_user('test_worker', 'wrong') is None
+    with pytest.raises(RemoteError):
+        remote.get_last_change_seq()
+    remote.close()
+
+def test_worker_sees_only_own_tasks(db, users, login):
+    own = db.create_task('Своя', '', None, users['worker'], 'low', None)
+    db.create_task('Чужая', '', None, users['manager'], 'low', None)
+    rows, _ = login('worker').get_tasks_by_user_page(users['manager'])
+    assert [row.id for row in rows] == [own]
+
+def test_worker_changes_status_of_own_tasks_only(db, users, login):
+    own = db.create_task('Своя', '', None, users['worker'], 'low', None)
+    other = db.create_task('Чужая', '', None, users['manager'], 'low', None)
+    worker = login('worker')
+    worker.update_task_status(own, 'completed')
+    with pytest.raises(RemoteError, match='другому'):
+        worker.update_task_status(other, 'completed')
+    status = dict(db.conn.execute('SELECT id, status FROM tasks WHERE id IN (?, ?)', (own, other)))
+    assert status == {own: 'completed', other: 'pending'}
+
+def test_role_restricted_methods(users, login):
+    with pytest.raises(RemoteError, match='прав'):
+        login('worker').get_all_users()
+    with pytest.raises(RemoteError, match='прав'):
+        login('worker').create_task('Задача', '', None, users['worker'], 'low', None)
+    assert len(login('manager').get_all_users()) >= 3
+
+@pytest.mark.parametrize('role', ['worker', 'organizer'])
+def test_user_record_only_own_for_non_managers(users, login, role):
+    remote = login(role)
+    assert remote.get_user_by_id(users[role]).id == users[role]
+    with pytest.raises(RemoteError, match='прав'):
+        remote.get_user_by_id(users['manager'])
+
+def test_manager_reads_any_user(users, login):
+    assert login('manager').get_user_by_id(users['worker']).role == 'worker'
+
+def test_expired_sessions_are_swept(server, users, login):
+    worker, manager = login('worker'), login('manager')
+    server.sessions[worker.token][1] -= server.SESSION_TIMEOUT + 1
+    assert server.sweep_sessions() == 1
+    assert worker.token not in server.sessions and manager.token in server.sessions
+    with pytest.raises(RemoteError):
+        worker.get_last_change_seq()
+    assert manager.get_last_change_seq() >= 0
+
+def test_worker_batch_status_requires_every_task(db, users, login):
+    own = [db.create_task(f'Своя {n}', '', None, users['worker'], 'low', None) for n in range(3)]
+    other = db.create_task('Чужая', '', None, users['manager'], 'low', None)
+    worker = login('worker')
+    with pytest.raises(RemoteError, match='другому'):
+        worker.update_tasks_status(own + [other], 'completed')
+    assert worker.update_tasks_status(own, 'completed') == 3
+    statuses = [row[0] for row in db.conn.execute('SELECT status FROM tasks WHERE id = ?', (other,))]
+    assert statuses == ['pending']
@@ -0,0 +1,130 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# Служебные части книги Office Open XML с одним листом
+CONTENT_TYPES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>'''
+
+ROOT_RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>'''
+
+WORKBOOK = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>'''
+
+WORKBOOK_RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>'''
+
+# Минимальная таблица стилей: стиль 0 - обычный, стиль 1 - полужирный заголовок
+STYLES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="1"><fill><patternFill patternType="none"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>
+</styleSheet>'''
+
+SHEET_HEADER = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>')
+SHEET_FOOTER = '</sheetData></worksheet>'
+
+# Максимальная длина текста в ячейке Excel
+MAX_CELL_TEXT = 32767
+
+# Сколько байт XML копится перед передачей в архив
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Символы, недопустимые в XML 1.0
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def column_letter(index):
+    """Буквенное имя колонки по номеру с нуля: 0 -> A, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def _cell(reference, value, style):
+    """XML одной ячейки; пустые значения не записываются"""
+    if value is None:
+        return ''
+    style_attr = f' s="{style}"' if style else ''
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"{style_attr}><v>{value!r}</v></c>'
+    text = INVALID_XML_CHARS.sub('', str(value))[:MAX_CELL_TEXT]
+    return (f'<c r="{reference}" t="inlineStr"{style_attr}>'
+            f'<is><t xml:space="preserve">{escape(text)}</t></is></c>')
+
+class XlsxWriter:
+    """Потоковая запись книги XLSX с одним листом без сторонних библиотек.
+    
+    Строки копятся в буфере ограниченного размера и сжимаются в архив,
+    поэтому расход памяти не зависит от их числа. Текст записывается
+    встроенными строками (inlineStr), чтобы не держать в памяти таблицу
+    общих строк. Сжатие быстрое (уровень 1): выгрузка упирается в него.
+    """
+    
+    def __init__(self, path, sheet_name='Лист1'):
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+        self._zip.writestr('[Content_Types].xml', CONTENT_TYPES)
+        self._zip.writestr('_rels/.rels', ROOT_RELS)
+        self._zip.writestr('xl/workbook.xml', WORKBOOK.format(name=escape(sheet_name[:31], {'"': '&quot;'})))
+        self._zip.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        self._zip.writestr('xl/styles.xml', STYLES)
+        self._sheet = self._zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True)
+        self._buffer = [SHEET_HEADER]
+        self._buffered = 0
+        self._letters = []
+        self.rows = 0
+    
+    def write_row(self, values, style=0):
+        """Запись строки; style=1 - полужирный шрифт (для заголовка)"""
+        self.rows += 1
+        while len(self._letters) < len(values):
+            self._letters.append(column_letter(len(self._letters)))
+        cells = ''.join(_cell(f'{letter}{self.rows}', value, style)
+                        for letter, value in zip(self._letters, values))
+        row = f'<row r="{self.rows}">{cells}</row>'
+        self._buffer.append(row)
+        self._buffered += len(row)
+        if self._buffered >= WRITE_BUFFER_SIZE:
+            self._flush()
+    
+    def _flush(self):
+        self._sheet.write(''.join(self._buffer).encode('utf-8'))
+        self._buffer = []
+        self._buffered = 0
+    
+    def close(self):
+        """Завершение листа и архива"""
+        if self._sheet is not None:
+            self._buffer.append(SHEET_FOOTER)
+            self._flush()
+            self._sheet.close()
+            self._sheet = None
+            self._zip.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()